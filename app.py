@@ -5,37 +5,67 @@ TestGPT - AI-driven Test Case Generator
 """
 
 import os
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
-import json
 from datetime import datetime
 import uuid
+import itertools
 
 # 載入環境變數
 load_dotenv()
 
+from src.json_codec import codec
+from src.generators.test_case_model import decode_test_cases
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """以共用的 JSON 編解碼器處理請求解碼與 jsonify 回應"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return codec.dumps(obj)
+    
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
 # 建立 Flask 應用程式
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
+# 陣列長度達此數量時以分段串流輸出 JSON 回應
+STREAM_JSON_MIN_ITEMS = int(os.getenv('STREAM_JSON_MIN_ITEMS', 5000))
+
 # 匯入模組
 from src.generators.test_case_generator import TestCaseGenerator
 from src.converters.script_converter import ScriptConverter
 from src.fuzz.fuzz_tester import FuzzTester
 from src.models.ai_model_manager import AIModelManager
+from src.models.model_catalog import ModelCatalog
+from src.models.rate_limiter import PRIORITY_INTERACTIVE
+from src.jobs.bulk_runner import JobManager, load_items
+from src.generators.dedup import MinHashDeduplicator
 from src.exporters.test_exporter import TestExporter
 from src.reports.report_generator import ReportGenerator
 from src.test_runner import TestRunner
 
 # 初始化模組
 ai_manager = AIModelManager()
+model_catalog = ModelCatalog.from_env(ai_manager)
+model_catalog.start()
 test_generator = TestCaseGenerator(ai_manager)
-script_converter = ScriptConverter()
+job_manager = JobManager.from_env(test_generator)
+script_converter = ScriptConverter.from_env()
 fuzz_tester = FuzzTester()
 test_exporter = TestExporter()
 report_generator = ReportGenerator()
 test_runner = TestRunner()
 
+def json_response(payload: dict, key: str):
+    """輸出 JSON 回應；key 對應的陣列過大時分段串流編碼"""
+    if STREAM_JSON_MIN_ITEMS and len(payload[key]) >= STREAM_JSON_MIN_ITEMS:
+        return Response(codec.iter_encode(payload, key), mimetype='application/json')
+    return jsonify(payload)
+
 @app.route('/')
 def index():
     """首頁"""
@@ -50,40 +80,318 @@ def generate_test_cases():
         test_type = data.get('test_type', 'functional')
         model = data.get('model', 'openai')
         template = data.get('template', '')
+        use_cache = data.get('use_cache', True)
+        strict = data.get('strict', False)
         
         # 根據是否使用模板生成測試用例
         if template:
-            test_cases = test_generator.generate_with_template(description, template, test_type, model)
+            test_cases = test_generator.generate_with_template(description, template, test_type, model, use_cache, strict)
         else:
-            test_cases = test_generator.generate(description, test_type, model)
+            test_cases = test_generator.generate(description, test_type, model, use_cache, strict)
         
-        return jsonify({
+        fallback = test_generator.is_local_fallback(test_cases)
+        return json_response({
             'success': True,
             'test_cases': test_cases,
+            'source': 'local' if fallback else 'model',
+            'fallback': fallback,
+            'message': 'AI 模型呼叫失敗，已改用本地規則引擎產生測試用例' if fallback else '測試用例生成成功'
+        }, 'test_cases')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/generate/multi', methods=['POST'])
+def generate_test_cases_multi():
+    """併發生成多種測試類型並合併為單一測試套件"""
+    try:
+        data = request.get_json()
+        description = data.get('description', '')
+        test_types = data.get('test_types', ['functional', 'security', 'performance', 'usability'])
+        model = data.get('model', 'openai')
+        template = data.get('template', '')
+        use_cache = data.get('use_cache', True)
+        strict = data.get('strict', False)
+        
+        result = test_generator.generate_multi(description, test_types, model, template, use_cache, strict)
+        
+        return json_response({
+            'success': True,
+            'test_cases': result['test_cases'],
+            'counts': result['counts'],
+            'errors': result['errors'],
+            'partial': bool(result['errors']),
+            'dedup_report': result['dedup_report'],
+            'message': '測試用例生成成功' if not result['errors'] else '部分測試類型生成失敗'
+        }, 'test_cases')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/generate/incremental', methods=['POST'])
+def generate_test_cases_incremental():
+    """依功能描述的修改增量更新測試套件（未提供 suite_id 時建立新套件）"""
+    try:
+        data = request.get_json()
+        suite_id = data.get('suite_id') or uuid.uuid4().hex[:12]
+        description = data.get('description', '')
+        test_type = data.get('test_type', 'functional')
+        model = data.get('model', 'openai')
+        template = data.get('template', '')
+        use_cache = data.get('use_cache', True)
+        
+        result = test_generator.generate_incremental(suite_id, description, test_type, model, template, use_cache)
+        
+        return jsonify({
+            'success': True,
+            **result,
             'message': '測試用例生成成功'
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+def format_sse(event: str, data) -> str:
+    """格式化 Server-Sent Events 訊息"""
+    return f"event: {event}\ndata: {codec.dumps(data)}\n\n"
+
+@app.route('/generate/stream', methods=['POST'])
+def generate_test_cases_stream():
+    """以 Server-Sent Events 逐一推送生成的測試用例"""
+    data = request.get_json()
+    description = data.get('description', '')
+    test_type = data.get('test_type', 'functional')
+    model = data.get('model', 'openai')
+    template = data.get('template', '')
+    use_cache = data.get('use_cache', True)
+    
+    def events():
+        count = 0
+        try:
+            # 本地規則引擎的草稿在 AI 回應前立即送出
+            if model != 'demo-model':
+                yield format_sse('draft', {'test_cases': test_generator.generate_draft(description, test_type, template)})
+            for test_case in test_generator.generate_stream(description, test_type, model, template, use_cache):
+                count += 1
+                yield format_sse('test_case', test_case)
+            yield format_sse('done', {'success': True, 'count': count, 'message': '測試用例生成成功'})
+        except Exception as e:
+            yield format_sse('error', {'success': False, 'error': str(e)})
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/generate/batch', methods=['POST'])
+def generate_test_cases_batch():
+    """併發為多個功能描述生成測試用例"""
+    try:
+        data = request.get_json()
+        descriptions = data.get('descriptions', [])
+        test_type = data.get('test_type', 'functional')
+        model = data.get('model', 'openai')
+        concurrency = int(data.get('concurrency', 5))
+        use_cache = data.get('use_cache', True)
+
+        # 使用者直接等待結果，與 /generate 同樣以互動優先順序排隊
+        suites = test_generator.generate_many(descriptions, test_type, model, concurrency, use_cache, PRIORITY_INTERACTIVE)
+
+        return jsonify({
+            'success': True,
+            'suites': suites,
+            'message': f'已為 {len(suites)} 個功能生成測試用例'
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/dedupe', methods=['POST'])
+def dedupe_test_cases():
+    """去除近似重複的測試用例並回傳合併報告"""
+    try:
+        data = request.get_json()
+        test_cases = data.get('test_cases', [])
+        threshold = data.get('threshold')
+        
+        if threshold is not None:
+            kept, report = MinHashDeduplicator(threshold=float(threshold)).dedupe(test_cases)
+        else:
+            kept, report = test_generator.dedupe(test_cases)
+        
+        return jsonify({
+            'success': True,
+            'test_cases': kept,
+            'report': report,
+            'removed': len(test_cases) - len(kept)
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """建立批次生成作業（JSON 的 items 陣列，或上傳 JSONL/CSV 檔案）"""
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            data = request.form
+            filename = (upload.filename or '').lower()
+            if filename.endswith('.csv'):
+                suffix = '.csv'
+            elif filename.endswith('.jsonl'):
+                suffix = '.jsonl'
+            else:
+                raise ValueError("只支援 JSONL 或 CSV 檔案")
+            path = os.path.join(job_manager.jobs_dir, f'upload-{uuid.uuid4().hex}{suffix}')
+            os.makedirs(job_manager.jobs_dir, exist_ok=True)
+            upload.save(path)
+            try:
+                items = load_items(path)
+            finally:
+                os.remove(path)
+        else:
+            data = request.get_json()
+            items = data.get('items', [])
+        
+        job = job_manager.create(
+            items,
+            model=data.get('model', 'gpt-4'),
+            concurrency=int(data.get('concurrency', 5)),
+            use_cache=str(data.get('use_cache', True)).lower() != 'false'
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job.get_progress()
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """列出批次作業"""
+    return jsonify({
+        'success': True,
+        'jobs': job_manager.list()
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """取得批次作業進度"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '找不到作業'}), 404
+    return jsonify({
+        'success': True,
+        'job': job.get_progress()
+    })
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """取消批次作業"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '找不到作業'}), 404
+    job.cancel()
+    return jsonify({
+        'success': True,
+        'job': job.get_progress()
+    })
+
+@app.route('/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id):
+    """續跑批次作業，已成功的項目不會重新生成"""
+    try:
+        job = job_manager.resume(job_id)
+    except KeyError:
+        return jsonify({'success': False, 'error': '找不到作業'}), 404
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    return jsonify({
+        'success': True,
+        'job': job.get_progress()
+    })
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """以 JSONL 串流輸出批次作業目前已完成的結果"""
+    job = job_manager.get(job_id)
+    if job is None or not os.path.exists(job.output_path):
+        return jsonify({'success': False, 'error': '找不到作業結果'}), 404
+    
+    def lines():
+        with open(job.output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.endswith('\n'):
+                    yield line
+    
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
 @app.route('/convert', methods=['POST'])
 def convert_to_script():
     """轉換為測試腳本"""
     try:
         data = request.get_json()
-        test_cases = data.get('test_cases', [])
+        test_cases = decode_test_cases(data.get('test_cases', []))
         framework = data.get('framework', 'pytest')
         
-        # 轉換為測試腳本
-        script = script_converter.convert(test_cases, framework)
+        # 逐段轉換並直接串流，每段腳本各自跳脫後接在同一個 JSON 字串內；
+        # 先轉換檔頭與第一個用例，輸入有誤時仍能回傳錯誤狀態碼
+        chunks = script_converter.convert_iter(test_cases, framework)
+        head = list(itertools.islice(chunks, 2))
+        
+        def body():
+            yield '{"script":"'
+            try:
+                for chunk in itertools.chain(head, chunks):
+                    yield codec.dumps(chunk)[1:-1]
+            except Exception as e:
+                # 已送出狀態碼後才失敗時，以 success=false 結束，回應仍是完整的 JSON
+                yield '","success":false,"error":' + codec.dumps(str(e)) + '}'
+                return
+            yield '","success":true,"message":"腳本轉換成功"}'
         
+        return Response(stream_with_context(body()), mimetype='application/json')
+    except ValueError as e:
         return jsonify({
-            'success': True,
-            'script': script,
-            'message': '腳本轉換成功'
-        })
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -100,11 +408,11 @@ def generate_fuzz_tests():
         # 生成 Fuzz 測試
         fuzz_tests = fuzz_tester.generate_fuzz_tests(fields)
         
-        return jsonify({
+        return json_response({
             'success': True,
             'fuzz_tests': fuzz_tests,
             'message': 'Fuzz 測試生成成功'
-        })
+        }, 'fuzz_tests')
     except Exception as e:
         return jsonify({
             'success': False,
@@ -117,7 +425,17 @@ def export_test_script():
     try:
         data = request.get_json()
         script = data.get('script', '')
-        filename = data.get('filename', f'test_script_{datetime.now().strftime("%Y%m%d_%H%M%S")}.py')
+        filename = os.path.basename(data.get('filename', f'test_script_{datetime.now().strftime("%Y%m%d_%H%M%S")}.py'))
+        
+        # 未提供腳本時由測試用例直接轉換，邊寫入匯出檔邊串流下載
+        if not script and data.get('test_cases'):
+            test_cases = decode_test_cases(data['test_cases'])
+            chunks = script_converter.convert_iter(test_cases, data.get('framework', 'pytest'))
+            return Response(
+                stream_with_context(test_exporter.export_chunks(chunks, filename)),
+                mimetype='text/plain',
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
         
         # 匯出測試腳本
         file_path = test_exporter.export_script(script, filename)
@@ -159,17 +477,106 @@ def generate_report():
 def get_available_models():
     """取得可用的 AI 模型"""
     try:
-        models = ai_manager.get_available_models()
+        models = model_catalog.get_models()
+        return jsonify({
+            'success': True,
+            'models': models,
+            'providers': model_catalog.get_health()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/examples/accept', methods=['POST'])
+def accept_examples():
+    """將採用的測試用例加入少樣本範例索引"""
+    try:
+        data = request.get_json()
+        count = test_generator.accept_test_cases(
+            data.get('description', ''),
+            data.get('test_cases', []),
+            data.get('template', '')
+        )
+        
         return jsonify({
             'success': True,
-            'models': models
+            'accepted': count
         })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+@app.route('/examples/stats', methods=['GET'])
+def get_examples_stats():
+    """取得少樣本範例索引統計"""
+    return jsonify({
+        'success': True,
+        'examples': test_generator.example_index.get_stats()
+    })
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """取得回應快取與腳本片段快取統計"""
+    return jsonify({
+        'success': True,
+        'cache': ai_manager.get_cache_stats(),
+        'convert_cache': script_converter.get_cache_stats()
+    })
+
+@app.route('/cascade/stats', methods=['GET'])
+def get_cascade_stats():
+    """取得各模板與測試類型的模型升級率"""
+    return jsonify({
+        'success': True,
+        'cascade': test_generator.cascade.get_stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """以 Prometheus 文字格式輸出 LLM 呼叫延遲、token 用量與成本指標"""
+    return Response(ai_manager.get_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cassette/stats', methods=['GET'])
+def get_cassette_stats():
+    """取得 AI 呼叫錄製／重播統計"""
+    return jsonify({
+        'success': True,
+        'cassette': ai_manager.get_cassette_stats()
+    })
+
+@app.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """取得共用 HTTP 連線池統計"""
+    return jsonify({
+        'success': True,
+        'pool': ai_manager.get_pool_stats()
+    })
+
+@app.route('/router/stats', methods=['GET'])
+def get_router_stats():
+    """取得模型延遲、錯誤率與斷路器狀態"""
+    return jsonify({
+        'success': True,
+        'router': ai_manager.get_router_stats()
+    })
+
+@app.route('/scheduler/stats', methods=['GET'])
+def get_scheduler_stats():
+    """取得速率限制排程統計"""
+    return jsonify({
+        'success': True,
+        'scheduler': ai_manager.get_scheduler_stats()
+    })
+
 @app.route('/health')
 def health_check():
     """健康檢查"""
@@ -195,7 +602,7 @@ def run_tests():
         # 執行測試
         result = test_runner.run_all_tests(test_cases)
         
-        return jsonify(result)
+        return json_response(result, 'results')
         
     except Exception as e:
         return jsonify({
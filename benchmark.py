@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+TestGPT 效能測試腳本
+對 /generate 發出併發請求並統計延遲與吞吐量
+
+離線壓測方式：
+1. 以 LLM_CASSETTE_MODE=record 啟動服務並正常使用，錄製 AI 回應
+2. 以 LLM_CASSETTE_MODE=replay 重新啟動服務，再執行本腳本
+
+JSON 編解碼測試（不需啟動服務）：
+    python benchmark.py codec [用例數量]
+比較各 JSON 實作在大型 test_cases 請求中，解碼與編碼佔整體處理時間的比例
+"""
+
+import sys
+import time
+import json
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+def load_payloads(path):
+    """從 JSONL 檔載入請求內容"""
+    payloads = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                payloads.append(json.loads(line))
+    return payloads
+
+def send_request(url, payload):
+    """發送單一請求並回傳 (延遲, 是否成功)"""
+    started_at = time.perf_counter()
+    try:
+        response = requests.post(url, json=payload, timeout=120)
+        success = response.status_code == 200 and response.json().get('success', False)
+    except Exception:
+        success = False
+    return time.perf_counter() - started_at, success
+
+def percentile(values, q):
+    """計算百分位數"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_benchmark(url, payloads, requests_count, concurrency):
+    """執行效能測試"""
+    print(f"🚀 對 {url} 發出 {requests_count} 個請求（併發 {concurrency}）")
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(send_request, url, payloads[i % len(payloads)])
+            for i in range(requests_count)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started_at
+
+    latencies = [latency for latency, _ in results]
+    failures = sum(1 for _, success in results if not success)
+
+    print("=" * 50)
+    print(f"⏱️  總耗時: {elapsed:.2f} 秒")
+    print(f"📈 吞吐量: {requests_count / elapsed:.2f} req/s")
+    print(f"📊 p50: {percentile(latencies, 0.5) * 1000:.1f} ms")
+    print(f"📊 p95: {percentile(latencies, 0.95) * 1000:.1f} ms")
+    print(f"📊 p99: {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"❌ 失敗: {failures}")
+
+def build_test_cases(count):
+    """建立模擬 AI 生成的測試用例"""
+    return [{
+        'id': f'TC{i + 1:05d}',
+        'title': f'使用者登入情境 {i}',
+        'description': f'測試第 {i} 組帳號密碼組合的登入行為',
+        'type': 'positive' if i % 2 else 'negative',
+        'steps': ['打開登入頁面', f'輸入用戶名 user{i}', '輸入密碼', '點擊登入按鈕'],
+        'expected_result': '成功登入並導向 Dashboard 頁面',
+        'priority': 'high'
+    } for i in range(count)]
+
+def run_codec_benchmark(count, rounds=3):
+    """模擬 /convert 請求：解碼請求、轉換腳本、編碼回應，統計各階段耗時"""
+    from src.json_codec import JSONCodec, BACKEND_ORJSON, BACKEND_MSGSPEC, BACKEND_STDLIB
+    from src.converters.script_converter import ScriptConverter
+
+    converter = ScriptConverter()
+    payload = {'test_cases': build_test_cases(count), 'framework': 'pytest'}
+    print(f"🚀 {count} 個測試用例，每種實作執行 {rounds} 次取最佳值")
+    print("=" * 50)
+
+    for backend in (BACKEND_STDLIB, BACKEND_ORJSON, BACKEND_MSGSPEC):
+        try:
+            codec = JSONCodec(backend)
+        except ImportError:
+            print(f"⚠️  {backend} 未安裝，略過")
+            continue
+
+        body = codec.dumps_bytes(payload)
+        best = None
+        for _ in range(rounds):
+            started_at = time.perf_counter()
+            data = codec.loads(body)
+            decoded_at = time.perf_counter()
+            script = converter.convert(data['test_cases'], data['framework'])
+            handled_at = time.perf_counter()
+            codec.dumps_bytes({'success': True, 'script': script, 'test_cases': data['test_cases']})
+            encoded_at = time.perf_counter()
+            timings = (decoded_at - started_at, handled_at - decoded_at, encoded_at - handled_at)
+            if best is None or sum(timings) < sum(best):
+                best = timings
+
+        decode, handle, encode = best
+        total = decode + handle + encode
+        print(f"📦 {backend}（請求 {len(body) / 1024 / 1024:.1f} MB）")
+        print(f"   解碼: {decode * 1000:.1f} ms  處理: {handle * 1000:.1f} ms  編碼: {encode * 1000:.1f} ms")
+        print(f"   序列化佔比: {(decode + encode) / total * 100:.1f}%")
+
+def main():
+    """主函數"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'codec':
+        run_codec_benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+        return
+
+    base_url = 'http://localhost:8080'
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    if len(sys.argv) > 3:
+        payloads = load_payloads(sys.argv[3])
+    else:
+        payloads = [{
+            "description": "我要測試登入功能，需要帳號密碼欄位，按下登入後導向 Dashboard",
+            "test_type": "functional",
+            "model": "gpt-4",
+            "use_cache": False
+        }]
+
+    run_benchmark(f'{base_url}/generate', payloads, requests_count, concurrency)
+
+if __name__ == '__main__':
+    main()
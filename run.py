@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 """
 TestGPT 啟動腳本
+
+批次生成：
+    python run.py bulk features.jsonl results.jsonl --model gpt-4 --concurrency 5
+以相同的輸出檔重新執行即可從中斷處續跑
 """
 
 import os
 import sys
+import argparse
 from dotenv import load_dotenv
 
 # 載入環境變數
@@ -62,8 +67,56 @@ def check_environment():
     print("✅ 環境變數設定完成")
     return True
 
+def run_bulk(argv):
+    """執行批次生成作業"""
+    parser = argparse.ArgumentParser(prog='run.py bulk', description='批次生成測試用例')
+    parser.add_argument('input', help='功能描述檔（JSONL 或 CSV）')
+    parser.add_argument('output', help='結果輸出檔（JSONL，同時作為續跑檢查點）')
+    parser.add_argument('--model', default='gpt-4', help='預設模型')
+    parser.add_argument('--concurrency', type=int, default=5, help='工作執行緒數')
+    parser.add_argument('--no-cache', action='store_true', help='停用回應快取')
+    args = parser.parse_args(argv)
+
+    from src.models.ai_model_manager import AIModelManager
+    from src.generators.test_case_generator import TestCaseGenerator
+    from src.jobs.bulk_runner import BulkJob, STATUS_RUNNING, STATUS_COMPLETED
+
+    generator = TestCaseGenerator(AIModelManager())
+    job = BulkJob(
+        generator,
+        args.input,
+        args.output,
+        model=args.model,
+        concurrency=args.concurrency,
+        use_cache=not args.no_cache
+    )
+
+    print(f"📦 批次作業: {args.input} → {args.output}")
+    job.start()
+    try:
+        while True:
+            job.wait(timeout=2)
+            progress = job.get_progress()
+            print(f"   {progress['done']}/{progress['total']} ({progress['percent']}%)"
+                  f" 成功 {progress['succeeded']} 失敗 {progress['failed']} 略過 {progress['skipped']}")
+            if progress['status'] != STATUS_RUNNING and job.finished_at is not None:
+                break
+    except KeyboardInterrupt:
+        print("\n⏹️  取消中，等待進行中的項目完成...")
+        job.cancel()
+        job.wait()
+        progress = job.get_progress()
+
+    if progress['error']:
+        print(f"❌ 作業失敗: {progress['error']}")
+    return 0 if progress['status'] == STATUS_COMPLETED and progress['failed'] == 0 else 1
+
 def main():
     """主函數"""
+    if len(sys.argv) > 1 and sys.argv[1] == 'bulk':
+        sys.exit(run_bulk(sys.argv[2:]))
+    
+
     print("🚀 TestGPT - AI-driven Test Case Generator")
     print("=" * 50)
     
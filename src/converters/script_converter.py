@@ -3,34 +3,21 @@
 將測試用例轉換為可執行的 Python 測試腳本
 """
 
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List
+import os
 import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from src.generators.test_case_model import TestCase, TestCaseInput, as_test_case
+from src.converters.step_classifier import (
+    classify_step, ACTION_OPEN, ACTION_INPUT, ACTION_CLICK, ACTION_PRESS_KEY, ACTION_WAIT,
+    TARGET_USERNAME, TARGET_PASSWORD, TARGET_LOGIN, TARGET_REGISTER
+)
 
-class ScriptConverter:
-    """腳本轉換器"""
-    
-    def __init__(self):
-        self.supported_frameworks = ['pytest', 'unittest', 'selenium']
-    
-    def convert(self, 
-                test_cases: List[Dict[str, Any]], 
-                framework: str = 'pytest') -> str:
-        """轉換測試用例為測試腳本"""
-        
-        if framework not in self.supported_frameworks:
-            raise ValueError(f"不支援的測試框架: {framework}")
-        
-        if framework == 'pytest':
-            return self._convert_to_pytest(test_cases)
-        elif framework == 'unittest':
-            return self._convert_to_unittest(test_cases)
-        elif framework == 'selenium':
-            return self._convert_to_selenium(test_cases)
-    
-    def _convert_to_pytest(self, test_cases: List[Dict[str, Any]]) -> str:
-        """轉換為 Pytest 格式"""
-        
-        script = """#!/usr/bin/env python3
+PYTEST_HEADER = """#!/usr/bin/env python3
 \"\"\"
 自動生成的測試腳本
 使用 Pytest 框架
@@ -56,16 +43,8 @@ class TestGeneratedCases:
         self.driver.quit()
     
 """
-        
-        for i, test_case in enumerate(test_cases):
-            script += self._generate_pytest_method(test_case, i)
-        
-        return script
-    
-    def _convert_to_unittest(self, test_cases: List[Dict[str, Any]]) -> str:
-        """轉換為 unittest 格式"""
-        
-        script = """#!/usr/bin/env python3
+
+UNITTEST_HEADER = """#!/usr/bin/env python3
 \"\"\"
 自動生成的測試腳本
 使用 unittest 框架
@@ -92,21 +71,13 @@ class TestGeneratedCases(unittest.TestCase):
         self.driver.quit()
     
 """
-        
-        for i, test_case in enumerate(test_cases):
-            script += self._generate_unittest_method(test_case, i)
-        
-        script += """
+
+UNITTEST_FOOTER = """
 if __name__ == '__main__':
     unittest.main()
 """
-        
-        return script
-    
-    def _convert_to_selenium(self, test_cases: List[Dict[str, Any]]) -> str:
-        """轉換為 Selenium 格式"""
-        
-        script = """#!/usr/bin/env python3
+
+SELENIUM_HEADER = """#!/usr/bin/env python3
 \"\"\"
 自動生成的 Selenium 測試腳本
 \"\"\"
@@ -125,129 +96,219 @@ def run_tests():
     
     try:
 """
-        
-        for i, test_case in enumerate(test_cases):
-            script += self._generate_selenium_function(test_case, i)
-        
-        script += """
+
+SELENIUM_FOOTER = """
     finally:
         driver.quit()
 
 if __name__ == '__main__':
     run_tests()
 """
+
+# 轉換邏輯或腳本樣板變更時遞增，使先前快取的片段失效
+CONVERTER_VERSION = '3'
+
+def _literal(value: str) -> str:
+    """將值轉為生成腳本中的雙引號字串常值"""
+    return json.dumps(value, ensure_ascii=False)
+
+class ScriptConverter:
+    """腳本轉換器"""
+    
+    def __init__(self, cache_size: int = 2048):
+        self.supported_frameworks = ['pytest', 'unittest', 'selenium']
+        # 同一步驟文字產生的程式碼相同，依步驟文字快取
+        self._render_step = lru_cache(maxsize=8192)(self._convert_step_to_selenium)
+        # 每個測試用例轉換後的片段依內容雜湊快取，修改少數用例後重新轉換只需重新產生變動的部分
+        self.cache_size = cache_size
+        self._fragments: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+        self._renderers = {
+            'pytest': self._generate_pytest_method,
+            'unittest': self._generate_unittest_method,
+            'selenium': self._generate_selenium_function
+        }
+    
+    @classmethod
+    def from_env(cls) -> 'ScriptConverter':
+        """依環境變數建立腳本轉換器（CONVERT_CACHE_SIZE=0 停用片段快取）"""
+        return cls(int(os.getenv('CONVERT_CACHE_SIZE', 2048)))
+    
+    def convert(self, 
+                test_cases: Iterable[TestCaseInput], 
+                framework: str = 'pytest') -> str:
+        """轉換測試用例為測試腳本"""
+        return ''.join(self.convert_iter(test_cases, framework))
+    
+    def convert_iter(self,
+                     test_cases: Iterable[TestCaseInput],
+                     framework: str = 'pytest') -> Iterator[str]:
+        """逐段產生測試腳本（檔頭、每個測試用例、檔尾各一段），用例逐一解碼與轉換，記憶體用量不隨腳本長度增加"""
+        
+        if framework not in self.supported_frameworks:
+            raise ValueError(f"不支援的測試框架: {framework}")
         
-        return script
+        test_cases = (as_test_case(test_case) for test_case in test_cases)
+        
+        if framework == 'pytest':
+            return self._convert_to_pytest(test_cases)
+        elif framework == 'unittest':
+            return self._convert_to_unittest(test_cases)
+        elif framework == 'selenium':
+            return self._convert_to_selenium(test_cases)
+    
+    def _convert_to_pytest(self, test_cases: Iterable[TestCase]) -> Iterator[str]:
+        """轉換為 Pytest 格式"""
+        yield PYTEST_HEADER
+        for i, test_case in enumerate(test_cases):
+            yield self._render_case('pytest', test_case, i)
+    
+    def _convert_to_unittest(self, test_cases: Iterable[TestCase]) -> Iterator[str]:
+        """轉換為 unittest 格式"""
+        yield UNITTEST_HEADER
+        for i, test_case in enumerate(test_cases):
+            yield self._render_case('unittest', test_case, i)
+        yield UNITTEST_FOOTER
+    
+    def _convert_to_selenium(self, test_cases: Iterable[TestCase]) -> Iterator[str]:
+        """轉換為 Selenium 格式"""
+        yield SELENIUM_HEADER
+        for i, test_case in enumerate(test_cases):
+            yield self._render_case('selenium', test_case, i)
+        yield SELENIUM_FOOTER
+    
+    @staticmethod
+    def _fragment_key(framework: str, test_case: TestCase, index: int) -> bytes:
+        """以轉換器版本、框架與用例內容計算片段快取鍵（未命名的用例以序號產生方法名稱，需納入序號）"""
+        content = '\x1f'.join((
+            CONVERTER_VERSION,
+            framework,
+            test_case.title or f'#{index}',
+            test_case.description,
+            test_case.type,
+            test_case.priority,
+            test_case.expected_result,
+            '\x1e'.join(test_case.steps)
+        ))
+        return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+    
+    def _render_case(self, framework: str, test_case: TestCase, index: int) -> str:
+        """轉換單一測試用例，優先使用快取的片段"""
+        render = self._renderers[framework]
+        if self.cache_size <= 0:
+            return render(test_case, index)
+        
+        key = self._fragment_key(framework, test_case, index)
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.stats['hits'] += 1
+                return fragment
+            self.stats['misses'] += 1
+        
+        fragment = render(test_case, index)
+        with self._lock:
+            self._fragments[key] = fragment
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.cache_size:
+                self._fragments.popitem(last=False)
+                self.stats['evictions'] += 1
+        return fragment
     
-    def _generate_pytest_method(self, test_case: Dict[str, Any], index: int) -> str:
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """取得片段快取統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size'] = len(self._fragments)
+        stats['capacity'] = self.cache_size
+        return stats
+    
+    def _generate_pytest_method(self, test_case: TestCase, index: int) -> str:
         """生成 Pytest 測試方法"""
         
-        method_name = self._sanitize_method_name(test_case.get('title', f'test_case_{index}'))
+        method_name = self._sanitize_method_name(test_case.title or f'test_case_{index}')
         
-        script = f"""
+        parts = [f"""
     def test_{method_name}(self):
         \"\"\"
-        {test_case.get('description', '測試用例')}
-        類型: {test_case.get('type', 'unknown')}
-        優先級: {test_case.get('priority', 'medium')}
+        {test_case.description or '測試用例'}
+        類型: {test_case.type or 'unknown'}
+        優先級: {test_case.priority or 'medium'}
         \"\"\"
         try:
-"""
-        
-        # 添加測試步驟
-        steps = test_case.get('steps', [])
-        if not steps:
-            # 如果沒有步驟，根據類型生成基本步驟
-            steps = self._generate_default_steps(test_case)
-        
-        for step in steps:
-            script += f"            # {step}\n"
-            script += self._convert_step_to_selenium(step)
-        
-        # 添加預期結果驗證
-        expected_result = test_case.get('expected_result', '')
-        if expected_result:
-            script += f"            # 驗證預期結果: {expected_result}\n"
-            script += self._generate_assertion(expected_result)
-        
-        script += """
+"""]
+        self._append_body(parts, test_case)
+        parts.append("""
         except Exception as e:
             pytest.fail(f"測試失敗: {{e}}")
-"""
+""")
         
-        return script
+        return ''.join(parts)
     
-    def _generate_unittest_method(self, test_case: Dict[str, Any], index: int) -> str:
+    def _generate_unittest_method(self, test_case: TestCase, index: int) -> str:
         """生成 unittest 測試方法"""
         
-        method_name = self._sanitize_method_name(test_case.get('title', f'test_case_{index}'))
+        method_name = self._sanitize_method_name(test_case.title or f'test_case_{index}')
         
-        script = f"""
+        parts = [f"""
     def test_{method_name}(self):
         \"\"\"
-        {test_case.get('description', '測試用例')}
-        類型: {test_case.get('type', 'unknown')}
-        優先級: {test_case.get('priority', 'medium')}
+        {test_case.description or '測試用例'}
+        類型: {test_case.type or 'unknown'}
+        優先級: {test_case.priority or 'medium'}
         \"\"\"
         try:
-"""
-        
-        # 添加測試步驟
-        steps = test_case.get('steps', [])
-        if not steps:
-            steps = self._generate_default_steps(test_case)
-        
-        for step in steps:
-            script += f"            # {step}\n"
-            script += self._convert_step_to_selenium(step)
-        
-        # 添加預期結果驗證
-        expected_result = test_case.get('expected_result', '')
-        if expected_result:
-            script += f"            # 驗證預期結果: {expected_result}\n"
-            script += self._generate_assertion(expected_result)
-        
-        script += """
+"""]
+        self._append_body(parts, test_case)
+        parts.append("""
         except Exception as e:
             self.fail(f"測試失敗: {{e}}")
-"""
+""")
         
-        return script
+        return ''.join(parts)
     
-    def _generate_selenium_function(self, test_case: Dict[str, Any], index: int) -> str:
+    def _generate_selenium_function(self, test_case: TestCase, index: int) -> str:
         """生成 Selenium 測試函數"""
         
-        function_name = self._sanitize_method_name(test_case.get('title', f'test_case_{index}'))
-        
-        script = f"""
-        # {test_case.get('description', '測試用例')}
-        # 類型: {test_case.get('type', 'unknown')}
-        # 優先級: {test_case.get('priority', 'medium')}
+        parts = [f"""
+        # {test_case.description or '測試用例'}
+        # 類型: {test_case.type or 'unknown'}
+        # 優先級: {test_case.priority or 'medium'}
         try:
-"""
+"""]
+        self._append_body(parts, test_case)
+        parts.append("""
+            print(f"✅ {test_case.get('title', '測試用例')} - 通過")
+        except Exception as e:
+            print(f"❌ {test_case.get('title', '測試用例')} - 失敗: {{e}}")
+""")
+        
+        return ''.join(parts)
+    
+    def _append_body(self, parts: List[str], test_case: TestCase):
+        """加入測試步驟與預期結果驗證"""
         
         # 添加測試步驟
-        steps = test_case.get('steps', [])
+        steps = test_case.steps
         if not steps:
+            # 如果沒有步驟，根據類型生成基本步驟
             steps = self._generate_default_steps(test_case)
         
         for step in steps:
-            script += f"            # {step}\n"
-            script += self._convert_step_to_selenium(step)
+            parts.append(f"            # {step}\n")
+            parts.append(self._render_step(step))
         
         # 添加預期結果驗證
-        expected_result = test_case.get('expected_result', '')
+        expected_result = test_case.expected_result
         if expected_result:
-            script += f"            # 驗證預期結果: {expected_result}\n"
-            script += self._generate_assertion(expected_result)
-        
-        script += """
-            print(f"✅ {test_case.get('title', '測試用例')} - 通過")
-        except Exception as e:
-            print(f"❌ {test_case.get('title', '測試用例')} - 失敗: {{e}}")
-"""
-        
-        return script
+            parts.append(f"            # 驗證預期結果: {expected_result}\n")
+            parts.append(self._generate_assertion(expected_result))
     
     def _sanitize_method_name(self, name: str) -> str:
         """清理方法名稱，使其符合 Python 命名規範"""
@@ -261,10 +322,10 @@ if __name__ == '__main__':
             sanitized = 'test' + sanitized
         return sanitized.lower()
     
-    def _generate_default_steps(self, test_case: Dict[str, Any]) -> List[str]:
+    def _generate_default_steps(self, test_case: TestCase) -> List[str]:
         """根據測試類型生成預設步驟"""
-        test_type = test_case.get('type', 'positive')
-        title = test_case.get('title', '').lower()
+        test_type = test_case.type or 'positive'
+        title = test_case.title.lower()
         
         if '登入' in title or 'login' in title:
             if test_type == 'positive':
@@ -301,38 +362,43 @@ if __name__ == '__main__':
             ]
     
     def _convert_step_to_selenium(self, step: str) -> str:
-        """將測試步驟轉換為 Selenium 代碼"""
+        """將測試步驟轉換為 Selenium 代碼（依共用步驟分類器的結果產生）"""
         
-        step_lower = step.lower()
+        action = classify_step(step)
         
-        if '打開' in step or 'open' in step:
+        if action.action == ACTION_OPEN:
             return """            self.driver.get("http://localhost:3000")  # 請修改為實際的測試URL
             time.sleep(1)
 """
-        elif '輸入' in step or 'input' in step:
-            if '用戶名' in step or 'username' in step:
-                return """            username_input = self.driver.find_element(By.ID, "username")
+        elif action.action == ACTION_INPUT:
+            if action.target == TARGET_USERNAME:
+                return f"""            username_input = self.driver.find_element(By.ID, "username")
             username_input.clear()
-            username_input.send_keys("testuser")
+            username_input.send_keys({_literal(action.value or 'testuser')})
 """
-            elif '密碼' in step or 'password' in step:
-                return """            password_input = self.driver.find_element(By.ID, "password")
+            elif action.target == TARGET_PASSWORD:
+                return f"""            password_input = self.driver.find_element(By.ID, "password")
             password_input.clear()
-            password_input.send_keys("testpass")
+            password_input.send_keys({_literal(action.value or 'testpass')})
+"""
+            elif action.field:
+                return f"""            input_element = self.driver.find_element(By.ID, {_literal(action.field)})
+            input_element.clear()
+            input_element.send_keys({_literal(action.value or 'test_input')})
 """
             else:
-                return """            # 請根據實際情況修改元素定位
+                return f"""            # 請根據實際情況修改元素定位
             input_element = self.driver.find_element(By.ID, "input_field")
             input_element.clear()
-            input_element.send_keys("test_input")
+            input_element.send_keys({_literal(action.value or 'test_input')})
 """
-        elif '點擊' in step or 'click' in step:
-            if '登入' in step or 'login' in step:
+        elif action.action == ACTION_CLICK:
+            if action.target == TARGET_LOGIN:
                 return """            login_button = self.driver.find_element(By.ID, "login-button")
             login_button.click()
             time.sleep(2)
 """
-            elif '註冊' in step or 'register' in step:
+            elif action.target == TARGET_REGISTER:
                 return """            register_button = self.driver.find_element(By.ID, "register-button")
             register_button.click()
             time.sleep(2)
@@ -342,6 +408,12 @@ if __name__ == '__main__':
             button = self.driver.find_element(By.ID, "button")
             button.click()
             time.sleep(1)
+"""
+        elif action.action == ACTION_PRESS_KEY:
+            return """            self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ENTER)
+"""
+        elif action.action == ACTION_WAIT:
+            return """            time.sleep(2)
 """
         else:
             return """            # 請根據實際情況實現此步驟
@@ -0,0 +1,158 @@
+"""
+測試步驟分類器
+以 Aho-Corasick 自動機一次掃描步驟文字，比對中英文關鍵字後轉成動作描述（StepAction），
+並依步驟文字快取結果，供腳本轉換器與測試執行器共用，確保兩者對同一步驟的判斷一致
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# 動作種類；同一步驟命中多種動作時取最先出現的關鍵字，位置相同時依此處順序
+ACTION_PRESS_KEY = 'press_key'
+ACTION_OPEN = 'open'
+ACTION_INPUT = 'input'
+ACTION_CLICK = 'click'
+ACTION_VERIFY = 'verify'
+ACTION_WAIT = 'wait'
+ACTION_GENERIC = 'generic'
+
+ACTION_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    ACTION_PRESS_KEY: ('按 enter', 'press enter', '按下 enter'),
+    ACTION_OPEN: ('打開', '開啟', '前往', 'open', 'navigate'),
+    ACTION_INPUT: ('輸入', '填寫', 'input', 'enter', 'type'),
+    ACTION_CLICK: ('點擊', '點選', '按下', 'click', 'press'),
+    ACTION_VERIFY: ('驗證', '檢查', '確認', 'verify', 'check'),
+    ACTION_WAIT: ('等待', 'wait')
+}
+
+# 操作對象，同樣依優先順序排列
+TARGET_USERNAME = 'username'
+TARGET_PASSWORD = 'password'
+TARGET_LOGIN = 'login'
+TARGET_REGISTER = 'register'
+TARGET_SUCCESS = 'success'
+TARGET_ERROR = 'error'
+
+TARGET_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    TARGET_USERNAME: ('用戶名', '使用者名稱', 'username'),
+    TARGET_PASSWORD: ('密碼', 'password'),
+    TARGET_LOGIN: ('登入', 'login'),
+    TARGET_REGISTER: ('註冊', 'register'),
+    TARGET_SUCCESS: ('成功', 'success'),
+    TARGET_ERROR: ('錯誤', 'error')
+}
+
+# 關鍵字只在步驟開頭這段長度內比對
+_KEYWORD_SCAN_CHARS = 200
+
+_VALUE_PATTERN = re.compile(r'[:：](?!//)\s*(.+)$|「([^」]+)」|"([^"]+)"')
+# 英文欄位名稱限定長度並從單字開頭比對，避免超長步驟文字造成回溯
+_FIELD_PATTERN = re.compile(r'在\s*(\S+?)\s*欄位|\b([A-Za-z_][\w-]{0,63})\s*(?:field|欄位)')
+
+
+class StepAction(NamedTuple):
+    """步驟的動作描述：動作種類、操作對象、欄位名稱與輸入值"""
+    action: str
+    target: Optional[str] = None
+    field: Optional[str] = None
+    value: Optional[str] = None
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 多關鍵字比對自動機，一次掃描回傳每個命中標籤最早出現的位置"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]
+        for keyword, label in keywords:
+            self._add(keyword.lower(), label)
+        self._build()
+
+    def _add(self, keyword: str, label: str):
+        state = 0
+        for char in keyword:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._output[state].append((label, len(keyword)))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def search(self, text: str) -> Dict[str, int]:
+        """回傳 {標籤: 最早出現的起始位置}（text 須已轉為小寫）"""
+        found: Dict[str, int] = {}
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for label, length in output[state]:
+                start = end - length + 1
+                if start < found.get(label, start + 1):
+                    found[label] = start
+        return found
+
+
+class StepClassifier:
+    """將步驟文字轉為 StepAction，結果依步驟文字快取"""
+
+    def __init__(self, cache_size: int = 4096):
+        self._actions = {name: order for order, name in enumerate(ACTION_KEYWORDS)}
+        self._targets = {name: order for order, name in enumerate(TARGET_KEYWORDS)}
+        self._automaton = KeywordAutomaton(
+            [(keyword, name) for name, keywords in ACTION_KEYWORDS.items() for keyword in keywords] +
+            [(keyword, name) for name, keywords in TARGET_KEYWORDS.items() for keyword in keywords]
+        )
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, step: str) -> StepAction:
+        # 超長的輸入值（例如 Fuzz 資料）不必整段轉小寫與掃描
+        text = step[:_KEYWORD_SCAN_CHARS].lower()
+        found = self._automaton.search(text)
+        # 動作取最先出現的關鍵字（步驟開頭的動詞），對象取優先順序最高的
+        actions = [(start, self._actions[name], name) for name, start in found.items() if name in self._actions]
+        action = min(actions)[2] if actions else ACTION_GENERIC
+        targets = [(self._targets[name], name) for name in found if name in self._targets]
+        target = min(targets)[1] if targets else None
+
+        value = None
+        match = _VALUE_PATTERN.search(step)
+        if match:
+            value = next(group for group in match.groups() if group is not None).strip()
+        field = None
+        match = _FIELD_PATTERN.search(step)
+        if match:
+            field = match.group(1) or match.group(2)
+        return StepAction(action, target, field, value)
+
+    def get_stats(self) -> Dict[str, int]:
+        """取得快取統計"""
+        info = self.classify.cache_info()
+        return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
+
+
+step_classifier = StepClassifier()
+
+
+def classify_step(step: str) -> StepAction:
+    """以共用分類器分類步驟"""
+    return step_classifier.classify(step)
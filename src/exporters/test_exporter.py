@@ -5,7 +5,8 @@
 
 import os
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+from src.generators.test_case_model import decode_test_cases
 
 class TestExporter:
     """測試腳本匯出器"""
@@ -23,6 +24,15 @@ class TestExporter:
         
         return file_path
     
+    def export_chunks(self, chunks: Iterable[str], filename: str) -> Iterator[str]:
+        """逐段寫入匯出檔並同時轉送每一段，供串流下載使用"""
+        file_path = os.path.join(self.export_path, filename)
+        
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+    
     def export_with_metadata(self, 
                            script: str, 
                            test_cases: list,
@@ -49,13 +59,13 @@ class TestExporter:
         lines.append('測試用例摘要:')
         lines.append('"""')
         
-        for i, test_case in enumerate(test_cases, 1):
+        for i, test_case in enumerate(decode_test_cases(test_cases), 1):
             lines.append('')
-            lines.append(f'# {i}. {test_case.get("title", "未命名測試")}')
-            lines.append(f'#   類型: {test_case.get("type", "unknown")}')
-            lines.append(f'#   優先級: {test_case.get("priority", "medium")}')
-            lines.append(f'#   描述: {test_case.get("description", "無描述")}')
-            lines.append(f'#   預期結果: {test_case.get("expected_result", "無預期結果")}')
+            lines.append(f'# {i}. {test_case.title or "未命名測試"}')
+            lines.append(f'#   類型: {test_case.type or "unknown"}')
+            lines.append(f'#   優先級: {test_case.priority or "medium"}')
+            lines.append(f'#   描述: {test_case.description or "無描述"}')
+            lines.append(f'#   預期結果: {test_case.expected_result or "無預期結果"}')
         
         lines.append('')
         lines.append('"""')
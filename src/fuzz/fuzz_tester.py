@@ -6,6 +6,7 @@ Fuzz 測試器
 import random
 import string
 from typing import List, Dict, Any
+from src.generators.test_case_model import TestCase, encode_test_cases
 
 class FuzzTester:
     """Fuzz 測試器"""
@@ -29,7 +30,11 @@ class FuzzTester:
     
     def generate_fuzz_tests(self, fields: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """生成 Fuzz 測試用例"""
-        fuzz_tests = []
+        return encode_test_cases(self.generate_fuzz_cases(fields))
+    
+    def generate_fuzz_cases(self, fields: List[Dict[str, Any]]) -> List[TestCase]:
+        """生成 Fuzz 測試用例（TestCase 物件，固定的步驟與預期結果字串由所有用例共用）"""
+        fuzz_cases = []
         
         for field in fields:
             field_name = field.get('name', 'unknown_field')
@@ -37,27 +42,28 @@ class FuzzTester:
             
             # 為每個欄位生成多種 Fuzz 測試
             for pattern_name, pattern_value in self.fuzz_patterns.items():
-                test_case = {
-                    'id': f"FUZZ_{field_name}_{pattern_name}",
-                    'title': f"Fuzz 測試 - {field_name} ({pattern_name})",
-                    'description': f"對 {field_name} 欄位進行 {pattern_name} 測試",
-                    'type': 'fuzz',
-                    'field_name': field_name,
-                    'field_type': field_type,
-                    'fuzz_pattern': pattern_name,
-                    'fuzz_value': pattern_value,
-                    'steps': [
-                        f"打開測試頁面",
+                fuzz_cases.append(TestCase(
+                    title=f"Fuzz 測試 - {field_name} ({pattern_name})",
+                    steps=(
+                        "打開測試頁面",
                         f"在 {field_name} 欄位輸入異常值: {pattern_value}",
-                        f"提交表單",
-                        f"驗證系統處理異常輸入的反應"
-                    ],
-                    'expected_result': "系統應該正確處理異常輸入，不崩潰或洩露敏感資訊",
-                    'priority': 'high'
-                }
-                fuzz_tests.append(test_case)
+                        "提交表單",
+                        "驗證系統處理異常輸入的反應"
+                    ),
+                    expected_result="系統應該正確處理異常輸入，不崩潰或洩露敏感資訊",
+                    id=f"FUZZ_{field_name}_{pattern_name}",
+                    description=f"對 {field_name} 欄位進行 {pattern_name} 測試",
+                    type='fuzz',
+                    priority='high',
+                    extra={
+                        'field_name': field_name,
+                        'field_type': field_type,
+                        'fuzz_pattern': pattern_name,
+                        'fuzz_value': pattern_value
+                    }
+                ))
         
-        return fuzz_tests
+        return fuzz_cases
     
     def generate_random_fuzz_value(self, field_type: str = 'text') -> Any:
         """生成隨機 Fuzz 值"""
@@ -0,0 +1,184 @@
+"""
+近似重複測試用例去除
+以標題、步驟與預期結果的字元 shingle 計算 MinHash 簽章，透過 LSH 分桶找出候選配對，
+再以實際 Jaccard 相似度確認，數萬筆用例也能在近線性時間內完成
+"""
+
+import os
+import re
+import random
+import threading
+import zlib
+from operator import eq
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# 以簽章粗估相似度時允許的誤差，低於（門檻 - 誤差）的配對直接略過
+_ESTIMATE_MARGIN = 0.2
+
+
+def _choose_bands(num_perm: int, threshold: float, recall: float = 0.99) -> Tuple[int, int]:
+    """挑選 (bands, rows)：在門檻相似度的配對至少有 recall 機率成為候選的前提下，取每段最多列以減少誤判候選"""
+    for rows in range(num_perm, 0, -1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+class MinHashDeduplicator:
+    """以 MinHash 與 LSH 去除近似重複的測試用例"""
+
+    def __init__(self,
+                 threshold: float = 0.85,
+                 num_perm: int = 32,
+                 shingle_size: int = 3,
+                 max_candidates: int = 16,
+                 seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"相似度門檻必須介於 0 與 1 之間: {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.max_candidates = max_candidates
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+
+        generator = random.Random(seed)
+        self._mixer = (generator.randint(1, _MERSENNE_PRIME - 1), generator.randint(0, _MERSENNE_PRIME - 1))
+        self._lock = threading.Lock()
+        self.stats = {
+            'checked': 0,
+            'merged': 0
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional['MinHashDeduplicator']:
+        """依環境變數建立去重器，門檻設為 0 時停用並回傳 None"""
+        threshold = float(os.getenv('DEDUP_THRESHOLD', 0.85))
+        if threshold <= 0:
+            return None
+        return cls(threshold=threshold, num_perm=int(os.getenv('DEDUP_NUM_PERM', 32)))
+
+    def _shingles(self, test_case: Dict[str, Any]) -> Set[int]:
+        """將用例文字正規化後切成字元 shingle 並雜湊"""
+        parts = [str(test_case.get('title', ''))]
+        parts.extend(str(step) for step in test_case.get('steps', []) or [])
+        parts.append(str(test_case.get('expected_result', '')))
+        text = re.sub(r'\s+', ' ', ' '.join(parts)).strip().lower()
+
+        size = self.shingle_size
+        if len(text) <= size:
+            return {zlib.crc32(text.encode('utf-8'))}
+        return {zlib.crc32(text[i:i + size].encode('utf-8')) for i in range(len(text) - size + 1)}
+
+    def _signature(self, shingles: Set[int]) -> List[int]:
+        """單次排列雜湊（one permutation hashing）：每個 shingle 只雜湊一次並分配至各槽取最小值，
+        空槽以右側最近的非空槽補齊，成本與 shingle 數量成線性而非乘上排列數"""
+        num_perm = self.num_perm
+        a, b = self._mixer
+        bins: List[Optional[int]] = [None] * num_perm
+        for value in shingles:
+            mixed = (a * value + b) % _MERSENNE_PRIME
+            slot, rank = mixed % num_perm, mixed // num_perm
+            current = bins[slot]
+            if current is None or rank < current:
+                bins[slot] = rank
+
+        filled = [index for index, value in enumerate(bins) if value is not None]
+        if len(filled) < num_perm:
+            for index in range(num_perm):
+                if bins[index] is None:
+                    distance = 1
+                    while bins[(index + distance) % num_perm] is None:
+                        distance += 1
+                    # 補值加上距離，避免不同空槽取得相同值而誤判相似
+                    bins[index] = bins[(index + distance) % num_perm] + distance * (_MERSENNE_PRIME // num_perm)
+        return bins
+
+    def dedupe(self, test_cases: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """去除近似重複的用例，保留每組中最先出現者，回傳 (保留的用例, 合併報告)"""
+        parents = list(range(len(test_cases)))
+        similarities: Dict[int, float] = {}
+
+        def find(index: int) -> int:
+            while parents[index] != index:
+                parents[index] = parents[parents[index]]
+                index = parents[index]
+            return index
+
+        def union(left: int, right: int, similarity: float):
+            keep, drop = min(left, right), max(left, right)
+            parents[drop] = keep
+            similarities[drop] = similarity
+
+        # 內容完全相同的用例直接合併，只有不同的內容才進入 LSH
+        shingle_sets = [self._shingles(test_case) for test_case in test_cases]
+        unique: Dict[frozenset, int] = {}
+        signatures: Dict[int, List[int]] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        for index, shingles in enumerate(shingle_sets):
+            key = frozenset(shingles)
+            if key in unique:
+                union(unique[key], index, 1.0)
+                continue
+            unique[key] = index
+            signature = self._signature(shingles)
+            signatures[index] = signature
+            for band in range(self.bands):
+                band_key = (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+                buckets.setdefault(band_key, []).append(index)
+
+        # 同桶的候選以實際 Jaccard 相似度確認；每個成員最多與桶內前 max_candidates 個成員比對，
+        # 避免內容相近的大桶退化為平方時間；已在同一組的配對不再比對
+        estimate_floor = (self.threshold - _ESTIMATE_MARGIN) * self.num_perm
+        for members in buckets.values():
+            for position in range(1, len(members)):
+                right = members[position]
+                for left in members[max(0, position - self.max_candidates):position]:
+                    root_left, root_right = find(left), find(right)
+                    if root_left == root_right:
+                        continue
+                    a, b = shingle_sets[left], shingle_sets[right]
+                    # 集合大小差距過大時 Jaccard 不可能達到門檻
+                    if min(len(a), len(b)) < self.threshold * max(len(a), len(b)):
+                        continue
+                    # 先以簽章一致比例粗估相似度，明顯不足者不計算實際交集
+                    if sum(map(eq, signatures[left], signatures[right])) < estimate_floor:
+                        continue
+                    overlap = len(a & b)
+                    similarity = overlap / (len(a) + len(b) - overlap)
+                    if similarity >= self.threshold:
+                        union(root_left, root_right, similarity)
+
+        groups: Dict[int, List[int]] = {}
+        for index in range(len(test_cases)):
+            groups.setdefault(find(index), []).append(index)
+
+        kept = []
+        report = []
+        for root in sorted(groups):
+            kept.append(test_cases[root])
+            merged = groups[root][1:]
+            if merged:
+                report.append({
+                    'kept': test_cases[root].get('id', root),
+                    'title': test_cases[root].get('title', ''),
+                    'merged': [test_cases[index].get('id', index) for index in merged],
+                    'similarity': round(min(similarities.get(index, 1.0) for index in merged), 3)
+                })
+
+        with self._lock:
+            self.stats['checked'] += len(test_cases)
+            self.stats['merged'] += len(test_cases) - len(kept)
+        return kept, report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得去重統計"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['threshold'] = self.threshold
+        stats['bands'] = self.bands
+        stats['rows'] = self.rows
+        return stats
@@ -0,0 +1,146 @@
+"""
+少樣本範例檢索
+以 BM25 為各模板中已採用的測試用例建立本地索引，為新的功能描述找出最相似的用例，
+在 token 預算內以精簡 JSON 內嵌到 prompt 作為範例
+"""
+
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Any, Tuple
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+|[一-鿿]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """英數字以單字、中文以連續字元的雙字組切分"""
+    tokens = []
+    for run in _WORD_PATTERN.findall(text.lower()):
+        if run[0].isascii():
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class _TemplateIndex:
+    """單一模板的 BM25 倒排索引"""
+
+    def __init__(self):
+        self.documents: List[Tuple[Dict[str, Any], int]] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.total_length = 0
+
+    def add(self, text: str, test_case: Dict[str, Any]):
+        counts = Counter(tokenize(text))
+        doc_id = len(self.documents)
+        length = sum(counts.values())
+        self.documents.append((test_case, length))
+        self.total_length += length
+        for term, frequency in counts.items():
+            self.postings.setdefault(term, []).append((doc_id, frequency))
+
+    def search(self, query: str, k: int, k1: float, b: float) -> List[Tuple[float, Dict[str, Any]]]:
+        if not self.documents:
+            return []
+        count = len(self.documents)
+        average_length = self.total_length / count or 1
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings:
+                length = self.documents[doc_id][1]
+                norm = frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, self.documents[doc_id][0]) for doc_id, score in ranked]
+
+
+class ExampleIndex:
+    """已採用測試用例的檢索索引，依模板分開建立，採用紀錄以 JSONL 保存"""
+
+    def __init__(self, path: Optional[str] = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._indexes: Dict[str, _TemplateIndex] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'searches': 0,
+            'hits': 0
+        }
+        if path and os.path.exists(path):
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> 'ExampleIndex':
+        """依環境變數建立範例索引"""
+        return cls(os.getenv('FEW_SHOT_STORE_PATH', './examples/accepted.jsonl'))
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._index(record['template'], record['description'], record['test_cases'])
+
+    def _index(self, template: str, description: str, test_cases: List[Dict[str, Any]]):
+        index = self._indexes.setdefault(template, _TemplateIndex())
+        for test_case in test_cases:
+            steps = ' '.join(str(step) for step in test_case.get('steps', []) or [])
+            index.add(f"{description} {test_case.get('title', '')} {steps}", test_case)
+
+    def add(self, template: str, description: str, test_cases: List[Dict[str, Any]]):
+        """加入已採用的用例並寫入採用紀錄"""
+        with self._lock:
+            self._index(template, description, test_cases)
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                record = {'template': template, 'description': description, 'test_cases': test_cases}
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def search(self, template: str, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """取得與查詢最相似的 k 個已採用用例"""
+        with self._lock:
+            index = self._indexes.get(template)
+            results = index.search(query, k, self.k1, self.b) if index else []
+            self.stats['searches'] += 1
+            if results:
+                self.stats['hits'] += 1
+        return [test_case for _, test_case in results]
+
+    def format_examples(self, test_cases: List[Dict[str, Any]], token_budget: int) -> str:
+        """將範例精簡為單行 JSON，在 token 預算內盡量放入（以每 2 字元約 1 token 粗估）"""
+        lines = []
+        used = 0
+        seen = set()
+        for test_case in test_cases:
+            compact = {key: test_case[key] for key in ('title', 'steps', 'expected_result', 'priority') if key in test_case}
+            if compact.get('title') in seen:
+                continue
+            line = json.dumps(compact, ensure_ascii=False, separators=(',', ':'))
+            cost = len(line) // 2 + 1
+            if used + cost > token_budget:
+                break
+            seen.add(compact.get('title'))
+            lines.append(line)
+            used += cost
+        return '\n'.join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得檢索統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['templates'] = {name: len(index.documents) for name, index in self._indexes.items()}
+        return stats
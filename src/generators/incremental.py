@@ -0,0 +1,107 @@
+"""
+增量重新生成
+保存每個測試套件上一次的功能描述與用例，描述修改後以句子為單位比對差異，
+只針對變動的句子請模型生成用例，未受影響的用例保留原本的 ID
+"""
+
+import os
+import re
+import json
+import difflib
+import threading
+from typing import Dict, List, Optional, Any, Set, Tuple
+
+_SENTENCE_PATTERN = re.compile(r'[^。！？!?\n]+[。！？!?]?')
+_ID_PATTERN = re.compile(r'^(.*?)(\d+)$')
+
+
+def split_sentences(text: str) -> List[str]:
+    """將功能描述切成句子（以中英文句號、問號、驚嘆號與換行分隔）"""
+    return [sentence.strip() for sentence in _SENTENCE_PATTERN.findall(text) if sentence.strip()]
+
+
+def diff_sentences(old: List[str], new: List[str]) -> Tuple[Set[int], List[int]]:
+    """比對新舊句子，回傳 (被修改或刪除的舊句索引, 新增或修改後的新句索引)"""
+    removed: Set[int] = set()
+    added: List[int] = []
+    matcher = difflib.SequenceMatcher(a=old, b=new, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == 'equal':
+            continue
+        removed.update(range(old_start, old_end))
+        added.extend(range(new_start, new_end))
+    return removed, added
+
+
+def _bigrams(text: str) -> Set[str]:
+    text = re.sub(r'\s+', '', text.lower())
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def _case_text(test_case: Dict[str, Any]) -> str:
+    parts = [str(test_case.get('title', '')), str(test_case.get('description', ''))]
+    parts.extend(str(step) for step in test_case.get('steps', []) or [])
+    parts.append(str(test_case.get('expected_result', '')))
+    return ' '.join(parts)
+
+
+def find_affected(test_cases: List[Dict[str, Any]], sentences: List[str], changed: Set[int]) -> Set[int]:
+    """找出主要對應到已修改或刪除句子的用例索引（依字元 bigram 重疊度判斷用例來源句）"""
+    if not changed:
+        return set()
+    sentence_grams = [_bigrams(sentence) for sentence in sentences]
+    affected = set()
+    for index, test_case in enumerate(test_cases):
+        case_grams = _bigrams(_case_text(test_case))
+        scores = [len(case_grams & grams) / len(grams) for grams in sentence_grams]
+        best = max(scores, default=0.0)
+        # 與任何句子都沒有重疊的用例視為整體性用例，予以保留
+        if best > 0 and scores.index(best) in changed:
+            affected.add(index)
+    return affected
+
+
+def next_ids(test_cases: List[Dict[str, Any]], count: int) -> List[str]:
+    """接續現有用例的最大編號產生新 ID"""
+    prefix, width, highest = 'TC', 3, 0
+    for test_case in test_cases:
+        match = _ID_PATTERN.match(str(test_case.get('id', '')))
+        if match and int(match.group(2)) >= highest:
+            prefix, width, highest = match.group(1) or prefix, len(match.group(2)), int(match.group(2))
+    return [f"{prefix}{highest + offset:0{width}d}" for offset in range(1, count + 1)]
+
+
+class SuiteStore:
+    """以 JSON 檔保存各測試套件最近一次的描述與用例"""
+
+    def __init__(self, directory: str = './suites'):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'SuiteStore':
+        """依環境變數建立套件儲存"""
+        return cls(os.getenv('SUITE_STORE_DIR', './suites'))
+
+    def _path(self, suite_id: str) -> str:
+        if not re.fullmatch(r'[\w-]+', suite_id):
+            raise ValueError(f"無效的套件 ID: {suite_id}")
+        return os.path.join(self.directory, f'{suite_id}.json')
+
+    def get(self, suite_id: str) -> Optional[Dict[str, Any]]:
+        """取得套件紀錄，不存在時回傳 None"""
+        path = self._path(suite_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save(self, suite_id: str, record: Dict[str, Any]):
+        """寫入套件紀錄（先寫暫存檔再替換，避免中斷時留下不完整的檔案）"""
+        path = self._path(suite_id)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(temp_path, path)
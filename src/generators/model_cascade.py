@@ -0,0 +1,97 @@
+"""
+模型串接（cascade）
+先以最便宜、最快的模型生成，輸出未通過驗證時才逐級升級到較大的模型
+"""
+
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from src.generators.test_case_schema import validate_test_cases
+from src.models.rate_limiter import PRIORITY_INTERACTIVE
+
+CASCADE_MODEL = 'cascade'
+
+# 由便宜到昂貴排列
+DEFAULT_CASCADE_MODELS = ['llama3-8b-8192', 'llama3-70b-8192', 'gpt-3.5-turbo', 'gpt-4']
+
+
+class ModelCascade:
+    """模型串接執行器"""
+
+    def __init__(self,
+                 ai_manager,
+                 models: Optional[List[str]] = None,
+                 validator: Callable[[Optional[List[Dict[str, Any]]]], List[str]] = validate_test_cases):
+        self.ai_manager = ai_manager
+        self.models = models or DEFAULT_CASCADE_MODELS
+        self.validator = validator
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_env(cls, ai_manager) -> 'ModelCascade':
+        """依環境變數建立串接器"""
+        models = os.getenv('CASCADE_MODELS')
+        return cls(ai_manager, [model.strip() for model in models.split(',')] if models else None)
+
+    def get_models(self) -> List[str]:
+        """取得目前可用的串接模型，皆不可用時使用示範模型"""
+        models = [model for model in self.models if self.ai_manager.has_client(model)]
+        return models or ['demo-model']
+
+    def run(self,
+            prompt: str,
+            parse: Callable[[str], Optional[List[Dict[str, Any]]]],
+            stats_key: str,
+            use_cache: bool = True,
+            start_level: int = 0,
+            priority: str = PRIORITY_INTERACTIVE) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+        """依序嘗試各模型，回傳第一個通過驗證的結果與其模型；全部失敗時回傳 (None, 最後回應)"""
+        last_response = ''
+        models = self.get_models()
+
+        for level, model in enumerate(models):
+            if level < start_level:
+                continue
+            try:
+                # 不經路由器切換等效模型，確保由便宜到昂貴逐級升級且統計記在正確的模型
+                response = self.ai_manager.generate_response(
+                    prompt, model, use_cache=use_cache, priority=priority, route=False
+                )
+            except Exception:
+                continue
+            last_response = response
+
+            test_cases = parse(response)
+            if not self.validator(test_cases):
+                self.record(stats_key, level, model)
+                return test_cases, model
+
+        self.record(stats_key, len(models), None)
+        return None, last_response
+
+    def record(self, stats_key: str, level: int, model: Optional[str]):
+        """記錄每個模板／測試類型的升級情況"""
+        with self._lock:
+            stats = self.stats.setdefault(stats_key, {
+                'requests': 0,
+                'escalations': 0,
+                'failures': 0,
+                'models': {}
+            })
+            stats['requests'] += 1
+            if level > 0:
+                stats['escalations'] += 1
+            if model is None:
+                stats['failures'] += 1
+            else:
+                stats['models'][model] = stats['models'].get(model, 0) + 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """取得升級率統計"""
+        with self._lock:
+            result = {}
+            for key, stats in self.stats.items():
+                result[key] = dict(stats, models=dict(stats['models']))
+                result[key]['escalation_rate'] = stats['escalations'] / stats['requests']
+            return result
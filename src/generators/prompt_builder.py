@@ -0,0 +1,202 @@
+"""
+Prompt 組裝器
+將不變的指示與 JSON 格式說明預先組成固定前綴，並依（模板, 測試類型）快取，
+使用者的功能描述一律放在最後，讓供應商端的 prompt 前綴快取得以命中
+"""
+
+import threading
+from typing import Dict, Any, Tuple
+
+DEFAULT_TEMPLATE = 'default'
+DEFAULT_TEST_TYPE = 'functional'
+
+_JSON_FORMAT = """請以 JSON 格式回應，格式如下：
+{{
+    "test_cases": [
+        {{
+            "id": "TC001",
+            "title": "具體的測試標題",
+            "description": "詳細的測試描述，包含測試目的和背景",
+            "type": "positive|negative|boundary|exception",{extra_fields}
+            "steps": [
+                "具體的步驟描述（不要包含編號）",
+                "具體的步驟描述（不要包含編號）",
+                "具體的步驟描述（不要包含編號）"
+            ],
+            "expected_result": "具體可驗證的預期結果",
+            "priority": "high|medium|low",
+            "business_impact": "對業務的影響程度",
+            "risk_level": "風險等級"
+        }}
+    ]
+}}
+
+**重要提醒：**
+- 步驟描述中不要包含編號（如 "1."、"2." 等）
+- 前端會自動為步驟添加編號
+- 請直接描述步驟內容，例如："Navigate to the payment page" 而不是 "1. Navigate to the payment page"
+"""
+
+_DEFAULT_HEADER = """
+作為一個專業的軟體測試工程師，請為文末的功能描述生成高品質的測試用例。
+
+**要求：**
+1. 測試用例必須具體且可執行
+2. 每個測試步驟都要明確且可驗證
+3. 預期結果要量化且可測量
+4. 優先級要根據業務影響程度設定
+5. 測試用例要涵蓋正常流程、異常處理、邊界條件
+
+**測試用例格式要求：**
+- 標題：簡潔明確，包含測試目標
+- 描述：詳細說明測試目的和背景
+- 步驟：具體可執行的操作步驟
+- 預期結果：可驗證的具體結果
+- 優先級：根據業務重要性和風險程度
+
+"""
+
+_DEFAULT_FOOTER = """
+請確保生成的測試用例：
+1. 描述精確且無歧義
+2. 步驟具體且可重複執行
+3. 預期結果可測量且可驗證
+4. 涵蓋所有重要的功能點
+5. 考慮各種可能的異常情況
+"""
+
+# 依測試類型提供的具體指導
+TEST_TYPE_GUIDANCE = {
+    'functional': """
+- 重點：功能正確性測試
+- 確保所有功能點都有對應的測試用例
+- 包含正常流程和異常流程
+- 驗證業務邏輯的正確性
+""",
+    'security': """
+- 重點：安全性測試
+- 包含輸入驗證、權限檢查、資料保護
+- 測試 SQL 注入、XSS、CSRF 等安全漏洞
+- 驗證身份驗證和授權機制
+""",
+    'performance': """
+- 重點：效能測試
+- 包含響應時間、吞吐量、資源使用率
+- 測試在不同負載下的表現
+- 驗證效能瓶頸和優化點
+""",
+    'usability': """
+- 重點：可用性測試
+- 包含用戶體驗、易用性、可訪問性
+- 測試界面友好性和操作直觀性
+- 驗證用戶工作流程的順暢性
+"""
+}
+
+_TEMPLATE_HEADER = """
+作為一個專業的軟體測試工程師，請使用「{name}」模板為文末的功能描述生成高品質的測試用例。
+
+**模板資訊：**
+- 模板名稱：{name}
+- 模板描述：{description}
+- 重點測試領域：{focus_areas}
+- 常見測試場景：{common_scenarios}
+
+**要求：**
+1. 測試用例必須符合 {name} 的特點
+2. 重點關注 {focus_areas}
+3. 包含 {common_scenarios} 相關測試
+4. 每個測試步驟都要具體且可執行
+5. 預期結果要量化且可測量
+
+"""
+
+_TEMPLATE_FOOTER = """
+請確保生成的測試用例：
+1. 符合 {name} 的測試特點
+2. 涵蓋所有重要的功能點
+3. 考慮各種可能的異常情況
+4. 描述精確且無歧義
+5. 步驟具體且可重複執行
+"""
+
+_TEST_TYPE_LINE = """
+**測試類型：** {test_type}
+"""
+
+_EXAMPLES = """
+**參考範例（過去採用的相似測試用例，請參考其粒度與寫法，不要照抄）：**
+{examples}
+"""
+
+_INSTRUCTIONS = """
+**補充說明：**
+{instructions}
+"""
+
+_SUFFIX = """
+**功能描述：**
+{description}
+"""
+
+
+class PromptBuilder:
+    """以快取的固定前綴組裝測試用例生成 prompt"""
+
+    def __init__(self, templates: Dict[str, Dict[str, Any]]):
+        self.templates = templates
+        self._prefixes: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    def _render_prefix(self, template_name: str, test_type: str) -> str:
+        """組出（模板, 測試類型）對應的不變前綴"""
+        if template_name == DEFAULT_TEMPLATE:
+            prefix = _DEFAULT_HEADER + _JSON_FORMAT.format(extra_fields='')
+            prefix += '\n**特殊要求：**\n' + TEST_TYPE_GUIDANCE.get(test_type, '')
+            return prefix + _DEFAULT_FOOTER
+
+        template = self.templates[template_name]
+        fields = {
+            'name': template['name'],
+            'description': template['description'],
+            'focus_areas': ', '.join(template['focus_areas']),
+            'common_scenarios': ', '.join(template['common_scenarios'])
+        }
+        extra_fields = '\n            "template_focus": "對應的模板重點領域",'
+        return (_TEMPLATE_HEADER.format(**fields)
+                + _JSON_FORMAT.format(extra_fields=extra_fields)
+                + _TEMPLATE_FOOTER.format(**fields))
+
+    def get_prefix(self, template_name: str, test_type: str) -> str:
+        """取得快取的不變前綴；測試類型來自請求內容，未知的類型一律視為預設類型，避免快取無限成長"""
+        if test_type not in TEST_TYPE_GUIDANCE:
+            test_type = DEFAULT_TEST_TYPE
+        key = (template_name, test_type)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            with self._lock:
+                prefix = self._prefixes.get(key)
+                if prefix is None:
+                    prefix = self._render_prefix(template_name, test_type)
+                    prefix += _TEST_TYPE_LINE.format(test_type=test_type)
+                    self._prefixes[key] = prefix
+        return prefix
+
+    def build(self,
+              description: str,
+              test_type: str,
+              template_name: str = DEFAULT_TEMPLATE,
+              examples: str = '',
+              instructions: str = '') -> str:
+        """組裝完整 prompt：固定前綴在前，接著是檢索到的範例與本次請求的補充說明，功能描述在最後"""
+        prompt = self.get_prefix(template_name, test_type)
+        if examples:
+            prompt += _EXAMPLES.format(examples=examples)
+        if instructions:
+            prompt += _INSTRUCTIONS.format(instructions=instructions)
+        return prompt + _SUFFIX.format(description=description)
+
+    def clear(self):
+        """清除前綴快取（模板變更時使用）"""
+        with self._lock:
+            self._prefixes.clear()
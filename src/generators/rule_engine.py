@@ -0,0 +1,327 @@
+"""
+本地規則式測試用例生成引擎
+從功能描述擷取欄位、操作與導向目標，套用依模板與測試類型分類的規則庫，
+不需網路即可在毫秒內產生結構化測試用例，作為 AI 結果回來前的草稿與供應商故障時的備援
+"""
+
+import re
+import json
+from typing import Dict, List, Any, Optional, Tuple
+
+# (關鍵字, 欄位名稱, 欄位類型)
+FIELD_LEXICON = [
+    (('帳號', '用戶名', '使用者名稱', 'username', 'account'), '帳號', 'text'),
+    (('密碼', 'password'), '密碼', 'password'),
+    (('email', 'e-mail', '電子郵件', '信箱'), 'Email', 'email'),
+    (('電話', '手機', 'phone'), '電話', 'phone'),
+    (('金額', '價格', 'amount', 'price'), '金額', 'number'),
+    (('數量', 'quantity'), '數量', 'number'),
+    (('日期', '生日', 'date'), '日期', 'date'),
+    (('檔案', '圖片', '附件', 'file', 'image'), '檔案', 'file'),
+    (('驗證碼', 'otp', 'captcha'), '驗證碼', 'code'),
+    (('地址', 'address'), '地址', 'text'),
+    (('姓名', '名稱', 'name'), '名稱', 'text'),
+    (('關鍵字', 'keyword'), '關鍵字', 'text')
+]
+
+# (關鍵字, 操作名稱)
+ACTION_LEXICON = [
+    (('重設密碼', '忘記密碼', 'reset password'), '重設密碼'),
+    (('登入', 'login', 'sign in'), '登入'),
+    (('登出', 'logout', 'sign out'), '登出'),
+    (('註冊', 'register', 'sign up'), '註冊'),
+    (('搜尋', '查詢', 'search'), '搜尋'),
+    (('上傳', 'upload'), '上傳'),
+    (('下載', '匯出', 'download', 'export'), '下載'),
+    (('付款', '結帳', 'checkout', 'pay'), '付款'),
+    (('刪除', 'delete', 'remove'), '刪除'),
+    (('編輯', '修改', '更新', 'edit', 'update'), '編輯'),
+    (('新增', '建立', 'create', 'add'), '新增'),
+    (('送出', '提交', 'submit'), '送出')
+]
+
+# 模板顯示名稱對應的模板鍵值（由 prompt 判斷使用的模板）
+TEMPLATE_NAMES = {
+    'Web 應用程式測試': 'web_application',
+    '行動應用程式測試': 'mobile_app',
+    'API 服務測試': 'api_service',
+    '資料庫測試': 'database',
+    '安全性測試': 'security'
+}
+
+_TARGET_PATTERN = re.compile(
+    r'(?:導向|導到|跳轉(?:到|至)?|轉到|進入|redirect(?:s|ed)?\s+to|navigate(?:s|d)?\s+to)\s*'
+    r'([A-Za-z0-9_\-一-鿿]+?)\s*(?:頁面|頁|page)?(?=[\s，。,.;；!！]|$)',
+    re.IGNORECASE
+)
+_CUSTOM_FIELD_PATTERN = re.compile(r'([一-鿿A-Za-z]{1,6})欄位')
+
+INVALID_INPUTS = {
+    'email': ('格式錯誤的 Email（例如 user@）', '顯示「Email 格式錯誤」提示'),
+    'phone': ('包含英文字母的電話號碼', '顯示「電話格式錯誤」提示'),
+    'number': ('負數或非數字的{field}', '顯示「{field}必須為正數」提示'),
+    'date': ('不存在的日期（例如 2 月 30 日）', '顯示「日期無效」提示'),
+    'file': ('不支援格式或超過大小上限的檔案', '顯示檔案格式或大小限制的錯誤訊息'),
+    'code': ('已過期或錯誤的驗證碼', '顯示「驗證碼錯誤或已過期」提示')
+}
+
+
+def _contains(text: str, keywords: Tuple[str, ...]) -> bool:
+    """中文關鍵字以子字串比對，英文關鍵字需為完整單字（避免 address 比對到 add）"""
+    for keyword in keywords:
+        if keyword.isascii():
+            if re.search(rf'\b{re.escape(keyword)}\b', text):
+                return True
+        elif keyword in text:
+            return True
+    return False
+
+
+def extract_entities(description: str) -> Dict[str, Any]:
+    """從功能描述擷取欄位、操作與導向目標"""
+    lowered = description.lower()
+
+    fields = []
+    for keywords, name, kind in FIELD_LEXICON:
+        if _contains(lowered, keywords):
+            fields.append({'name': name, 'kind': kind})
+    known = {field['name'] for field in fields}
+    for match in _CUSTOM_FIELD_PATTERN.finditer(description):
+        name = match.group(1)
+        # 「帳號密碼欄位」這類已由詞庫辨識的欄位不重複加入
+        if name not in known and not any(name.endswith(other) or other.endswith(name) for other in known):
+            fields.append({'name': name, 'kind': 'text'})
+            known.add(name)
+
+    actions = []
+    for keywords, name in ACTION_LEXICON:
+        if _contains(lowered, keywords) and name not in actions:
+            actions.append(name)
+
+    targets = list(dict.fromkeys(match.group(1) for match in _TARGET_PATTERN.finditer(description)))
+    return {'fields': fields, 'actions': actions, 'targets': targets}
+
+
+class RuleBasedGenerator:
+    """規則式測試用例生成器"""
+
+    def __init__(self, max_cases: int = 12):
+        self.max_cases = max_cases
+
+    def generate(self,
+                 description: str,
+                 template_name: str = '',
+                 test_type: str = 'functional',
+                 max_cases: Optional[int] = None) -> List[Dict[str, Any]]:
+        """依描述、模板與測試類型產生測試用例"""
+        entities = extract_entities(description)
+        cases: List[Dict[str, Any]] = []
+
+        for action in entities['actions'] or ['']:
+            cases.extend(self._functional_rules(action, entities))
+        if template_name:
+            cases.extend(self._template_rules(template_name, entities))
+        cases.extend(self._test_type_rules(test_type, template_name, entities))
+
+        unique = []
+        seen = set()
+        for test_case in cases:
+            if test_case['title'] not in seen:
+                seen.add(test_case['title'])
+                unique.append(test_case)
+        # 依優先級排序，確保截斷時保留最重要的用例
+        order = {'high': 0, 'medium': 1, 'low': 2}
+        unique.sort(key=lambda test_case: order[test_case['priority']])
+        unique = unique[:max_cases or self.max_cases]
+
+        for index, test_case in enumerate(unique, 1):
+            test_case['id'] = f"TC{index:03d}"
+        return unique
+
+    def generate_from_prompt(self, prompt: str) -> str:
+        """從生成 prompt 解析描述、模板與測試類型，回傳與 AI 回應相同格式的 JSON"""
+        description = prompt.rsplit('**功能描述：**', 1)[-1].strip()
+        test_type_match = re.search(r'\*\*測試類型：\*\*\s*(\w+)', prompt)
+        template_match = re.search(r'「(.+?)」模板', prompt)
+        test_cases = self.generate(
+            description,
+            TEMPLATE_NAMES.get(template_match.group(1), '') if template_match else '',
+            test_type_match.group(1) if test_type_match else 'functional'
+        )
+        return json.dumps({'test_cases': test_cases}, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def _case(title: str, description: str, case_type: str, steps: List[str], expected: str, priority: str) -> Dict[str, Any]:
+        return {
+            'id': '',
+            'title': title,
+            'description': description,
+            'type': case_type,
+            'steps': steps,
+            'expected_result': expected,
+            'priority': priority
+        }
+
+    def _fill_steps(self, entities: Dict[str, Any], action: str, override: Optional[Dict[str, str]] = None) -> List[str]:
+        """產生開啟頁面、填寫欄位並執行操作的步驟"""
+        override = override or {}
+        page = f"{action}頁面" if action else '測試頁面'
+        steps = [f"打開{page}"]
+        for field in entities['fields']:
+            steps.append(override.get(field['name'], f"輸入有效的{field['name']}"))
+        steps.append(f"點擊「{action}」按鈕" if action else '執行主要操作')
+        return steps
+
+    def _functional_rules(self, action: str, entities: Dict[str, Any]) -> List[Dict[str, Any]]:
+        fields = entities['fields']
+        target = entities['targets'][0] if entities['targets'] else ''
+        cases = []
+
+        if not action and not fields:
+            return [
+                self._case('基本功能測試', '測試基本功能是否正常運作', 'positive',
+                           ['打開測試頁面', '執行基本操作', '驗證結果'], '功能正常運作', 'high'),
+                self._case('錯誤處理測試', '測試錯誤情況的處理', 'negative',
+                           ['打開測試頁面', '執行錯誤操作', '檢查錯誤處理'], '正確處理錯誤情況', 'medium')
+            ]
+
+        name = action or '操作'
+        success = f"{name}成功並導向 {target} 頁面" if target else f"{name}成功並顯示成功訊息"
+        cases.append(self._case(f"使用有效資料{name}", f"測試以有效資料完成{name}的正常流程", 'positive',
+                                self._fill_steps(entities, action), success, 'high'))
+
+        for field in fields:
+            field_name = field['name']
+            cases.append(self._case(
+                f"{field_name}空白時{name}", f"測試{field_name}為必填欄位的驗證", 'negative',
+                self._fill_steps(entities, action, {field_name: f"保持{field_name}欄位空白"}),
+                f"顯示「{field_name}為必填」提示且未執行{name}", 'medium'
+            ))
+
+            if field['kind'] == 'password' and action == '登入':
+                cases.append(self._case(
+                    '輸入錯誤密碼', '測試使用錯誤密碼時的錯誤處理', 'negative',
+                    self._fill_steps(entities, action, {field_name: '輸入錯誤的密碼'}),
+                    '顯示「帳號或密碼錯誤」訊息', 'high'
+                ))
+            elif field['kind'] in INVALID_INPUTS:
+                value, expected = INVALID_INPUTS[field['kind']]
+                cases.append(self._case(
+                    f"{field_name}格式錯誤", f"測試{field_name}的格式驗證", 'negative',
+                    self._fill_steps(entities, action, {field_name: f"輸入{value.format(field=field_name)}"}),
+                    expected.format(field=field_name), 'medium'
+                ))
+
+            if field['kind'] in ('text', 'password'):
+                cases.append(self._case(
+                    f"{field_name}超過長度上限", f"測試{field_name}的長度邊界", 'boundary',
+                    self._fill_steps(entities, action, {field_name: f"輸入超過長度上限一個字元的{field_name}"}),
+                    f"{field_name}被截斷或顯示長度限制提示", 'low'
+                ))
+
+        cases.extend(self._action_rules(action, entities, success))
+        return cases
+
+    def _action_rules(self, action: str, entities: Dict[str, Any], success: str) -> List[Dict[str, Any]]:
+        """各操作特有的規則"""
+        if action == '登入':
+            return [
+                self._case('連續登入失敗鎖定帳號', '測試多次輸入錯誤密碼後的帳號保護', 'exception',
+                           ['打開登入頁面', '連續 5 次輸入錯誤的密碼並點擊登入'], '帳號暫時鎖定並顯示鎖定提示', 'high'),
+                self._case('按下 Enter 鍵登入', '測試使用 Enter 鍵送出登入', 'positive',
+                           self._fill_steps(entities, action)[:-1] + ['按下 Enter 鍵'], success, 'medium')
+            ]
+        if action == '搜尋':
+            return [self._case('搜尋沒有結果的關鍵字', '測試查無資料時的顯示', 'negative',
+                               ['打開搜尋頁面', '輸入不存在的關鍵字', '點擊「搜尋」按鈕'], '顯示「查無資料」提示', 'medium')]
+        if action == '上傳':
+            return [self._case('上傳超過大小上限的檔案', '測試檔案大小限制', 'boundary',
+                               ['打開上傳頁面', '選擇超過大小上限的檔案', '點擊「上傳」按鈕'], '顯示檔案過大的錯誤訊息且未上傳', 'medium')]
+        if action == '刪除':
+            return [self._case('取消刪除確認', '測試刪除前的確認機制', 'negative',
+                               ['打開資料列表', '點擊「刪除」按鈕', '在確認對話框點擊「取消」'], '資料未被刪除', 'medium')]
+        if action == '付款':
+            return [
+                self._case('重複點擊付款按鈕', '測試防止重複付款', 'exception',
+                           ['打開付款頁面', '快速連續點擊「付款」按鈕兩次'], '只建立一筆付款', 'high'),
+                self._case('餘額不足時付款', '測試付款失敗處理', 'negative',
+                           ['打開付款頁面', '使用餘額不足的付款方式', '點擊「付款」按鈕'], '顯示付款失敗訊息且訂單未成立', 'high')
+            ]
+        if action == '註冊':
+            return [self._case('使用已註冊的帳號註冊', '測試重複註冊的檢查', 'negative',
+                               ['打開註冊頁面', '輸入已存在的帳號', '點擊「註冊」按鈕'], '顯示「帳號已存在」提示', 'high')]
+        return []
+
+    def _template_rules(self, template_name: str, entities: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """各模板特有的規則"""
+        action = entities['actions'][0] if entities['actions'] else '操作'
+        if template_name == 'web_application':
+            return [
+                self._case(f"{action}後按瀏覽器返回鍵", '測試瀏覽器返回後的狀態', 'exception',
+                           [f"完成{action}", '按下瀏覽器返回鍵'], '不會重複送出且頁面狀態正確', 'medium'),
+                self._case('不同螢幕寬度下的版面', '測試響應式版面', 'positive',
+                           ['以桌機寬度開啟頁面', '切換為手機寬度'], '版面正確調整且功能可用', 'low')
+            ]
+        if template_name == 'mobile_app':
+            return [
+                self._case(f"網路中斷時{action}", '測試離線狀態的處理', 'exception',
+                           ['關閉網路連線', f"執行{action}"], '顯示網路錯誤提示且資料不遺失', 'high'),
+                self._case('切換到背景後返回', '測試背景執行後的狀態保存', 'positive',
+                           [f"進行{action}流程", '切換到其他 App', '返回應用程式'], '流程狀態保留', 'medium')
+            ]
+        if template_name == 'api_service':
+            return [
+                self._case('未帶認證資訊呼叫 API', '測試 API 的認證檢查', 'negative',
+                           ['不帶 Authorization 標頭發送請求'], '回傳 401 Unauthorized', 'high'),
+                self._case('缺少必填參數', '測試 API 的參數驗證', 'negative',
+                           ['發送缺少必填參數的請求'], '回傳 400 Bad Request 並說明缺少的參數', 'high'),
+                self._case('使用不支援的 HTTP 方法', '測試 API 的方法限制', 'negative',
+                           ['以不支援的 HTTP 方法發送請求'], '回傳 405 Method Not Allowed', 'low')
+            ]
+        if template_name == 'database':
+            return [
+                self._case('併發更新同一筆資料', '測試併發寫入的一致性', 'exception',
+                           ['兩個連線同時更新同一筆資料'], '資料不會遺失更新且結果一致', 'high'),
+                self._case('交易中途失敗回滾', '測試交易的原子性', 'exception',
+                           ['開始交易並寫入資料', '在提交前模擬錯誤'], '所有變更回滾', 'high')
+            ]
+        if template_name == 'security':
+            return self._security_rules(entities)
+        return []
+
+    def _security_rules(self, entities: Dict[str, Any]) -> List[Dict[str, Any]]:
+        cases = []
+        for field in entities['fields']:
+            if field['kind'] in ('text', 'email'):
+                cases.append(self._case(
+                    f"{field['name']}輸入 SQL 注入字串", 'SQL 注入防護測試', 'negative',
+                    [f"在{field['name']}輸入 ' OR '1'='1", '送出表單'], '請求被拒絕且未洩漏資料庫錯誤', 'high'
+                ))
+                cases.append(self._case(
+                    f"{field['name']}輸入 XSS 腳本", 'XSS 防護測試', 'negative',
+                    [f"在{field['name']}輸入 <script>alert(1)</script>", '送出表單並檢視結果頁面'], '腳本被跳脫而不會執行', 'high'
+                ))
+        cases.append(self._case('未登入直接存取受保護頁面', '權限控制測試', 'negative',
+                                ['清除登入狀態', '直接輸入受保護頁面的網址'], '導向登入頁面', 'high'))
+        return cases
+
+    def _test_type_rules(self, test_type: str, template_name: str, entities: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """各測試類型特有的規則"""
+        action = entities['actions'][0] if entities['actions'] else '操作'
+        if test_type == 'security' and template_name != 'security':
+            return self._security_rules(entities)
+        if test_type == 'performance':
+            return [
+                self._case(f"{action}回應時間", '測試單一請求的回應時間', 'positive',
+                           [f"執行{action}", '記錄回應時間'], '回應時間小於 2 秒', 'high'),
+                self._case(f"100 位使用者同時{action}", '測試併發負載下的表現', 'boundary',
+                           [f"模擬 100 位使用者同時執行{action}"], '錯誤率低於 1% 且 p95 回應時間小於 5 秒', 'high')
+            ]
+        if test_type == 'usability':
+            return [
+                self._case(f"僅用鍵盤完成{action}", '測試鍵盤可及性', 'positive',
+                           ['以 Tab 鍵移動焦點至各欄位', f"以 Enter 鍵完成{action}"], '所有操作皆可透過鍵盤完成', 'medium'),
+                self._case('錯誤訊息清楚易懂', '測試錯誤提示的可用性', 'negative',
+                           ['輸入錯誤資料並送出'], '錯誤訊息顯示於對應欄位旁並說明修正方式', 'medium')
+            ]
+        return []
@@ -0,0 +1,93 @@
+"""
+規格文件切分與結果合併
+將過長的功能描述依標題與段落切成多個章節，各章節生成的測試用例再合併、去除重複並重新編號
+"""
+
+import re
+from typing import List, Dict, Any
+
+_HEADING_PATTERN = re.compile(r'^\s*(#{1,6}\s|第[一二三四五六七八九十百\d]+[章節條]|\d+(\.\d+)*[.、]?\s)')
+_SENTENCE_PATTERN = re.compile(r'(?<=[。！？.!?\n])')
+
+
+def _split_blocks(text: str) -> List[str]:
+    """依標題與空行切成區塊，標題與其後內容保持在同一區塊"""
+    blocks = []
+    current: List[str] = []
+    for line in text.splitlines():
+        if _HEADING_PATTERN.match(line) or (not line.strip() and current and current[-1].strip()):
+            if any(part.strip() for part in current):
+                blocks.append('\n'.join(current).strip())
+            current = []
+        if line.strip():
+            current.append(line)
+    if any(part.strip() for part in current):
+        blocks.append('\n'.join(current).strip())
+    return blocks
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """將超過長度上限的區塊依句子切開，單句過長時直接截段"""
+    pieces = []
+    current = ''
+    for sentence in _SENTENCE_PATTERN.split(block):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ''
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if len(current) + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ''
+        current += sentence
+    if current.strip():
+        pieces.append(current)
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def split_sections(text: str, max_chars: int = 3000) -> List[str]:
+    """將規格文件切成不超過 max_chars 的章節，盡量不切斷段落"""
+    if len(text) <= max_chars:
+        return [text]
+
+    sections = []
+    current = ''
+    for block in _split_blocks(text):
+        for piece in (_split_oversized(block, max_chars) if len(block) > max_chars else [block]):
+            if current and len(current) + len(piece) + 2 > max_chars:
+                sections.append(current)
+                current = ''
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r'\s+', ' ', str(text)).strip().lower()
+
+
+def merge_test_cases(suites: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """合併多個章節的測試用例，去除標題與步驟相同的重複項，並重新編號為 TC001…"""
+    merged = []
+    seen = set()
+    for suite in suites:
+        for test_case in suite:
+            key = (
+                _normalize(test_case.get('title', '')),
+                tuple(_normalize(step) for step in test_case.get('steps', []))
+            )
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(dict(test_case))
+
+    return renumber_test_cases(merged)
+
+
+def renumber_test_cases(test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """依順序將測試用例重新編號為 TC001…"""
+    for index, test_case in enumerate(test_cases, 1):
+        test_case['id'] = f"TC{index:03d}"
+    return test_cases
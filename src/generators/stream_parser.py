@@ -0,0 +1,91 @@
+"""
+增量測試用例解析器
+從串流中的 AI 回應逐一取出 test_cases 陣列內已完整的物件
+"""
+
+import re
+import json
+from typing import List, Dict, Any
+
+ARRAY_START_PATTERN = re.compile(r'"test_cases"\s*:\s*\[')
+
+
+class IncrementalTestCaseParser:
+    """增量測試用例解析器"""
+
+    def __init__(self):
+        self.buffer = ''
+        self.text = []
+        self.position = 0
+        self.in_array = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.object_start = -1
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """餵入新的文字片段，回傳本次完成的測試用例"""
+        self.text.append(chunk)
+        if self.finished:
+            return []
+
+        self.buffer += chunk
+        if not self.in_array:
+            match = ARRAY_START_PATTERN.search(self.buffer)
+            if not match:
+                return []
+            self.in_array = True
+            self.position = match.end()
+
+        return self._scan()
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        """從上次位置繼續掃描緩衝區"""
+        completed = []
+        buffer = self.buffer
+        i = self.position
+
+        while i < len(buffer):
+            char = buffer[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                if self.depth == 0 and char == '{':
+                    self.object_start = i
+                self.depth += 1
+            elif char in '}]':
+                if self.depth == 0:
+                    # 陣列結束
+                    self.finished = True
+                    break
+                self.depth -= 1
+                if self.depth == 0 and self.object_start != -1:
+                    try:
+                        completed.append(json.loads(buffer[self.object_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self.object_start = -1
+            i += 1
+
+        # 丟棄已處理完的內容，避免緩衝區無限成長
+        keep_from = self.object_start if self.object_start != -1 else i
+        self.buffer = buffer[keep_from:]
+        self.position = i - keep_from
+        if self.object_start != -1:
+            self.object_start = 0
+
+        self.emitted += len(completed)
+        return completed
+
+    def get_text(self) -> str:
+        """取得目前累積的完整回應文字"""
+        return ''.join(self.text)
@@ -3,9 +3,40 @@
 使用 AI 模型從自然語言描述生成測試用例
 """
 
+import os
 import json
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from src.models.ai_model_manager import AIModelManager
+from src.models.telemetry import telemetry_context
+from src.models.rate_limiter import PRIORITY_INTERACTIVE
+from src.generators.prompt_builder import PromptBuilder, DEFAULT_TEMPLATE
+from src.generators.example_index import ExampleIndex
+from src.generators.rule_engine import RuleBasedGenerator
+from src.generators.spec_splitter import split_sections, merge_test_cases, renumber_test_cases
+from src.generators.dedup import MinHashDeduplicator
+from src.generators.incremental import SuiteStore, split_sentences, diff_sentences, find_affected, next_ids
+from src.generators.stream_parser import IncrementalTestCaseParser
+from src.generators.model_cascade import ModelCascade, CASCADE_MODEL
+from src.generators.test_case_schema import validate_test_cases
+from src import json_codec
+
+# 本地規則引擎備援產生的用例以 source 欄位標記
+SOURCE_LOCAL = 'local'
+
+# 增量生成時附加的補充說明（功能描述只放變動的句子）
+INCREMENTAL_INSTRUCTIONS = '功能描述只包含本次新增或修改的部分，只需針對這些內容生成測試用例。'
+
+# 多類型生成時各測試類型的 ID 前綴
+TEST_TYPE_PREFIXES = {
+    'functional': 'FUNC',
+    'security': 'SEC',
+    'performance': 'PERF',
+    'usability': 'UX'
+}
+
+class StructuredOutputError(Exception):
+    """嚴格模式下修正次數用盡仍無法取得符合結構的輸出"""
 
 class TestCaseGenerator:
     """測試用例生成器"""
@@ -13,6 +44,22 @@ class TestCaseGenerator:
     def __init__(self, ai_manager: AIModelManager):
         self.ai_manager = ai_manager
         self.templates = self._load_templates()
+        self.prompt_builder = PromptBuilder(self.templates)
+        self.cascade = ModelCascade.from_env(ai_manager)
+        self.repair_retries = int(os.getenv('STRICT_REPAIR_RETRIES', 2))
+        # 功能描述超過此長度時切成章節併發生成（0 為停用）
+        self.section_chars = int(os.getenv('SPEC_SECTION_CHARS', 3000))
+        self.section_concurrency = int(os.getenv('SPEC_SECTION_CONCURRENCY', 5))
+        self.deduplicator = MinHashDeduplicator.from_env()
+        # 單次生成預設不去重，避免合併只差在數值的邊界值用例；多類型、章節與增量生成一律去重
+        self.dedup_single = os.getenv('DEDUP_SINGLE', 'False').lower() == 'true'
+        self.suite_store = SuiteStore.from_env()
+        self.example_index = ExampleIndex.from_env()
+        self.few_shot_k = int(os.getenv('FEW_SHOT_K', 3))
+        self.few_shot_budget = int(os.getenv('FEW_SHOT_TOKEN_BUDGET', 400))
+        # AI 呼叫失敗時改以本地規則引擎產生用例
+        self.local_engine = RuleBasedGenerator()
+        self.local_fallback = os.getenv('LOCAL_FALLBACK', 'True').lower() == 'true'
         
     def _load_templates(self) -> Dict[str, Dict[str, Any]]:
         """載入測試模板"""
@@ -57,202 +104,478 @@ class TestCaseGenerator:
                               description: str, 
                               template_name: str,
                               test_type: str = 'functional',
-                              model: str = 'gpt-4') -> List[Dict[str, Any]]:
-        """使用指定模板生成測試用例"""
+                              model: str = 'gpt-4',
+                              use_cache: bool = True,
+                              strict: bool = False,
+                              priority: str = PRIORITY_INTERACTIVE,
+                              fallback: bool = True) -> List[Dict[str, Any]]:
+        """使用指定模板生成測試用例；批次作業以 priority 指定較低的排程優先順序，
+        fallback 為 False 時 AI 呼叫失敗直接拋出例外，不改用本地規則引擎"""
         
         if template_name not in self.templates:
             raise ValueError(f"不支援的模板：{template_name}")
         
-        template = self.templates[template_name]
-        prompt = self._build_template_prompt(description, template, test_type)
+        try:
+            return self._generate_templated(description, template_name, test_type, model, use_cache, strict, priority)
+        except Exception as e:
+            if not fallback:
+                raise
+            return self._local_fallback(e, description, test_type, template_name)
+    
+    def _generate_templated(self,
+                            description: str,
+                            template_name: str,
+                            test_type: str,
+                            model: str,
+                            use_cache: bool,
+                            strict: bool,
+                            priority: str = PRIORITY_INTERACTIVE,
+                            instructions: str = '') -> List[Dict[str, Any]]:
+        """以 AI 模型依模板生成（不含本地備援）"""
         
-        # 使用 AI 模型生成回應
-        response = self.ai_manager.generate_response(prompt, model)
+        if self.section_chars and len(description) > self.section_chars:
+            return self.generate_sections(
+                description, test_type, model, template_name, use_cache, strict, priority, instructions
+            )
         
-        # 解析回應為測試用例
-        test_cases = self._parse_response(response)
+        prompt = self._build_template_prompt(description, template_name, test_type, instructions)
         
-        return test_cases
+        return self._generate_from_prompt(prompt, model, use_cache, f"{template_name}:{test_type}", strict, priority)
     
-    def _build_template_prompt(self, description: str, template: Dict[str, Any], test_type: str) -> str:
+    def _build_template_prompt(self, description: str, template_name: str, test_type: str, instructions: str = '') -> str:
         """建立基於模板的 prompt"""
-        
-        base_prompt = f"""
-作為一個專業的軟體測試工程師，請使用「{template['name']}」模板為以下功能生成高品質的測試用例。
-
-**功能描述：**
-{description}
-
-**測試類型：** {test_type}
-
-**模板資訊：**
-- 模板名稱：{template['name']}
-- 模板描述：{template['description']}
-- 重點測試領域：{', '.join(template['focus_areas'])}
-- 常見測試場景：{', '.join(template['common_scenarios'])}
-
-**要求：**
-1. 測試用例必須符合 {template['name']} 的特點
-2. 重點關注 {', '.join(template['focus_areas'])}
-3. 包含 {', '.join(template['common_scenarios'])} 相關測試
-4. 每個測試步驟都要具體且可執行
-5. 預期結果要量化且可測量
-
-請以 JSON 格式回應，格式如下：
-{{
-    "test_cases": [
-        {{
-            "id": "TC001",
-            "title": "具體的測試標題",
-            "description": "詳細的測試描述，包含測試目的和背景",
-            "type": "positive|negative|boundary|exception",
-            "template_focus": "對應的模板重點領域",
-            "steps": [
-                "具體的步驟描述（不要包含編號）",
-                "具體的步驟描述（不要包含編號）",
-                "具體的步驟描述（不要包含編號）"
-            ],
-            "expected_result": "具體可驗證的預期結果",
-            "priority": "high|medium|low",
-            "business_impact": "對業務的影響程度",
-            "risk_level": "風險等級"
-        }}
-    ]
-}}
-
-**重要提醒：**
-- 步驟描述中不要包含編號（如 "1."、"2." 等）
-- 前端會自動為步驟添加編號
-- 請直接描述步驟內容，例如："Navigate to the payment page" 而不是 "1. Navigate to the payment page"
-
-請確保生成的測試用例：
-1. 符合 {template['name']} 的測試特點
-2. 涵蓋所有重要的功能點
-3. 考慮各種可能的異常情況
-4. 描述精確且無歧義
-5. 步驟具體且可重複執行
-"""
-        
-        return base_prompt
+        examples = self._few_shot_examples(description, template_name)
+        return self.prompt_builder.build(description, test_type, template_name, examples, instructions)
+    
+    def _few_shot_examples(self, description: str, template_name: str) -> str:
+        """檢索同模板中已採用的相似用例，作為 prompt 內的範例"""
+        if self.few_shot_k <= 0:
+            return ''
+        test_cases = self.example_index.search(template_name, description, self.few_shot_k)
+        return self.example_index.format_examples(test_cases, self.few_shot_budget)
+    
+    def accept_test_cases(self, description: str, test_cases: List[Dict[str, Any]], template_name: str = '') -> int:
+        """將使用者採用的測試用例加入範例索引，供之後相似描述檢索"""
+        if template_name and template_name not in self.templates:
+            raise ValueError(f"不支援的模板：{template_name}")
+        self.example_index.add(template_name or DEFAULT_TEMPLATE, description, test_cases)
+        return len(test_cases)
     
     def generate(self, 
                  description: str, 
                  test_type: str = 'functional',
-                 model: str = 'gpt-4') -> List[Dict[str, Any]]:
-        """生成測試用例"""
+                 model: str = 'gpt-4',
+                 use_cache: bool = True,
+                 strict: bool = False,
+                 priority: str = PRIORITY_INTERACTIVE,
+                 fallback: bool = True) -> List[Dict[str, Any]]:
+        """生成測試用例（參數同 generate_with_template）"""
+        
+        try:
+            return self._generate_default(description, test_type, model, use_cache, strict, priority)
+        except Exception as e:
+            if not fallback:
+                raise
+            return self._local_fallback(e, description, test_type)
+    
+    def _generate_default(self,
+                          description: str,
+                          test_type: str,
+                          model: str,
+                          use_cache: bool,
+                          strict: bool,
+                          priority: str = PRIORITY_INTERACTIVE,
+                          instructions: str = '') -> List[Dict[str, Any]]:
+        """以 AI 模型依預設 prompt 生成（不含本地備援）"""
+        
+        if self.section_chars and len(description) > self.section_chars:
+            return self.generate_sections(
+                description, test_type, model, use_cache=use_cache, strict=strict, priority=priority,
+                instructions=instructions
+            )
         
         # 根據測試類型生成不同的 prompt
-        prompt = self._build_prompt(description, test_type)
+        prompt = self._build_prompt(description, test_type, instructions)
+        
+        return self._generate_from_prompt(prompt, model, use_cache, f"default:{test_type}", strict, priority)
+    
+    def _local_fallback(self,
+                        error: Exception,
+                        description: str,
+                        test_type: str,
+                        template_name: str = '') -> List[Dict[str, Any]]:
+        """AI 呼叫失敗時改以本地規則引擎產生用例（以 source 標記）；格式錯誤與參數錯誤不屬於備援範圍"""
+        if not self.local_fallback or isinstance(error, (StructuredOutputError, ValueError)):
+            raise error
+        test_cases = self.local_engine.generate(description, template_name, test_type)
+        for test_case in test_cases:
+            test_case['source'] = SOURCE_LOCAL
+        return test_cases
+    
+    @staticmethod
+    def is_local_fallback(test_cases: List[Dict[str, Any]]) -> bool:
+        """判斷結果是否來自本地規則引擎備援"""
+        return any(test_case.get('source') == SOURCE_LOCAL for test_case in test_cases)
+    
+    def generate_multi(self,
+                       description: str,
+                       test_types: List[str],
+                       model: str = 'gpt-4',
+                       template_name: str = '',
+                       use_cache: bool = True,
+                       strict: bool = False) -> Dict[str, Any]:
+        """併發生成多種測試類型並合併為單一測試套件，部分類型失敗時仍回傳其餘結果"""
+        
+        test_types = list(dict.fromkeys(test_types))
+        if not test_types:
+            raise ValueError("至少需要一種測試類型")
+        unknown = [test_type for test_type in test_types if test_type not in TEST_TYPE_PREFIXES]
+        if unknown:
+            raise ValueError(f"不支援的測試類型：{', '.join(map(str, unknown))}")
+        if template_name and template_name not in self.templates:
+            raise ValueError(f"不支援的模板：{template_name}")
+        
+        def run(test_type: str) -> List[Dict[str, Any]]:
+            # 各類型的失敗以 errors 回報，不使用本地備援
+            if template_name:
+                return self._generate_templated(description, template_name, test_type, model, use_cache, strict)
+            return self._generate_default(description, test_type, model, use_cache, strict)
+        
+        with ThreadPoolExecutor(max_workers=len(test_types)) as executor:
+            futures = {test_type: executor.submit(run, test_type) for test_type in test_types}
+        
+        merged = []
+        counts = {}
+        errors = {}
+        for test_type, future in futures.items():
+            try:
+                suite = future.result()
+            except Exception as e:
+                errors[test_type] = str(e)
+                continue
+            prefix = TEST_TYPE_PREFIXES[test_type]
+            for index, test_case in enumerate(suite, 1):
+                test_case = dict(test_case)
+                test_case['id'] = f"{prefix}-TC{index:03d}"
+                test_case['test_type'] = test_type
+                merged.append(test_case)
+            counts[test_type] = len(suite)
+        
+        if not counts:
+            raise Exception(f"所有測試類型皆生成失敗: {errors}")
+        
+        # 不同測試類型常產生相同情境（例如錯誤密碼），跨類型去除近似重複
+        test_cases, report = self.dedupe(merged)
+        return {
+            'test_cases': test_cases,
+            'counts': counts,
+            'errors': errors,
+            'dedup_report': report
+        }
+    
+    def generate_incremental(self,
+                             suite_id: str,
+                             description: str,
+                             test_type: str = 'functional',
+                             model: str = 'gpt-4',
+                             template_name: str = '',
+                             use_cache: bool = True) -> Dict[str, Any]:
+        """依描述差異增量更新測試套件：只為變動的句子生成用例，未受影響的用例保留原 ID"""
+        
+        if template_name and template_name not in self.templates:
+            raise ValueError(f"不支援的模板：{template_name}")
+        
+        previous = self.suite_store.get(suite_id)
+        if previous is None or previous['test_type'] != test_type or previous['template'] != template_name:
+            if template_name:
+                test_cases = self._generate_templated(description, template_name, test_type, model, use_cache, False)
+            else:
+                test_cases = self._generate_default(description, test_type, model, use_cache, False)
+            result = {'mode': 'full', 'test_cases': test_cases, 'added': len(test_cases), 'removed': 0}
+        else:
+            old_sentences = previous['sentences']
+            new_sentences = split_sentences(description)
+            changed, added = diff_sentences(old_sentences, new_sentences)
+            
+            previous_cases = previous['test_cases']
+            affected = find_affected(previous_cases, old_sentences, changed)
+            kept = [test_case for index, test_case in enumerate(previous_cases) if index not in affected]
+            
+            new_cases = []
+            if added:
+                # 描述只放變動的句子，讓範例檢索與規則引擎不受補充說明影響
+                changed_text = '\n'.join(new_sentences[index] for index in added)
+                if template_name:
+                    new_cases = self._generate_templated(
+                        changed_text, template_name, test_type, model, use_cache, False,
+                        instructions=INCREMENTAL_INSTRUCTIONS
+                    )
+                else:
+                    new_cases = self._generate_default(
+                        changed_text, test_type, model, use_cache, False, instructions=INCREMENTAL_INSTRUCTIONS
+                    )
+                # 新用例若與保留的用例近似重複則捨棄；保留的用例彼此近似時也可能被合併，
+                # 因此依物件身分挑出存活的新用例，不以位置切片
+                combined, _ = self.dedupe(kept + new_cases)
+                candidates = {id(test_case) for test_case in new_cases}
+                new_cases = [test_case for test_case in combined if id(test_case) in candidates]
+                for test_case, new_id in zip(new_cases, next_ids(previous_cases, len(new_cases))):
+                    test_case['id'] = new_id
+            
+            result = {
+                'mode': 'incremental' if changed or added else 'unchanged',
+                'test_cases': kept + new_cases,
+                'added': len(new_cases),
+                'removed': len(affected),
+                'changed_sentences': len(added)
+            }
+        
+        self.suite_store.save(suite_id, {
+            'description': description,
+            'sentences': split_sentences(description),
+            'test_type': test_type,
+            'template': template_name,
+            'test_cases': result['test_cases']
+        })
+        result['suite_id'] = suite_id
+        return result
+    
+    def generate_sections(self,
+                          description: str,
+                          test_type: str = 'functional',
+                          model: str = 'gpt-4',
+                          template_name: str = '',
+                          use_cache: bool = True,
+                          strict: bool = False,
+                          priority: str = PRIORITY_INTERACTIVE,
+                          instructions: str = '') -> List[Dict[str, Any]]:
+        """將長規格文件切成章節併發生成，再合併、去除重複並重新編號"""
+        
+        sections = split_sections(description, self.section_chars or len(description))
+        stats_key = f"{template_name or 'default'}:{test_type}"
+        prompts = []
+        for index, section in enumerate(sections, 1):
+            section_description = section if len(sections) == 1 else f"（規格文件第 {index}/{len(sections)} 節）\n{section}"
+            if template_name:
+                prompts.append(self._build_template_prompt(section_description, template_name, test_type, instructions))
+            else:
+                prompts.append(self._build_prompt(section_description, test_type, instructions))
+        
+        workers = max(1, min(self.section_concurrency, len(prompts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            suites = list(executor.map(
+                lambda prompt: self._generate_from_prompt(prompt, model, use_cache, stats_key, strict, priority),
+                prompts
+            ))
+        
+        test_cases, report = self.dedupe(merge_test_cases(suites))
+        return renumber_test_cases(test_cases) if report else test_cases
+    
+    def _generate_from_prompt(self,
+                              prompt: str,
+                              model: str,
+                              use_cache: bool,
+                              stats_key: str,
+                              strict: bool = False,
+                              priority: str = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
+        """以指定模型（或模型串接）生成並解析測試用例"""
+        
+        with telemetry_context(stats_key.split(':')[0]):
+            test_cases = self._generate_parsed(prompt, model, use_cache, stats_key, strict, priority)
+        return self._dedupe_single(test_cases)
+    
+    def generate_draft(self,
+                       description: str,
+                       test_type: str = 'functional',
+                       template_name: str = '') -> List[Dict[str, Any]]:
+        """以本地規則引擎立即產生草稿用例（不呼叫 AI 模型）"""
+        if template_name and template_name not in self.templates:
+            raise ValueError(f"不支援的模板：{template_name}")
+        return self.local_engine.generate(description, template_name, test_type)
+    
+    def dedupe(self, test_cases: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """去除近似重複的測試用例，回傳 (保留的用例, 合併報告)；未啟用去重時原樣回傳"""
+        if self.deduplicator is None or len(test_cases) < 2:
+            return test_cases, []
+        return self.deduplicator.dedupe(test_cases)
+    
+    def _dedupe_single(self, test_cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """單次生成的結果只在啟用 DEDUP_SINGLE 時去重"""
+        return self.dedupe(test_cases)[0] if self.dedup_single else test_cases
+    
+    def _generate_parsed(self,
+                         prompt: str,
+                         model: str,
+                         use_cache: bool,
+                         stats_key: str,
+                         strict: bool,
+                         priority: str = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
+        if strict and model != CASCADE_MODEL:
+            return self._generate_strict(prompt, model, use_cache, priority)
+        
+        if model == CASCADE_MODEL:
+            test_cases, response = self.cascade.run(
+                prompt, self._parse_json_response, stats_key, use_cache, priority=priority
+            )
+            if test_cases is not None:
+                return test_cases
+            return self._parse_response(response)
         
         # 使用 AI 模型生成回應
-        response = self.ai_manager.generate_response(prompt, model)
+        response = self.ai_manager.generate_response(prompt, model, use_cache=use_cache, priority=priority)
         
         # 解析回應為測試用例
-        test_cases = self._parse_response(response)
+        return self._parse_response(response)
+
+    def _generate_strict(self,
+                         prompt: str,
+                         model: str,
+                         use_cache: bool,
+                         priority: str = PRIORITY_INTERACTIVE) -> List[Dict[str, Any]]:
+        """嚴格模式：要求 JSON 輸出並依結構驗證，失敗時以簡短的修正 prompt 重試"""
         
-        return test_cases
-    
-    def _build_prompt(self, description: str, test_type: str) -> str:
-        """建立更精確的 prompt"""
+        json_mode = self.ai_manager.supports_json_mode(model)
+        response = self.ai_manager.generate_response(
+            prompt, model, use_cache=use_cache, priority=priority, json_mode=json_mode
+        )
         
-        # 更詳細的 prompt 模板
-        base_prompt = f"""
-作為一個專業的軟體測試工程師，請為以下功能生成高品質的測試用例。
+        for attempt in range(self.repair_retries + 1):
+            test_cases, errors = self._parse_strict(response)
+            if not errors:
+                return test_cases
+            if attempt == self.repair_retries:
+                break
+            repair_prompt = self._build_repair_prompt(response, errors)
+            response = self.ai_manager.generate_response(
+                repair_prompt, model, use_cache=False, priority=priority, json_mode=json_mode
+            )
+        
+        raise StructuredOutputError(f"修正 {self.repair_retries} 次後輸出仍不符合格式: {'; '.join(errors[:5])}")
+    
+    def _parse_strict(self, response: str) -> Tuple[Optional[List[Dict[str, Any]]], List[str]]:
+        """單次 JSON 解析並驗證結構，回傳 (測試用例, 錯誤列表)"""
+        try:
+            data = json_codec.loads(response)
+        except json.JSONDecodeError as e:
+            return None, [f'JSON 解析失敗: {e}']
+        if not isinstance(data, dict):
+            return None, ['最外層必須是包含 test_cases 的物件']
+        test_cases = data.get('test_cases')
+        return test_cases, validate_test_cases(test_cases)
+    
+    def _build_repair_prompt(self, response: str, errors: List[str]) -> str:
+        """建立只要求修正格式的簡短 prompt"""
+        error_lines = '\n'.join(f'- {error}' for error in errors[:10])
+        return f"""以下 JSON 不符合要求的格式，請只修正列出的問題，不要重新生成內容。
 
-**功能描述：**
-{description}
+**錯誤：**
+{error_lines}
 
-**測試類型：** {test_type}
+**格式要求：**
+最外層為 {{"test_cases": [...]}}，每個用例必須包含 title（字串）、steps（字串陣列）、expected_result（字串），
+priority 只能是 high|medium|low。
 
-**要求：**
-1. 測試用例必須具體且可執行
-2. 每個測試步驟都要明確且可驗證
-3. 預期結果要量化且可測量
-4. 優先級要根據業務影響程度設定
-5. 測試用例要涵蓋正常流程、異常處理、邊界條件
+**原始輸出：**
+{response}
 
-**測試用例格式要求：**
-- 標題：簡潔明確，包含測試目標
-- 描述：詳細說明測試目的和背景
-- 步驟：具體可執行的操作步驟
-- 預期結果：可驗證的具體結果
-- 優先級：根據業務重要性和風險程度
+請只回傳修正後的 JSON，不要包含任何其他文字。
+"""
+    
+    def generate_stream(self,
+                        description: str,
+                        test_type: str = 'functional',
+                        model: str = 'gpt-4',
+                        template_name: str = '',
+                        use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """以串流方式生成測試用例，每個用例完成時立即產出"""
 
-請以 JSON 格式回應，格式如下：
-{{
-    "test_cases": [
-        {{
-            "id": "TC001",
-            "title": "具體的測試標題",
-            "description": "詳細的測試描述，包含測試目的和背景",
-            "type": "positive|negative|boundary|exception",
-            "steps": [
-                "具體的步驟描述（不要包含編號）",
-                "具體的步驟描述（不要包含編號）",
-                "具體的步驟描述（不要包含編號）"
-            ],
-            "expected_result": "具體可驗證的預期結果",
-            "priority": "high|medium|low",
-            "business_impact": "對業務的影響程度",
-            "risk_level": "風險等級"
-        }}
-    ]
-}}
+        if template_name:
+            if template_name not in self.templates:
+                raise ValueError(f"不支援的模板：{template_name}")
+            prompt = self._build_template_prompt(description, template_name, test_type)
+        else:
+            prompt = self._build_prompt(description, test_type)
 
-**重要提醒：**
-- 步驟描述中不要包含編號（如 "1."、"2." 等）
-- 前端會自動為步驟添加編號
-- 請直接描述步驟內容，例如："Navigate to the payment page" 而不是 "1. Navigate to the payment page"
+        if model == CASCADE_MODEL:
+            # 串接模式需完整回應才能驗證，無法逐段產出
+            for test_case in self._generate_from_prompt(prompt, model, use_cache, f"{template_name or 'default'}:{test_type}"):
+                yield test_case
+            return
 
-**特殊要求：**
-"""
-        
-        # 根據測試類型提供更具體的指導
-        if test_type == 'functional':
-            base_prompt += """
-- 重點：功能正確性測試
-- 確保所有功能點都有對應的測試用例
-- 包含正常流程和異常流程
-- 驗證業務邏輯的正確性
-"""
-        elif test_type == 'security':
-            base_prompt += """
-- 重點：安全性測試
-- 包含輸入驗證、權限檢查、資料保護
-- 測試 SQL 注入、XSS、CSRF 等安全漏洞
-- 驗證身份驗證和授權機制
-"""
-        elif test_type == 'performance':
-            base_prompt += """
-- 重點：效能測試
-- 包含響應時間、吞吐量、資源使用率
-- 測試在不同負載下的表現
-- 驗證效能瓶頸和優化點
-"""
-        elif test_type == 'usability':
-            base_prompt += """
-- 重點：可用性測試
-- 包含用戶體驗、易用性、可訪問性
-- 測試界面友好性和操作直觀性
-- 驗證用戶工作流程的順暢性
-"""
-        
-        base_prompt += """
-請確保生成的測試用例：
-1. 描述精確且無歧義
-2. 步驟具體且可重複執行
-3. 預期結果可測量且可驗證
-4. 涵蓋所有重要的功能點
-5. 考慮各種可能的異常情況
-"""
-        
-        return base_prompt
+        parser = IncrementalTestCaseParser()
+        with telemetry_context(template_name or 'default'):
+            for chunk in self.ai_manager.generate_response_stream(prompt, model, use_cache=use_cache):
+                for test_case in parser.feed(chunk):
+                    yield test_case
+
+        # 串流中未能解析出任何用例時，以完整回應走一般解析流程
+        if parser.emitted == 0:
+            for test_case in self._parse_response(parser.get_text()):
+                yield test_case
+
+    def generate_many(self,
+                      descriptions: List[str],
+                      test_type: str = 'functional',
+                      model: str = 'gpt-4',
+                      concurrency: int = 5,
+                      use_cache: bool = True,
+                      priority: str = PRIORITY_INTERACTIVE) -> List[List[Dict[str, Any]]]:
+        """併發為多個功能描述生成測試用例，結果順序與描述相同"""
+
+        prompts = [self._build_prompt(description, test_type) for description in descriptions]
+
+        if model != CASCADE_MODEL:
+            with telemetry_context('default'):
+                responses = self.ai_manager.generate_many(
+                    prompts, model, concurrency=concurrency, use_cache=use_cache, priority=priority
+                )
+            return [self._dedupe_single(self._parse_response(response)) for response in responses]
+
+        # 串接模式：先以最快的模型併發生成，只有未通過驗證的項目才逐一升級
+        stats_key = f"default:{test_type}"
+        models = self.cascade.get_models()
+        with telemetry_context('default'):
+            # 第一級同樣不經路由器切換等效模型
+            responses = self.ai_manager.generate_many(
+                prompts, models[0], concurrency=concurrency, use_cache=use_cache, return_exceptions=True,
+                priority=priority, route=False
+            )
+        suites = []
+        for prompt, response in zip(prompts, responses):
+            test_cases = None if isinstance(response, Exception) else self._parse_json_response(response)
+            if not self.cascade.validator(test_cases):
+                self.cascade.record(stats_key, 0, models[0])
+                suites.append(self._dedupe_single(test_cases))
+                continue
+            first_response = '' if isinstance(response, Exception) else response
+            with telemetry_context('default'):
+                test_cases, response = self.cascade.run(
+                    prompt, self._parse_json_response, stats_key, use_cache, start_level=1, priority=priority
+                )
+            if test_cases is None:
+                test_cases = self._parse_response(response or first_response)
+            suites.append(self._dedupe_single(test_cases))
+        return suites
+
+    def _build_prompt(self, description: str, test_type: str, instructions: str = '') -> str:
+        """建立更精確的 prompt"""
+        examples = self._few_shot_examples(description, DEFAULT_TEMPLATE)
+        return self.prompt_builder.build(description, test_type, DEFAULT_TEMPLATE, examples, instructions)
     
     def _parse_response(self, response: str) -> List[Dict[str, Any]]:
         """解析 AI 回應為測試用例"""
+        test_cases = self._parse_json_response(response)
+        if test_cases is not None:
+            return test_cases
+        
+        # 如果都失敗，返回基本格式
+        return self._create_basic_test_cases(response)
+    
+    def _parse_json_response(self, response: str) -> Optional[List[Dict[str, Any]]]:
+        """以 JSON 解析 AI 回應，無法解析時回傳 None"""
         try:
             # 嘗試直接解析 JSON
-            data = json.loads(response)
+            data = json_codec.loads(response)
             return data.get('test_cases', [])
         except json.JSONDecodeError:
             # 如果 JSON 解析失敗，嘗試提取 JSON 部分
@@ -262,13 +585,12 @@ class TestCaseGenerator:
                 end = response.rfind('}') + 1
                 if start != -1 and end != 0:
                     json_str = response[start:end]
-                    data = json.loads(json_str)
+                    data = json_codec.loads(json_str)
                     return data.get('test_cases', [])
             except:
                 pass
             
-            # 如果都失敗，返回基本格式
-            return self._create_basic_test_cases(response)
+            return None
     
     def _create_basic_test_cases(self, response: str) -> List[Dict[str, Any]]:
         """從文字回應建立基本測試用例"""
@@ -0,0 +1,145 @@
+"""
+測試用例資料模型
+以 __slots__ 類別取代鬆散的 dict 在各模組間傳遞測試用例，欄位在解碼時一次補齊預設值，
+步驟以 tuple 保存並共用重複出現的字串，大量用例（例如 Fuzz 輸出）時大幅降低記憶體用量
+"""
+
+import sys
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.generators.test_case_schema import validate_test_case
+
+CORE_FIELDS = ('id', 'title', 'description', 'type', 'steps', 'expected_result', 'priority')
+
+# 長度在此以內的字串會被 intern，讓重複的步驟與預期結果共用同一個物件
+_INTERN_MAX_LENGTH = 64
+
+
+class TestCaseDecodeError(ValueError):
+    """測試用例不符合結構定義"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors[:5]))
+        self.errors = errors
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ''
+    text = value if isinstance(value, str) else str(value)
+    return sys.intern(text) if len(text) <= _INTERN_MAX_LENGTH else text
+
+
+def _steps(value: Any) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return (_text(value),)
+    if isinstance(value, (list, tuple)):
+        return tuple(_text(step) for step in value)
+    return (_text(value),)
+
+
+class TestCase:
+    """單一測試用例；結構外的欄位（例如 fuzz_value、test_type）保存在 extra"""
+
+    __slots__ = CORE_FIELDS + ('extra',)
+
+    def __init__(self,
+                 title: str,
+                 steps: Iterable[str] = (),
+                 expected_result: str = '',
+                 id: str = '',
+                 description: str = '',
+                 type: str = '',
+                 priority: str = '',
+                 extra: Optional[Dict[str, Any]] = None):
+        self.id = _text(id)
+        self.title = _text(title)
+        self.description = _text(description)
+        self.type = _text(type)
+        self.steps = _steps(steps)
+        self.expected_result = _text(expected_result)
+        self.priority = _text(priority)
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], strict: bool = False) -> 'TestCase':
+        """由 dict 建立測試用例；strict 時依結構定義驗證，不符合則拋出 TestCaseDecodeError"""
+        if not isinstance(data, dict):
+            raise TestCaseDecodeError(['測試用例不是物件'])
+        if strict:
+            errors = validate_test_case(data)
+            if errors:
+                raise TestCaseDecodeError(errors)
+        extra = {key: value for key, value in data.items() if key not in CORE_FIELDS}
+        return cls(
+            data.get('title'),
+            data.get('steps'),
+            data.get('expected_result'),
+            data.get('id'),
+            data.get('description'),
+            data.get('type'),
+            data.get('priority'),
+            extra
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉回 dict，空白的選填欄位不輸出"""
+        data: Dict[str, Any] = {}
+        if self.id:
+            data['id'] = self.id
+        data['title'] = self.title
+        if self.description:
+            data['description'] = self.description
+        if self.type:
+            data['type'] = self.type
+        data['steps'] = list(self.steps)
+        data['expected_result'] = self.expected_result
+        if self.priority:
+            data['priority'] = self.priority
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TestCase):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"TestCase(id={self.id!r}, title={self.title!r}, steps={len(self.steps)})"
+
+
+TestCaseInput = Union[TestCase, Dict[str, Any]]
+
+
+def as_test_case(value: TestCaseInput, strict: bool = False) -> TestCase:
+    """將 dict 或 TestCase 統一為 TestCase"""
+    return value if isinstance(value, TestCase) else TestCase.from_dict(value, strict)
+
+
+def decode_test_cases(data: Union[str, bytes, Dict[str, Any], Iterable[TestCaseInput]],
+                      strict: bool = False) -> List[TestCase]:
+    """解碼測試用例：接受 JSON 字串、含 test_cases 的物件或用例列表；strict 時彙整所有結構錯誤後拋出"""
+    if isinstance(data, (str, bytes)):
+        data = json.loads(data)
+    if isinstance(data, dict):
+        data = data.get('test_cases', [])
+
+    test_cases = []
+    errors = []
+    for index, item in enumerate(data):
+        try:
+            test_cases.append(as_test_case(item, strict))
+        except TestCaseDecodeError as e:
+            errors.extend(f'test_cases[{index}]: {error}' for error in e.errors)
+    if errors:
+        raise TestCaseDecodeError(errors)
+    return test_cases
+
+
+def encode_test_cases(test_cases: Iterable[TestCase]) -> List[Dict[str, Any]]:
+    """將測試用例轉回可序列化為 JSON 的 dict 列表"""
+    return [test_case.to_dict() for test_case in test_cases]
@@ -0,0 +1,75 @@
+"""
+測試用例結構定義
+將結構定義預先編譯為檢查函式，驗證 AI 回應的測試用例格式
+"""
+
+from typing import Callable, Dict, List, Optional, Any
+
+TEST_CASE_SCHEMA = {
+    'id': {'type': str},
+    'title': {'type': str, 'required': True},
+    'description': {'type': str},
+    'type': {'type': str},
+    'steps': {'type': list, 'items': str, 'required': True},
+    'expected_result': {'type': str, 'required': True},
+    'priority': {'type': str, 'enum': ['high', 'medium', 'low']}
+}
+
+TYPE_NAMES = {
+    str: 'string',
+    list: 'array'
+}
+
+
+def compile_schema(schema: Dict[str, Dict[str, Any]]) -> Callable[[Dict[str, Any]], List[str]]:
+    """將結構定義編譯為單一檢查函式"""
+    checks = []
+
+    for field, rule in schema.items():
+        expected_type = rule['type']
+        required = rule.get('required', False)
+        enum = set(rule['enum']) if 'enum' in rule else None
+        item_type = rule.get('items')
+
+        def check(test_case: Dict[str, Any],
+                  field=field,
+                  expected_type=expected_type,
+                  required=required,
+                  enum=enum,
+                  item_type=item_type) -> Optional[str]:
+            value = test_case.get(field)
+            if value is None or value == '' or value == []:
+                return f'缺少必填欄位 {field}' if required else None
+            if not isinstance(value, expected_type):
+                return f'欄位 {field} 應為 {TYPE_NAMES[expected_type]}'
+            if enum is not None and value not in enum:
+                return f'欄位 {field} 必須是 {"|".join(sorted(enum))} 之一'
+            if item_type is not None and not all(isinstance(item, item_type) for item in value):
+                return f'欄位 {field} 的元素應為 {TYPE_NAMES[item_type]}'
+            return None
+
+        checks.append(check)
+
+    def validate(test_case: Dict[str, Any]) -> List[str]:
+        return [error for error in (check(test_case) for check in checks) if error]
+
+    return validate
+
+
+validate_test_case = compile_schema(TEST_CASE_SCHEMA)
+
+
+def validate_test_cases(test_cases: Optional[List[Dict[str, Any]]]) -> List[str]:
+    """驗證測試用例，回傳錯誤訊息列表（空列表代表通過）"""
+    if test_cases is None:
+        return ['回應不是可解析的 JSON']
+    if not isinstance(test_cases, list) or not test_cases:
+        return ['test_cases 必須是非空陣列']
+
+    errors = []
+    for index, test_case in enumerate(test_cases):
+        if not isinstance(test_case, dict):
+            errors.append(f'test_cases[{index}] 不是物件')
+            continue
+        errors.extend(f'test_cases[{index}]: {error}' for error in validate_test_case(test_case))
+    return errors
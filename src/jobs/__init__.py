@@ -0,0 +1 @@
+# 批次作業模組
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+批次生成作業
+從 JSONL/CSV 讀取大量功能描述，以有上限的工作執行緒池生成測試用例，
+結果逐筆寫入 JSONL；輸出檔同時作為檢查點，作業中斷後重新執行只會處理尚未成功的項目
+"""
+
+import os
+import csv
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Set
+
+from src.models.rate_limiter import PRIORITY_BULK
+
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+
+def load_items(path: str) -> List[Dict[str, Any]]:
+    """從 JSONL 或 CSV 載入作業項目（欄位：id、description、template、test_type、model）"""
+    items = []
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for index, row in enumerate(rows, 1):
+        description = (row.get('description') or '').strip()
+        if not description:
+            raise ValueError(f"第 {index} 筆缺少 description")
+        items.append({
+            'id': str(row.get('id') or index),
+            'description': description,
+            'template': row.get('template') or '',
+            'test_type': row.get('test_type') or 'functional',
+            'model': row.get('model') or ''
+        })
+    return items
+
+
+def load_completed(output_path: str) -> Set[str]:
+    """讀取輸出檔中已成功的項目 ID（輸出檔即檢查點）"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 中斷時可能留下寫到一半的最後一行
+                continue
+            if record.get('status') == 'ok':
+                completed.add(record['id'])
+    return completed
+
+
+class BulkJob:
+    """單一批次生成作業"""
+
+    def __init__(self,
+                 generator,
+                 input_path: str,
+                 output_path: str,
+                 model: str = 'gpt-4',
+                 concurrency: int = 5,
+                 use_cache: bool = True,
+                 job_id: Optional[str] = None):
+        self.generator = generator
+        self.input_path = input_path
+        self.output_path = output_path
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.use_cache = use_cache
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+
+        self.status = STATUS_PENDING
+        self.error: Optional[str] = None
+        self.total = 0
+        self.skipped = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _generate(self, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        model = item['model'] or self.model
+        # 以批次優先順序排隊，互動請求（/generate）可插隊；
+        # 不使用本地規則引擎備援，失敗的項目記為錯誤，續跑時才會重新以 AI 生成
+        if item['template']:
+            return self.generator.generate_with_template(
+                item['description'], item['template'], item['test_type'], model,
+                use_cache=self.use_cache, priority=PRIORITY_BULK, fallback=False
+            )
+        return self.generator.generate(
+            item['description'], item['test_type'], model,
+            use_cache=self.use_cache, priority=PRIORITY_BULK, fallback=False
+        )
+
+    def _process(self, item: Dict[str, Any], output) -> None:
+        if self._cancel.is_set():
+            return
+        record = {'id': item['id'], 'description': item['description']}
+        try:
+            record['test_cases'] = self._generate(item)
+            record['status'] = 'ok'
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = str(e)
+
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            output.write(line + '\n')
+            output.flush()
+            if record['status'] == 'ok':
+                self.succeeded += 1
+            else:
+                self.failed += 1
+
+    def run(self) -> Dict[str, Any]:
+        """同步執行作業，已成功的項目會被略過"""
+        self.status = STATUS_RUNNING
+        self.started_at = time.time()
+        self.finished_at = None
+        self.succeeded = self.failed = 0
+        self._cancel.clear()
+        try:
+            items = load_items(self.input_path)
+            completed = load_completed(self.output_path)
+            pending = [item for item in items if item['id'] not in completed]
+            self.total = len(items)
+            self.skipped = len(items) - len(pending)
+
+            directory = os.path.dirname(self.output_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.output_path, 'a', encoding='utf-8') as output:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    for future in [executor.submit(self._process, item, output) for item in pending]:
+                        future.result()
+
+            self.status = STATUS_CANCELLED if self._cancel.is_set() else STATUS_COMPLETED
+        except Exception as e:
+            self.status = STATUS_FAILED
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+        return self.get_progress()
+
+    def start(self):
+        """於背景執行緒執行作業"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.run, name=f'bulk-job-{self.job_id}', daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """取消作業，已送出的項目完成後停止"""
+        self._cancel.set()
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待背景作業結束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get_progress(self) -> Dict[str, Any]:
+        """取得作業進度"""
+        with self._lock:
+            done = self.skipped + self.succeeded + self.failed
+            progress = {
+                'job_id': self.job_id,
+                'status': self.status,
+                'model': self.model,
+                'total': self.total,
+                'skipped': self.skipped,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'done': done,
+                'percent': round(done / self.total * 100, 1) if self.total else 0.0,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'error': self.error
+            }
+        if self.started_at is not None and self.succeeded + self.failed:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            progress['items_per_second'] = round((self.succeeded + self.failed) / elapsed, 2) if elapsed else None
+        return progress
+
+
+class JobManager:
+    """管理批次作業，作業設定存放於 jobs_dir/<job_id>/job.json，重新啟動後仍可續跑"""
+
+    def __init__(self, generator, jobs_dir: str = './jobs', max_concurrency: int = 20):
+        self.generator = generator
+        self.jobs_dir = jobs_dir
+        self.max_concurrency = max_concurrency
+        self._jobs: Dict[str, BulkJob] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, generator) -> 'JobManager':
+        """依環境變數建立作業管理器"""
+        return cls(
+            generator,
+            jobs_dir=os.getenv('JOBS_DIR', './jobs'),
+            max_concurrency=int(os.getenv('JOBS_MAX_CONCURRENCY', 20))
+        )
+
+    def _job_dir(self, job_id: str) -> str:
+        # job_id 可能來自網址，不允許路徑分隔符號或 . / .. 跳出作業目錄
+        if job_id in ('', '.', '..') or '/' in job_id or '\\' in job_id:
+            raise ValueError(f"無效的作業 ID：{job_id}")
+        return os.path.join(self.jobs_dir, job_id)
+
+    def create(self,
+               items: List[Dict[str, Any]],
+               model: str = 'gpt-4',
+               concurrency: int = 5,
+               use_cache: bool = True) -> BulkJob:
+        """以項目清單建立並啟動作業"""
+        if not items:
+            raise ValueError("作業沒有任何項目")
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        input_path = os.path.join(job_dir, 'input.jsonl')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+        # 先驗證輸入，格式錯誤時立即回報
+        load_items(input_path)
+
+        config = {
+            'model': model,
+            'concurrency': min(max(1, concurrency), self.max_concurrency),
+            'use_cache': use_cache
+        }
+        with open(os.path.join(job_dir, 'job.json'), 'w', encoding='utf-8') as f:
+            json.dump(config, f)
+        with self._lock:
+            return self._start(job_id, config)
+
+    def _start(self, job_id: str, config: Dict[str, Any]) -> BulkJob:
+        """建立並啟動作業（呼叫端需持有鎖）"""
+        job_dir = self._job_dir(job_id)
+        job = BulkJob(
+            self.generator,
+            os.path.join(job_dir, 'input.jsonl'),
+            os.path.join(job_dir, 'results.jsonl'),
+            model=config['model'],
+            concurrency=config['concurrency'],
+            use_cache=config['use_cache'],
+            job_id=job_id
+        )
+        self._jobs[job_id] = job
+        job.start()
+        return job
+
+    def resume(self, job_id: str) -> BulkJob:
+        """續跑作業（包括服務重啟前未完成的作業），只處理尚未成功的項目；job_id 無效時拋出 ValueError"""
+        config_path = os.path.join(self._job_dir(job_id), 'job.json')
+        # 檢查與啟動在同一把鎖內完成，避免兩個作業同時寫入同一個結果檔
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in (STATUS_PENDING, STATUS_RUNNING):
+                return job
+
+            if not os.path.exists(config_path):
+                raise KeyError(job_id)
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            return self._start(job_id, config)
+
+    def get(self, job_id: str) -> Optional[BulkJob]:
+        """取得作業"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """列出本次服務期間的作業進度"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.get_progress() for job in jobs]
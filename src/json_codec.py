@@ -0,0 +1,124 @@
+"""
+JSON 編解碼層
+依可用套件選擇最快的實作（orjson > msgspec > 標準函式庫），供請求解碼、回應編碼與模型輸出解析共用，
+並提供大型陣列的分段串流編碼
+"""
+
+import os
+import json
+from typing import Any, Callable, Dict, Iterator, Tuple, Union
+
+from src.generators.test_case_model import TestCase
+
+BACKEND_AUTO = 'auto'
+BACKEND_ORJSON = 'orjson'
+BACKEND_MSGSPEC = 'msgspec'
+BACKEND_STDLIB = 'stdlib'
+
+
+def _default(obj: Any) -> Any:
+    """標準型別以外的物件轉換（TestCase、集合等）"""
+    if isinstance(obj, TestCase):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"無法序列化 {type(obj).__name__}")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _load_backend(name: str) -> Tuple[str, Callable[[Any], bytes], Callable[[Union[str, bytes]], Any]]:
+    """載入指定的實作，回傳 (名稱, dumps, loads)；套件未安裝時拋出 ImportError"""
+    if name == BACKEND_ORJSON:
+        import orjson
+
+        options = orjson.OPT_NON_STR_KEYS
+
+        def dumps(obj: Any) -> bytes:
+            try:
+                return orjson.dumps(obj, default=_default, option=options)
+            except TypeError:
+                # 超過 64 位元的整數等 orjson 不支援的值改用標準函式庫
+                return _stdlib_dumps(obj)
+
+        # orjson.JSONDecodeError 繼承自 json.JSONDecodeError，呼叫端的例外處理不需修改
+        return BACKEND_ORJSON, dumps, orjson.loads
+
+    if name == BACKEND_MSGSPEC:
+        import msgspec
+
+        encoder = msgspec.json.Encoder(enc_hook=_default)
+        decoder = msgspec.json.Decoder()
+
+        def loads(data: Union[str, bytes]) -> Any:
+            try:
+                return decoder.decode(data)
+            except msgspec.DecodeError as e:
+                raise json.JSONDecodeError(str(e), data if isinstance(data, str) else '', 0) from e
+
+        return BACKEND_MSGSPEC, encoder.encode, loads
+
+    if name == BACKEND_STDLIB:
+        return BACKEND_STDLIB, _stdlib_dumps, json.loads
+
+    raise ValueError(f"不支援的 JSON 實作: {name}")
+
+
+class JSONCodec:
+    """可替換實作的 JSON 編解碼器"""
+
+    def __init__(self, backend: str = BACKEND_AUTO):
+        candidates = [BACKEND_ORJSON, BACKEND_MSGSPEC, BACKEND_STDLIB] if backend == BACKEND_AUTO else [backend]
+        for candidate in candidates:
+            try:
+                self.backend, self._dumps, self._loads = _load_backend(candidate)
+                break
+            except ImportError:
+                if backend != BACKEND_AUTO:
+                    raise
+
+    @classmethod
+    def from_env(cls) -> 'JSONCodec':
+        """依環境變數建立編解碼器"""
+        return cls(os.getenv('JSON_CODEC', BACKEND_AUTO).lower())
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """編碼為 UTF-8 位元組（不跳脫非 ASCII 字元）"""
+        return self._dumps(obj)
+
+    def dumps(self, obj: Any) -> str:
+        """編碼為字串"""
+        return self._dumps(obj).decode('utf-8')
+
+    def loads(self, data: Union[str, bytes, bytearray]) -> Any:
+        """解碼 JSON，格式錯誤時拋出 json.JSONDecodeError"""
+        if isinstance(data, bytearray):
+            data = bytes(data)
+        return self._loads(data)
+
+    def iter_encode(self, payload: Dict[str, Any], key: str, chunk_size: int = 1000) -> Iterator[bytes]:
+        """將 payload 中 key 對應的大型陣列分段編碼，其餘欄位先行輸出，避免一次建立完整回應"""
+        items = payload[key]
+        head = {name: value for name, value in payload.items() if name != key}
+        prefix = self._dumps(head)[:-1]
+        yield prefix + (b',' if head else b'') + self._dumps(key) + b':['
+        for start in range(0, len(items), chunk_size):
+            chunk = self._dumps(items[start:start + chunk_size])[1:-1]
+            if chunk:
+                yield (b',' if start else b'') + chunk
+        yield b']}'
+
+
+codec = JSONCodec.from_env()
+
+
+def dumps(obj: Any) -> str:
+    """以共用編解碼器編碼為字串"""
+    return codec.dumps(obj)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """以共用編解碼器解碼"""
+    return codec.loads(data)
@@ -4,36 +4,101 @@ AI 模型管理器
 """
 
 import os
+import time
+import asyncio
 import openai
 import groq
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterator, Tuple
 import json
+import weakref
+import threading
+from src.models.response_cache import ResponseCache
+from src.models.single_flight import SingleFlight
+from src.models.rate_limiter import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from src.models.model_router import ModelRouter
+from src.models.cassette import Cassette, MODE_REPLAY
+from src.models.http_transport import SharedHTTPTransport
+from src.models.telemetry import LLMTelemetry
+from src.generators.rule_engine import RuleBasedGenerator
+
+# 支援 response_format={"type": "json_object"} 的模型
+JSON_MODE_MODELS = {
+    'gpt-3.5-turbo',
+    'gpt-4-turbo',
+    'gpt-4o',
+    'llama3-8b-8192',
+    'llama3-70b-8192',
+    'mixtral-8x7b-32768'
+}
 
 class AIModelManager:
     """AI 模型管理器"""
     
-    def __init__(self):
-        self.openai_client = None
-        self.groq_client = None
-        self._initialize_clients()
+    def __init__(self,
+                 cache: Optional[ResponseCache] = None,
+                 scheduler: Optional[RequestScheduler] = None,
+                 router: Optional[ModelRouter] = None,
+                 cassette: Optional[Cassette] = None,
+                 transport: Optional[SharedHTTPTransport] = None,
+                 telemetry: Optional[LLMTelemetry] = None):
+        self._openai_client = None
+        self._groq_client = None
+        self._client_lock = threading.Lock()
+        self.transport = transport if transport is not None else SharedHTTPTransport.from_env()
+        self.openai_api_key = None
+        self.groq_api_key = None
+        # 非同步客戶端綁定於事件迴圈，依迴圈分別建立
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.cache = cache if cache is not None else ResponseCache.from_env()
+        self.single_flight = SingleFlight()
+        self.scheduler = scheduler if scheduler is not None else RequestScheduler.from_env()
+        self.router = router if router is not None else ModelRouter.from_env(self.has_client)
+        self.cassette = cassette if cassette is not None else Cassette.from_env()
+        self.telemetry = telemetry if telemetry is not None else LLMTelemetry.from_env()
+        self.local_engine = RuleBasedGenerator()
+        self._load_api_keys()
         
-    def _initialize_clients(self):
-        """初始化 AI 客戶端"""
-        # 初始化 OpenAI 客戶端
+    def _load_api_keys(self):
+        """載入 API 金鑰（客戶端於首次使用時才建立）"""
         openai_api_key = os.getenv('OPENAI_API_KEY')
         if openai_api_key and openai_api_key != 'your_openai_api_key_here':
-            self.openai_client = openai.OpenAI(api_key=openai_api_key)
+            self.openai_api_key = openai_api_key
             
-        # 初始化 Groq 客戶端
         groq_api_key = os.getenv('GROQ_API_KEY')
         if groq_api_key and groq_api_key != 'your_groq_api_key_here':
-            self.groq_client = groq.Groq(api_key=groq_api_key)
+            self.groq_api_key = groq_api_key
+    
+    @property
+    def openai_client(self) -> Optional[openai.OpenAI]:
+        """OpenAI 客戶端，首次使用時以共用連線池建立；重試與退避一律交由排程器處理"""
+        if self._openai_client is None and self.openai_api_key:
+            with self._client_lock:
+                if self._openai_client is None:
+                    self._openai_client = openai.OpenAI(
+                        api_key=self.openai_api_key,
+                        http_client=self.transport.get_client(),
+                        max_retries=0
+                    )
+        return self._openai_client
+    
+    @property
+    def groq_client(self) -> Optional[groq.Groq]:
+        """Groq 客戶端，首次使用時以共用連線池建立"""
+        if self._groq_client is None and self.groq_api_key:
+            with self._client_lock:
+                if self._groq_client is None:
+                    self._groq_client = groq.Groq(
+                        api_key=self.groq_api_key,
+                        http_client=self.transport.get_client(),
+                        max_retries=0
+                    )
+        return self._groq_client
     
     def get_available_models(self) -> List[Dict[str, Any]]:
         """取得可用的 AI 模型"""
         models = []
         
-        if self.openai_client:
+        if self.openai_api_key:
             models.extend([
                 {
                     'id': 'gpt-4',
@@ -49,7 +114,7 @@ class AIModelManager:
                 }
             ])
             
-        if self.groq_client:
+        if self.groq_api_key:
             models.extend([
                 {
                     'id': 'llama3-8b-8192',
@@ -71,6 +136,15 @@ class AIModelManager:
                 }
             ])
         
+        # 有任一供應商可用時，提供模型串接選項
+        if models:
+            models.append({
+                'id': 'cascade',
+                'name': 'Auto Cascade',
+                'provider': 'cascade',
+                'description': '先使用快速模型，輸出未通過驗證時自動升級到較大模型'
+            })
+        
         # 如果沒有可用的模型，提供模擬模型
         if not models:
             models = [
@@ -88,8 +162,95 @@ class AIModelManager:
                          prompt: str, 
                          model: str = 'gpt-4',
                          temperature: float = 0.7,
-                         max_tokens: int = 2000) -> str:
-        """生成 AI 回應"""
+                         max_tokens: int = 2000,
+                         use_cache: bool = True,
+                         priority: str = PRIORITY_INTERACTIVE,
+                         json_mode: bool = False,
+                         route: bool = True) -> str:
+        """生成 AI 回應（相同參數的請求優先由快取回應，並行的相同請求合併為一次呼叫）；
+        route 為 False 時只呼叫指定模型，不經路由器切換到等效模型"""
+        
+        key = self._cache_key(prompt, model, temperature, max_tokens, json_mode)
+        respond = self._route_response if route else self._dispatch_response
+        # 不經路由的呼叫不可與可能被切換模型的呼叫共用結果
+        flight_key = key if route else f'{key}:direct'
+        if not use_cache or self.cache is None:
+            return self.single_flight.do(
+                flight_key, lambda: respond(prompt, model, temperature, max_tokens, priority, json_mode)
+            )
+        
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        def fetch() -> str:
+            response = respond(prompt, model, temperature, max_tokens, priority, json_mode)
+            self.cache.set(key, response)
+            return response
+        
+        return self.single_flight.do(flight_key, fetch)
+    
+    def _cache_key(self, prompt: str, model: str, temperature: float, max_tokens: int, json_mode: bool = False) -> str:
+        """回應快取鍵；未設定 API 金鑰時回應來自本地示範引擎，與真實模型的快取分開存放"""
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens, json_mode)
+        return key if self.has_client(model) else f'demo:{key}'
+    
+    def has_client(self, model: str) -> bool:
+        """判斷模型對應的供應商客戶端是否可用"""
+        if model == 'demo-model':
+            return False
+        if model.startswith('gpt-'):
+            return self.openai_api_key is not None
+        return self.groq_api_key is not None
+    
+    def supports_json_mode(self, model: str) -> bool:
+        """判斷模型是否支援 JSON 結構化輸出"""
+        return model in JSON_MODE_MODELS
+    
+    def _route_response(self,
+                        prompt: str,
+                        model: str,
+                        temperature: float,
+                        max_tokens: int,
+                        priority: str = PRIORITY_INTERACTIVE,
+                        json_mode: bool = False) -> str:
+        """經由模型路由器生成回應，故障或過慢時切換到等效模型"""
+        if not self.has_client(model):
+            return self._dispatch_response(prompt, model, temperature, max_tokens, priority, json_mode)
+        return self.router.execute(
+            model,
+            lambda candidate: self._dispatch_response(prompt, candidate, temperature, max_tokens, priority, json_mode)
+        )
+    
+    def _dispatch_response(self,
+                           prompt: str,
+                           model: str,
+                           temperature: float,
+                           max_tokens: int,
+                           priority: str = PRIORITY_INTERACTIVE,
+                           json_mode: bool = False) -> str:
+        """依模型選擇客戶端並生成回應（啟用 cassette 時錄製或重播）"""
+        
+        if self.cassette is None:
+            return self._call_provider(prompt, model, temperature, max_tokens, priority, json_mode)
+        
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens, json_mode)
+        if self.cassette.mode == MODE_REPLAY:
+            return self.cassette.replay(key)
+        
+        started_at = time.monotonic()
+        response = self._call_provider(prompt, model, temperature, max_tokens, priority, json_mode)
+        self.cassette.record(key, model, prompt, response, time.monotonic() - started_at)
+        return response
+    
+    def _call_provider(self,
+                       prompt: str,
+                       model: str,
+                       temperature: float,
+                       max_tokens: int,
+                       priority: str = PRIORITY_INTERACTIVE,
+                       json_mode: bool = False) -> str:
+        """實際呼叫供應商生成回應"""
         
         # 如果是示範模型，使用模擬回應
         if model == 'demo-model':
@@ -99,167 +260,445 @@ class AIModelManager:
         if model.startswith('gpt-'):
             if not self.openai_client:
                 return self._generate_demo_response(prompt)
-            return self._generate_openai_response(prompt, model, temperature, max_tokens)
+            return self._generate_openai_response(prompt, model, temperature, max_tokens, priority, json_mode)
         else:
             if not self.groq_client:
                 return self._generate_demo_response(prompt)
-            return self._generate_groq_response(prompt, model, temperature, max_tokens)
+            return self._generate_groq_response(prompt, model, temperature, max_tokens, priority, json_mode)
     
-    def _generate_demo_response(self, prompt: str) -> str:
-        """生成示範回應"""
-        # 根據 prompt 內容生成模擬回應
-        if '登入' in prompt or 'login' in prompt:
-            return '''{
-    "test_cases": [
-        {
-            "id": "TC001",
-            "title": "使用正確帳密登入",
-            "description": "測試使用正確的用戶名和密碼進行登入",
-            "type": "positive",
-            "steps": [
-                "打開登入頁面",
-                "輸入正確的用戶名",
-                "輸入正確的密碼",
-                "點擊登入按鈕"
-            ],
-            "expected_result": "成功登入並導向 Dashboard 頁面",
-            "priority": "high"
-        },
-        {
-            "id": "TC002",
-            "title": "輸入錯誤密碼",
-            "description": "測試使用錯誤密碼時的錯誤處理",
-            "type": "negative",
-            "steps": [
-                "打開登入頁面",
-                "輸入正確的用戶名",
-                "輸入錯誤的密碼",
-                "點擊登入按鈕"
-            ],
-            "expected_result": "顯示「帳號或密碼錯誤」訊息",
-            "priority": "high"
-        },
-        {
-            "id": "TC003",
-            "title": "空白密碼欄位",
-            "description": "測試密碼欄位為空時的驗證",
-            "type": "negative",
-            "steps": [
-                "打開登入頁面",
-                "輸入用戶名",
-                "保持密碼欄位空白",
-                "點擊登入按鈕"
-            ],
-            "expected_result": "顯示「密碼為必填」錯誤訊息",
-            "priority": "medium"
-        },
-        {
-            "id": "TC004",
-            "title": "特殊符號用戶名",
-            "description": "測試包含特殊符號的用戶名輸入",
-            "type": "negative",
-            "steps": [
-                "打開登入頁面",
-                "輸入包含特殊符號的用戶名",
-                "輸入密碼",
-                "點擊登入按鈕"
-            ],
-            "expected_result": "顯示「用戶名格式錯誤」提示",
-            "priority": "medium"
-        },
-        {
-            "id": "TC005",
-            "title": "按下 Enter 鍵登入",
-            "description": "測試使用 Enter 鍵進行登入",
-            "type": "positive",
-            "steps": [
-                "打開登入頁面",
-                "輸入正確的用戶名",
-                "輸入正確的密碼",
-                "按下 Enter 鍵"
-            ],
-            "expected_result": "成功登入並導向 Dashboard 頁面",
-            "priority": "medium"
-        }
-    ]
-}'''
+    def generate_response_stream(self,
+                                 prompt: str,
+                                 model: str = 'gpt-4',
+                                 temperature: float = 0.7,
+                                 max_tokens: int = 2000,
+                                 use_cache: bool = True) -> Iterator[str]:
+        """以串流方式生成 AI 回應，逐段產出文字"""
+        
+        key = None
+        if use_cache and self.cache is not None:
+            key = self._cache_key(prompt, model, temperature, max_tokens)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        
+        chunks = []
+        for chunk in self._dispatch_stream(prompt, model, temperature, max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        
+        if key is not None:
+            self.cache.set(key, ''.join(chunks))
+    
+    def _dispatch_stream(self,
+                         prompt: str,
+                         model: str,
+                         temperature: float,
+                         max_tokens: int) -> Iterator[str]:
+        """依模型選擇客戶端並以串流生成回應（啟用 cassette 時錄製或重播）"""
+        
+        if self.cassette is None:
+            yield from self._call_provider_stream(prompt, model, temperature, max_tokens)
+            return
+        
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens)
+        if self.cassette.mode == MODE_REPLAY:
+            response = self.cassette.replay(key)
+            for start in range(0, len(response), 64):
+                yield response[start:start + 64]
+            return
+        
+        started_at = time.monotonic()
+        chunks = []
+        for chunk in self._call_provider_stream(prompt, model, temperature, max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        self.cassette.record(key, model, prompt, ''.join(chunks), time.monotonic() - started_at)
+    
+    def _call_provider_stream(self,
+                              prompt: str,
+                              model: str,
+                              temperature: float,
+                              max_tokens: int) -> Iterator[str]:
+        """實際以串流呼叫供應商"""
+        
+        if model.startswith('gpt-'):
+            client, provider = self.openai_client, 'OpenAI'
         else:
-            return '''{
-    "test_cases": [
-        {
-            "id": "TC001",
-            "title": "基本功能測試",
-            "description": "測試基本功能是否正常運作",
-            "type": "positive",
-            "steps": [
-                "打開測試頁面",
-                "執行基本操作",
-                "驗證結果"
-            ],
-            "expected_result": "功能正常運作",
-            "priority": "high"
-        },
-        {
-            "id": "TC002",
-            "title": "錯誤處理測試",
-            "description": "測試錯誤情況的處理",
-            "type": "negative",
-            "steps": [
-                "打開測試頁面",
-                "執行錯誤操作",
-                "檢查錯誤處理"
-            ],
-            "expected_result": "正確處理錯誤情況",
-            "priority": "medium"
-        }
-    ]
-}'''
+            client, provider = self.groq_client, 'Groq'
+        
+        if model == 'demo-model' or not client:
+            # 示範回應以固定大小切段，模擬串流輸出
+            response = self._generate_demo_response(prompt)
+            for start in range(0, len(response), 64):
+                yield response[start:start + 64]
+            return
+        
+        started_at = time.monotonic()
+        ttft = None
+        usage = None
+        chunks = []
+        try:
+            stream = self.scheduler.execute(
+                provider.lower(),
+                model,
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                ),
+                RequestScheduler.estimate_tokens(prompt, max_tokens)
+            )
+            for event in stream:
+                # Groq 於最後一個事件的 x_groq 欄位附上用量
+                usage = getattr(event, 'usage', None) or getattr(getattr(event, 'x_groq', None), 'usage', None) or usage
+                if event.choices and event.choices[0].delta.content:
+                    if ttft is None:
+                        ttft = time.monotonic() - started_at
+                    chunks.append(event.choices[0].delta.content)
+                    yield event.choices[0].delta.content
+        except Exception as e:
+            self._record_telemetry(model, started_at, success=False)
+            raise Exception(f"{provider} API 錯誤: {str(e)}")
+        self._record_telemetry(model, started_at, usage, prompt, ''.join(chunks), ttft)
+    
+    async def agenerate_response(self,
+                                 prompt: str,
+                                 model: str = 'gpt-4',
+                                 temperature: float = 0.7,
+                                 max_tokens: int = 2000,
+                                 use_cache: bool = True,
+                                 priority: str = PRIORITY_BULK,
+                                 json_mode: bool = False,
+                                 route: bool = True) -> str:
+        """以非同步客戶端生成 AI 回應（快取、請求合併、路由與 JSON 模式同 generate_response）"""
+        
+        key = self._cache_key(prompt, model, temperature, max_tokens, json_mode)
+        respond = self._aroute_response if route else self._adispatch_response
+        flight_key = key if route else f'{key}:direct'
+        if not use_cache or self.cache is None:
+            return await self.single_flight.ado(
+                flight_key, lambda: respond(prompt, model, temperature, max_tokens, priority, json_mode)
+            )
+        
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        
+        async def fetch() -> str:
+            response = await respond(prompt, model, temperature, max_tokens, priority, json_mode)
+            self.cache.set(key, response)
+            return response
+        
+        return await self.single_flight.ado(flight_key, fetch)
+    
+    async def _aroute_response(self,
+                               prompt: str,
+                               model: str,
+                               temperature: float,
+                               max_tokens: int,
+                               priority: str = PRIORITY_BULK,
+                               json_mode: bool = False) -> str:
+        """經由模型路由器以非同步客戶端生成回應"""
+        if not self.has_client(model):
+            return await self._adispatch_response(prompt, model, temperature, max_tokens, priority, json_mode)
+        return await self.router.aexecute(
+            model,
+            lambda candidate: self._adispatch_response(prompt, candidate, temperature, max_tokens, priority, json_mode)
+        )
+    
+    async def _adispatch_response(self,
+                                  prompt: str,
+                                  model: str,
+                                  temperature: float,
+                                  max_tokens: int,
+                                  priority: str = PRIORITY_BULK,
+                                  json_mode: bool = False) -> str:
+        """依模型選擇非同步客戶端並生成回應（啟用 cassette 時錄製或重播）"""
+        
+        if self.cassette is None:
+            return await self._acall_provider(prompt, model, temperature, max_tokens, priority, json_mode)
+        
+        key = ResponseCache.make_key(prompt, model, temperature, max_tokens, json_mode)
+        if self.cassette.mode == MODE_REPLAY:
+            return await self.cassette.areplay(key)
+        
+        started_at = time.monotonic()
+        response = await self._acall_provider(prompt, model, temperature, max_tokens, priority, json_mode)
+        self.cassette.record(key, model, prompt, response, time.monotonic() - started_at)
+        return response
+    
+    async def _acall_provider(self,
+                              prompt: str,
+                              model: str,
+                              temperature: float,
+                              max_tokens: int,
+                              priority: str = PRIORITY_BULK,
+                              json_mode: bool = False) -> str:
+        """實際以非同步客戶端呼叫供應商"""
+        
+        if model == 'demo-model':
+            return self._generate_demo_response(prompt)
+        
+        provider = 'OpenAI' if model.startswith('gpt-') else 'Groq'
+        client = self._get_async_client(provider)
+        if not client:
+            return self._generate_demo_response(prompt)
+        
+        started_at = time.monotonic()
+        try:
+            response = await self.scheduler.aexecute(
+                provider.lower(),
+                model,
+                lambda: client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **self._completion_options(model, json_mode)
+                ),
+                RequestScheduler.estimate_tokens(prompt, max_tokens),
+                priority
+            )
+        except Exception as e:
+            self._record_telemetry(model, started_at, success=False)
+            raise Exception(f"{provider} API 錯誤: {str(e)}")
+        content = response.choices[0].message.content
+        self._record_telemetry(model, started_at, response.usage, prompt, content)
+        return content
+    
+    def _get_async_client(self, provider: str):
+        """取得目前事件迴圈的非同步客戶端"""
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, {})
+        if provider not in clients:
+            if provider == 'OpenAI':
+                api_key, client_class = self.openai_api_key, openai.AsyncOpenAI
+            else:
+                api_key, client_class = self.groq_api_key, groq.AsyncGroq
+            clients[provider] = client_class(
+                api_key=api_key,
+                http_client=self.transport.get_async_client(),
+                max_retries=0
+            ) if api_key else None
+        return clients[provider]
+    
+    def generate_many(self,
+                      prompts: List[str],
+                      model: str = 'gpt-4',
+                      concurrency: int = 5,
+                      temperature: float = 0.7,
+                      max_tokens: int = 2000,
+                      use_cache: bool = True,
+                      return_exceptions: bool = False,
+                      priority: str = PRIORITY_BULK,
+                      json_mode: bool = False,
+                      route: bool = True) -> List[Any]:
+        """併發生成多個回應，結果順序與 prompts 相同"""
+        
+        async def run() -> List[Any]:
+            try:
+                return await self.agenerate_many(
+                    prompts, model, concurrency, temperature, max_tokens, use_cache, return_exceptions, priority,
+                    json_mode, route
+                )
+            finally:
+                # 事件迴圈即將關閉，一併釋放綁定於此迴圈的連線池
+                await self.transport.aclose()
+        
+        return asyncio.run(run())
+    
+    async def agenerate_many(self,
+                             prompts: List[str],
+                             model: str = 'gpt-4',
+                             concurrency: int = 5,
+                             temperature: float = 0.7,
+                             max_tokens: int = 2000,
+                             use_cache: bool = True,
+                             return_exceptions: bool = False,
+                             priority: str = PRIORITY_BULK,
+                             json_mode: bool = False,
+                             route: bool = True) -> List[Any]:
+        """以信號量限制併發數的非同步批次生成"""
+        if concurrency < 1:
+            raise ValueError("concurrency 必須大於 0")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate_response(
+                    prompt, model, temperature, max_tokens, use_cache, priority, json_mode, route
+                )
+        
+        return await asyncio.gather(
+            *(run(prompt) for prompt in prompts),
+            return_exceptions=return_exceptions
+        )
+    
+    def _completion_options(self, model: str, json_mode: bool) -> Dict[str, Any]:
+        """額外的 completion 參數；要求 JSON 輸出時僅對支援的模型啟用"""
+        if json_mode and self.supports_json_mode(model):
+            return {'response_format': {'type': 'json_object'}}
+        return {}
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, str]]:
+        """建立對話訊息"""
+        return [
+            {"role": "system", "content": "你是一個專業的軟體測試工程師，專門生成高品質的測試用例。"},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _generate_demo_response(self, prompt: str) -> str:
+        """以本地規則引擎生成示範回應（不需網路）"""
+        return self.local_engine.generate_from_prompt(prompt)
     
     def _generate_openai_response(self, 
                                  prompt: str, 
                                  model: str,
                                  temperature: float,
-                                 max_tokens: int) -> str:
+                                 max_tokens: int,
+                                 priority: str = PRIORITY_INTERACTIVE,
+                                 json_mode: bool = False) -> str:
         """使用 OpenAI 生成回應"""
+        started_at = time.monotonic()
         try:
-            response = self.openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "你是一個專業的軟體測試工程師，專門生成高品質的測試用例。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
+            response = self.scheduler.execute(
+                'openai',
+                model,
+                lambda: self.openai_client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **self._completion_options(model, json_mode)
+                ),
+                RequestScheduler.estimate_tokens(prompt, max_tokens),
+                priority
             )
-            return response.choices[0].message.content
         except Exception as e:
+            self._record_telemetry(model, started_at, success=False)
             raise Exception(f"OpenAI API 錯誤: {str(e)}")
+        content = response.choices[0].message.content
+        self._record_telemetry(model, started_at, response.usage, prompt, content)
+        return content
     
     def _generate_groq_response(self, 
                                prompt: str, 
                                model: str,
                                temperature: float,
-                               max_tokens: int) -> str:
+                               max_tokens: int,
+                               priority: str = PRIORITY_INTERACTIVE,
+                               json_mode: bool = False) -> str:
         """使用 Groq 生成回應"""
+        started_at = time.monotonic()
         try:
-            response = self.groq_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "你是一個專業的軟體測試工程師，專門生成高品質的測試用例。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens
+            response = self.scheduler.execute(
+                'groq',
+                model,
+                lambda: self.groq_client.chat.completions.create(
+                    model=model,
+                    messages=self._build_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **self._completion_options(model, json_mode)
+                ),
+                RequestScheduler.estimate_tokens(prompt, max_tokens),
+                priority
             )
-            return response.choices[0].message.content
         except Exception as e:
+            self._record_telemetry(model, started_at, success=False)
             raise Exception(f"Groq API 錯誤: {str(e)}")
+        content = response.choices[0].message.content
+        self._record_telemetry(model, started_at, response.usage, prompt, content)
+        return content
     
-    def test_connection(self, model: str = 'gpt-4') -> bool:
-        """測試模型連接"""
+    def _record_telemetry(self,
+                          model: str,
+                          started_at: float,
+                          usage: Any = None,
+                          prompt: str = '',
+                          completion: str = '',
+                          ttft: Optional[float] = None,
+                          success: bool = True):
+        """記錄一次供應商呼叫的遙測，供應商未回傳用量時以字數粗估"""
+        if usage is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens
+        else:
+            prompt_tokens = len(prompt) // 2
+            completion_tokens = len(completion or '') // 2
+        self.telemetry.record(
+            model,
+            time.monotonic() - started_at,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            ttft=ttft,
+            success=success
+        )
+    
+    def get_configured_providers(self) -> List[str]:
+        """取得已設定 API 金鑰的供應商"""
+        providers = []
+        if self.openai_api_key:
+            providers.append('openai')
+        if self.groq_api_key:
+            providers.append('groq')
+        return providers
+    
+    def check_provider(self, provider: str, timeout: float = 5.0) -> Tuple[bool, Optional[float], Optional[str]]:
+        """以列出模型的輕量請求檢查供應商是否可連線，回傳 (是否正常, 延遲秒數, 錯誤訊息)"""
+        client = self.openai_client if provider == 'openai' else self.groq_client
+        if client is None:
+            return False, None, '未設定 API 金鑰'
+        
+        started_at = time.monotonic()
         try:
-            test_prompt = "請回應 '連接成功'"
-            response = self.generate_response(test_prompt, model, temperature=0.1, max_tokens=10)
-            return "連接成功" in response
-        except Exception:
-            return False 
\ No newline at end of file
+            client.with_options(timeout=timeout, max_retries=0).models.list()
+            return True, time.monotonic() - started_at, None
+        except Exception as e:
+            return False, time.monotonic() - started_at, str(e)
+    
+    def test_connection(self, model: str = 'gpt-4') -> bool:
+        """測試模型連接（不發出付費的 completion 請求）"""
+        if not self.has_client(model):
+            return False
+        provider = 'openai' if model.startswith('gpt-') else 'groq'
+        return self.check_provider(provider)[0]
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """取得回應快取統計"""
+        if self.cache is None:
+            stats = {'enabled': False}
+        else:
+            stats = self.cache.get_stats()
+            stats['enabled'] = True
+        stats['single_flight'] = self.single_flight.get_stats()
+        return stats
+    
+    def get_cassette_stats(self) -> Dict[str, Any]:
+        """取得錄製／重播統計"""
+        if self.cassette is None:
+            return {'mode': 'off'}
+        return self.cassette.get_stats()
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """取得共用 HTTP 連線池統計"""
+        stats = self.transport.get_stats()
+        stats['openai_client_ready'] = self._openai_client is not None
+        stats['groq_client_ready'] = self._groq_client is not None
+        return stats
+    
+    def get_metrics(self) -> str:
+        """取得 Prometheus 文字格式的 LLM 呼叫指標"""
+        return self.telemetry.render_prometheus()
+    
+    def get_router_stats(self) -> Dict[str, Any]:
+        """取得模型路由統計"""
+        return self.router.get_stats()
+    
+    def get_scheduler_stats(self) -> Dict[str, Any]:
+        """取得速率限制排程統計"""
+        return self.scheduler.get_stats()
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+錄製／重播供應商
+錄製模式將 prompt、回應與延遲寫入 cassette 檔案；重播模式由檔案回應，
+可重現錄製時的延遲或以錄製資料擬合的延遲分佈模擬，用於離線壓測與確定性測試
+"""
+
+import os
+import json
+import math
+import time
+import random
+import asyncio
+import threading
+from typing import Dict, List, Optional, Any
+
+MODE_OFF = 'off'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+LATENCY_NONE = 'none'
+LATENCY_RECORDED = 'recorded'
+LATENCY_SYNTHETIC = 'synthetic'
+
+
+class CassetteMiss(Exception):
+    """重播模式下找不到對應的錄製回應"""
+
+
+class Cassette:
+    """LLM 呼叫錄製／重播器"""
+
+    def __init__(self,
+                 path: str = './cassettes/llm.jsonl',
+                 mode: str = MODE_RECORD,
+                 latency_mode: str = LATENCY_RECORDED,
+                 latency_scale: float = 1.0,
+                 seed: Optional[int] = None):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"不支援的 cassette 模式: {mode}")
+        if latency_mode not in (LATENCY_NONE, LATENCY_RECORDED, LATENCY_SYNTHETIC):
+            raise ValueError(f"不支援的延遲模式: {latency_mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency_mode = latency_mode
+        self.latency_scale = latency_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._log_latency = None
+        self.stats = {
+            'recorded': 0,
+            'replayed': 0,
+            'misses': 0
+        }
+
+        if mode == MODE_REPLAY:
+            self._load()
+        else:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['Cassette']:
+        """依環境變數建立 cassette，未啟用時回傳 None"""
+        mode = os.getenv('LLM_CASSETTE_MODE', MODE_OFF).lower()
+        if mode == MODE_OFF:
+            return None
+        return cls(
+            path=os.getenv('LLM_CASSETTE_PATH', './cassettes/llm.jsonl'),
+            mode=mode,
+            latency_mode=os.getenv('LLM_REPLAY_LATENCY', LATENCY_RECORDED).lower(),
+            latency_scale=float(os.getenv('LLM_REPLAY_LATENCY_SCALE', 1.0))
+        )
+
+    def _load(self):
+        """載入錄製檔，並擬合對數常態延遲分佈"""
+        latencies = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._entries.setdefault(entry['key'], []).append(entry)
+                if entry.get('latency', 0) > 0:
+                    latencies.append(math.log(entry['latency']))
+
+        if latencies:
+            mean = sum(latencies) / len(latencies)
+            variance = sum((value - mean) ** 2 for value in latencies) / len(latencies)
+            self._log_latency = (mean, math.sqrt(variance))
+
+    def record(self, key: str, model: str, prompt: str, response: str, latency: float):
+        """寫入一筆錄製資料"""
+        entry = {
+            'key': key,
+            'model': model,
+            'prompt': prompt,
+            'response': response,
+            'latency': latency,
+            'recorded_at': time.time()
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self.stats['recorded'] += 1
+
+    def _next_entry(self, key: str) -> Dict[str, Any]:
+        """取得鍵值對應的下一筆錄製資料，同一請求錄製多次時依序輪替"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats['misses'] += 1
+                raise CassetteMiss(f"cassette 中沒有對應的回應: {key[:12]}")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            self.stats['replayed'] += 1
+            return entries[cursor % len(entries)]
+
+    def _latency_for(self, entry: Dict[str, Any]) -> float:
+        if self.latency_mode == LATENCY_RECORDED:
+            return entry.get('latency', 0) * self.latency_scale
+        if self.latency_mode == LATENCY_SYNTHETIC and self._log_latency is not None:
+            mean, stddev = self._log_latency
+            with self._lock:
+                sample = self._random.lognormvariate(mean, stddev)
+            return sample * self.latency_scale
+        return 0.0
+
+    def replay(self, key: str) -> str:
+        """重播錄製的回應，並模擬延遲"""
+        entry = self._next_entry(key)
+        latency = self._latency_for(entry)
+        if latency > 0:
+            time.sleep(latency)
+        return entry['response']
+
+    async def areplay(self, key: str) -> str:
+        """非同步重播"""
+        entry = self._next_entry(key)
+        latency = self._latency_for(entry)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return entry['response']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得錄製／重播統計"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['mode'] = self.mode
+        stats['path'] = self.path
+        stats['keys'] = len(self._entries)
+        return stats
@@ -0,0 +1,127 @@
+"""
+共用 HTTP 傳輸層
+OpenAI 與 Groq 客戶端共用同一個連線池（keep-alive、連線數上限、逾時，環境支援時啟用 HTTP/2），
+避免每個客戶端各自建立連線池與重複的 TLS 交握
+"""
+
+import os
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class SharedHTTPTransport:
+    """共用 HTTP 連線池"""
+
+    def __init__(self,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 60.0,
+                 connect_timeout: float = 10.0,
+                 read_timeout: float = 120.0,
+                 http2: bool = True):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.http2 = http2 and HTTP2_AVAILABLE
+
+        self._lock = threading.Lock()
+        self._client = None
+        # 非同步連線池綁定於事件迴圈，依迴圈分別建立
+        self._async_clients = weakref.WeakKeyDictionary()
+        self.stats = {
+            'requests': 0,
+            'async_requests': 0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'SharedHTTPTransport':
+        """依環境變數建立傳輸層"""
+        return cls(
+            max_connections=int(os.getenv('HTTP_MAX_CONNECTIONS', 100)),
+            max_keepalive_connections=int(os.getenv('HTTP_MAX_KEEPALIVE', 20)),
+            keepalive_expiry=float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 60)),
+            connect_timeout=float(os.getenv('HTTP_CONNECT_TIMEOUT', 10)),
+            read_timeout=float(os.getenv('HTTP_READ_TIMEOUT', 120)),
+            http2=os.getenv('HTTP2_ENABLED', 'True').lower() == 'true'
+        )
+
+    def _count(self, request: httpx.Request):
+        with self._lock:
+            self.stats['requests'] += 1
+
+    async def _acount(self, request: httpx.Request):
+        with self._lock:
+            self.stats['async_requests'] += 1
+
+    def get_client(self) -> httpx.Client:
+        """取得共用的同步 HTTP 客戶端（首次使用時建立）"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        limits=self.limits,
+                        timeout=self.timeout,
+                        http2=self.http2,
+                        event_hooks={'request': [self._count]}
+                    )
+        return self._client
+
+    def get_async_client(self) -> httpx.AsyncClient:
+        """取得目前事件迴圈共用的非同步 HTTP 客戶端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(
+                    limits=self.limits,
+                    timeout=self.timeout,
+                    http2=self.http2,
+                    event_hooks={'request': [self._acount]}
+                )
+                self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """關閉目前事件迴圈的非同步連線池"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得連線池統計"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['http2'] = self.http2
+        stats['max_connections'] = self.limits.max_connections
+        stats['max_keepalive_connections'] = self.limits.max_keepalive_connections
+
+        connections = []
+        if self._client is not None:
+            pool = getattr(self._client._transport, '_pool', None)
+            connections = list(getattr(pool, 'connections', []))
+        stats['connections'] = len(connections)
+        stats['idle_connections'] = sum(1 for connection in connections if connection.is_idle())
+        stats['active_connections'] = stats['connections'] - stats['idle_connections']
+        return stats
+
+    def close(self):
+        """關閉同步連線池"""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
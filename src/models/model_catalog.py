@@ -0,0 +1,116 @@
+"""
+模型目錄
+快取可用模型清單，並由背景執行緒定期以低成本方式探測各供應商健康狀態，
+/models 直接回傳快取快照，不需等待供應商往返
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Any
+
+STATUS_HEALTHY = 'healthy'
+STATUS_DEGRADED = 'degraded'
+STATUS_UNKNOWN = 'unknown'
+
+
+class ModelCatalog:
+    """快取的模型目錄與背景健康探測器"""
+
+    def __init__(self, ai_manager, ttl: float = 30.0, probe_interval: float = 60.0):
+        self.ai_manager = ai_manager
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[List[Dict[str, Any]]] = None
+        self._built_at = 0.0
+        self._health: Dict[str, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_env(cls, ai_manager) -> 'ModelCatalog':
+        """依環境變數建立模型目錄"""
+        return cls(
+            ai_manager,
+            ttl=float(os.getenv('MODEL_CATALOG_TTL', 30)),
+            probe_interval=float(os.getenv('MODEL_PROBE_INTERVAL', 60))
+        )
+
+    def start(self):
+        """啟動背景健康探測（探測間隔設為 0 時停用）"""
+        if self.probe_interval <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='model-health-prober', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止背景健康探測"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def probe(self):
+        """探測所有已設定金鑰的供應商"""
+        for provider in self.ai_manager.get_configured_providers():
+            healthy, latency, error = self.ai_manager.check_provider(provider)
+            with self._lock:
+                self._health[provider] = {
+                    'status': STATUS_HEALTHY if healthy else STATUS_DEGRADED,
+                    'probe_latency': latency,
+                    'error': error,
+                    'checked_at': time.time()
+                }
+                # 健康狀態變化時讓快照失效
+                self._snapshot = None
+
+    def _build(self) -> List[Dict[str, Any]]:
+        """組合模型清單、供應商健康狀態與延遲統計"""
+        router_models = self.ai_manager.get_router_stats().get('models', {})
+        models = []
+        for model in self.ai_manager.get_available_models():
+            entry = dict(model)
+            health = self._health.get(model['provider'])
+            stats = router_models.get(model['id'], {})
+
+            if model['provider'] in ('demo', 'cascade'):
+                status = STATUS_HEALTHY
+            elif health is None:
+                status = STATUS_UNKNOWN
+            else:
+                status = health['status']
+            if stats.get('circuit') == 'open':
+                status = STATUS_DEGRADED
+
+            entry['status'] = status
+            entry['latency'] = {
+                'probe': health['probe_latency'] if health else None,
+                'p50': stats.get('p50'),
+                'p95': stats.get('p95'),
+                'error_rate': stats.get('error_rate')
+            }
+            models.append(entry)
+        return models
+
+    def get_models(self) -> List[Dict[str, Any]]:
+        """取得模型清單快照（過期時重建，不會呼叫供應商）"""
+        with self._lock:
+            if self._snapshot is None or time.monotonic() - self._built_at > self.ttl:
+                self._snapshot = self._build()
+                self._built_at = time.monotonic()
+            return self._snapshot
+
+    def get_health(self) -> Dict[str, Dict[str, Any]]:
+        """取得各供應商最近一次探測結果"""
+        with self._lock:
+            return {provider: dict(health) for provider, health in self._health.items()}
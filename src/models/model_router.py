@@ -0,0 +1,383 @@
+"""
+模型路由器
+追蹤各模型延遲與錯誤率，以斷路器隔離故障供應商並切換到等效模型，
+並可在主要請求過慢時對第二個供應商發出對沖（hedged）請求
+"""
+
+import os
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+
+# 能力相近、可互相替代的模型
+DEFAULT_EQUIVALENT_MODELS = [
+    ['gpt-4', 'llama3-70b-8192'],
+    ['gpt-3.5-turbo', 'llama3-8b-8192', 'mixtral-8x7b-32768']
+]
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class NoAvailableModel(Exception):
+    """沒有可用的模型"""
+
+
+class ModelStats:
+    """單一模型的滾動延遲與錯誤統計"""
+
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency: float, success: bool):
+        self.samples.append((latency, success))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """取得成功請求的延遲百分位數"""
+        latencies = sorted(latency for latency, success in self.samples if success)
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))
+        return latencies[index]
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, success in self.samples if not success) / len(self.samples)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': len(self.samples),
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'error_rate': self.error_rate()
+        }
+
+
+class CircuitBreaker:
+    """斷路器：連續失敗達門檻即開路，冷卻後放行一次試探請求"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def is_open(self, now: float) -> bool:
+        """是否拒絕請求（不改變狀態，供排序候選模型使用）"""
+        if self.state == CIRCUIT_OPEN:
+            return now - self.opened_at < self.cooldown
+        # 半開時試探請求進行中，其他請求先略過
+        return self.state == CIRCUIT_HALF_OPEN
+
+    def allow(self, now: float) -> bool:
+        """實際呼叫前取得放行；冷卻結束後由第一個呼叫取得半開試探資格"""
+        if self.state == CIRCUIT_OPEN and now - self.opened_at >= self.cooldown:
+            self.state = CIRCUIT_HALF_OPEN
+            return True
+        return self.state == CIRCUIT_CLOSED
+
+    def release(self):
+        """試探請求未完成就被取消時交還試探資格，讓下一個呼叫重新試探"""
+        if self.state == CIRCUIT_HALF_OPEN:
+            self.state = CIRCUIT_OPEN
+
+    def record_success(self):
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+
+    def record_failure(self, now: float):
+        self.failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CIRCUIT_OPEN
+            self.opened_at = now
+
+
+class ModelRouter:
+    """延遲感知的模型路由器"""
+
+    def __init__(self,
+                 equivalent_models: Optional[List[List[str]]] = None,
+                 is_available: Optional[Callable[[str], bool]] = None,
+                 hedge_enabled: bool = False,
+                 hedge_delay: Optional[float] = None,
+                 failure_threshold: int = 5,
+                 cooldown: float = 30.0,
+                 window: int = 100,
+                 max_workers: int = 16):
+        self.equivalent_models = equivalent_models or DEFAULT_EQUIVALENT_MODELS
+        self.is_available = is_available or (lambda model: True)
+        self.hedge_enabled = hedge_enabled
+        self.hedge_delay = hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.window = window
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, ModelStats] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-router')
+        self.counters = {
+            'failovers': 0,
+            'hedges': 0,
+            'hedge_wins': 0
+        }
+
+    @classmethod
+    def from_env(cls, is_available: Optional[Callable[[str], bool]] = None) -> 'ModelRouter':
+        """依環境變數建立路由器"""
+        equivalent = os.getenv('MODEL_EQUIVALENTS')
+        hedge_delay = os.getenv('MODEL_HEDGE_DELAY')
+        return cls(
+            equivalent_models=json.loads(equivalent) if equivalent else None,
+            is_available=is_available,
+            hedge_enabled=os.getenv('MODEL_HEDGE_ENABLED', 'False').lower() == 'true',
+            hedge_delay=float(hedge_delay) if hedge_delay else None,
+            failure_threshold=int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5)),
+            cooldown=float(os.getenv('CIRCUIT_COOLDOWN', 30))
+        )
+
+    def _get_stats(self, model: str) -> ModelStats:
+        if model not in self._stats:
+            self._stats[model] = ModelStats(self.window)
+        return self._stats[model]
+
+    def _get_breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self._breakers[model]
+
+    def record(self, model: str, latency: float, success: bool):
+        """記錄一次呼叫結果"""
+        with self._lock:
+            self._get_stats(model).record(latency, success)
+            breaker = self._get_breaker(model)
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure(time.monotonic())
+
+    def candidates(self, model: str) -> List[str]:
+        """取得候選模型：要求的模型優先，其餘等效模型依 p95 延遲排序，略過斷路中的模型"""
+        equivalents = []
+        for group in self.equivalent_models:
+            if model in group:
+                equivalents = [other for other in group if other != model]
+                break
+
+        now = time.monotonic()
+        with self._lock:
+            def healthy(name: str) -> bool:
+                return self.is_available(name) and not self._get_breaker(name).is_open(now)
+
+            def p95(name: str) -> float:
+                value = self._get_stats(name).percentile(0.95)
+                return value if value is not None else float('inf')
+
+            ordered = [model] if healthy(model) else []
+            ordered.extend(sorted((name for name in equivalents if healthy(name)), key=p95))
+        return ordered
+
+    def _timed_call(self, model: str, call: Callable[[str], str], validate: Callable[[str], bool]) -> str:
+        with self._lock:
+            allowed = self._get_breaker(model).allow(time.monotonic())
+        if not allowed:
+            raise NoAvailableModel(f"模型 {model} 目前斷路中")
+        started_at = time.monotonic()
+        try:
+            response = call(model)
+            if not validate(response):
+                raise ValueError(f"{model} 回應未通過驗證")
+        except Exception:
+            self.record(model, time.monotonic() - started_at, False)
+            raise
+        self.record(model, time.monotonic() - started_at, True)
+        return response
+
+    async def _atimed_call(self,
+                           model: str,
+                           call: Callable[[str], Awaitable[str]],
+                           validate: Callable[[str], bool]) -> str:
+        with self._lock:
+            allowed = self._get_breaker(model).allow(time.monotonic())
+        if not allowed:
+            raise NoAvailableModel(f"模型 {model} 目前斷路中")
+        started_at = time.monotonic()
+        try:
+            response = await call(model)
+            if not validate(response):
+                raise ValueError(f"{model} 回應未通過驗證")
+        except asyncio.CancelledError:
+            # 取消（例如對沖落敗）不算模型故障
+            with self._lock:
+                self._get_breaker(model).release()
+            raise
+        except Exception:
+            self.record(model, time.monotonic() - started_at, False)
+            raise
+        self.record(model, time.monotonic() - started_at, True)
+        return response
+
+    def _hedge_delay_for(self, model: str) -> Optional[float]:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        with self._lock:
+            return self._get_stats(model).percentile(0.95)
+
+    def execute(self,
+                model: str,
+                call: Callable[[str], str],
+                validate: Optional[Callable[[str], bool]] = None) -> str:
+        """依路由結果呼叫模型，失敗時切換到下一個候選模型"""
+        validate = validate or (lambda response: bool(response))
+        candidates = self.candidates(model)
+        if not candidates:
+            raise NoAvailableModel(f"模型 {model} 與其等效模型目前皆不可用")
+
+        last_error = None
+        index = 0
+        while index < len(candidates):
+            primary = candidates[index]
+            backup = candidates[index + 1] if index + 1 < len(candidates) else None
+            delay = self._hedge_delay_for(primary) if self.hedge_enabled and backup else None
+
+            if index > 0:
+                with self._lock:
+                    self.counters['failovers'] += 1
+
+            attempted = [primary]
+            try:
+                if delay is None:
+                    return self._timed_call(primary, call, validate)
+                return self._hedged_call(primary, backup, delay, call, validate, attempted)
+            except Exception as e:
+                last_error = e
+                # 只跳過實際呼叫過的候選；主要請求在對沖前就失敗時，下一輪改呼叫備援
+                index += len(attempted)
+
+        raise last_error
+
+    async def aexecute(self,
+                       model: str,
+                       call: Callable[[str], Awaitable[str]],
+                       validate: Optional[Callable[[str], bool]] = None) -> str:
+        """execute 的非同步版本，call 為回傳 awaitable 的函式"""
+        validate = validate or (lambda response: bool(response))
+        candidates = self.candidates(model)
+        if not candidates:
+            raise NoAvailableModel(f"模型 {model} 與其等效模型目前皆不可用")
+
+        last_error = None
+        index = 0
+        while index < len(candidates):
+            primary = candidates[index]
+            backup = candidates[index + 1] if index + 1 < len(candidates) else None
+            delay = self._hedge_delay_for(primary) if self.hedge_enabled and backup else None
+
+            if index > 0:
+                with self._lock:
+                    self.counters['failovers'] += 1
+
+            attempted = [primary]
+            try:
+                if delay is None:
+                    return await self._atimed_call(primary, call, validate)
+                return await self._ahedged_call(primary, backup, delay, call, validate, attempted)
+            except Exception as e:
+                last_error = e
+                index += len(attempted)
+
+        raise last_error
+
+    async def _ahedged_call(self,
+                            primary: str,
+                            backup: str,
+                            delay: float,
+                            call: Callable[[str], Awaitable[str]],
+                            validate: Callable[[str], bool],
+                            attempted: List[str]) -> str:
+        """_hedged_call 的非同步版本，結束時取消尚未完成的請求"""
+        tasks = {asyncio.ensure_future(self._atimed_call(primary, call, validate)): primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return next(iter(done)).result()
+
+            with self._lock:
+                self.counters['hedges'] += 1
+            attempted.append(backup)
+            tasks[asyncio.ensure_future(self._atimed_call(backup, call, validate))] = backup
+
+            pending = set(tasks)
+            last_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if tasks[task] == backup:
+                        with self._lock:
+                            self.counters['hedge_wins'] += 1
+                    return response
+            raise last_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _hedged_call(self,
+                     primary: str,
+                     backup: str,
+                     delay: float,
+                     call: Callable[[str], str],
+                     validate: Callable[[str], bool],
+                     attempted: List[str]) -> str:
+        """主要請求超過延遲門檻仍未完成時，對備援模型發出對沖請求，回傳最先成功的結果；
+        實際發出對沖請求時會將備援模型加入 attempted"""
+        # 複製呼叫端的 context，讓遙測標籤等 context 變數延續到工作執行緒
+        futures = {
+            self._executor.submit(contextvars.copy_context().run, self._timed_call, primary, call, validate): primary
+        }
+        done, _ = wait(futures, timeout=delay)
+        if done:
+            return next(iter(done)).result()
+
+        with self._lock:
+            self.counters['hedges'] += 1
+        attempted.append(backup)
+        futures[self._executor.submit(contextvars.copy_context().run, self._timed_call, backup, call, validate)] = backup
+
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if futures[future] == backup:
+                    with self._lock:
+                        self.counters['hedge_wins'] += 1
+                return response
+        raise last_error
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得各模型的延遲、錯誤率與斷路器狀態"""
+        with self._lock:
+            models = {
+                model: dict(stats.to_dict(), circuit=self._get_breaker(model).state)
+                for model, stats in self._stats.items()
+            }
+            return {'models': models, **self.counters}
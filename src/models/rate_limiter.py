@@ -0,0 +1,279 @@
+"""
+速率限制排程器
+依供應商／模型的 RPM 與 TPM 令牌桶排隊送出請求，遇到 429 時以指數退避重試
+"""
+
+import os
+import json
+import time
+import heapq
+import random
+import asyncio
+import threading
+import itertools
+from typing import Callable, Awaitable, Dict, List, Optional, Any
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BULK = 'bulk'
+PRIORITY_LEVELS = {
+    PRIORITY_INTERACTIVE: 0,
+    PRIORITY_BULK: 10
+}
+
+
+class RateLimitExceeded(Exception):
+    """重試次數用盡仍被限流"""
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """取得足夠令牌所需等待的秒數"""
+        self._refill(now)
+        # 單次需求超過容量時，以滿桶放行，避免永遠等待
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Lane:
+    """單一限流鍵值的排隊狀態"""
+
+    def __init__(self, rpm: Optional[float], tpm: Optional[float]):
+        self.requests = TokenBucket(rpm, rpm) if rpm else None
+        self.tokens = TokenBucket(tpm, tpm) if tpm else None
+        self.queue: List[tuple] = []
+        self.blocked_until = 0.0
+
+
+class RequestScheduler:
+    """速率限制排程器"""
+
+    def __init__(self,
+                 limits: Optional[Dict[str, Dict[str, float]]] = None,
+                 max_retries: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._lanes: Dict[str, _Lane] = {}
+        self._sequence = itertools.count()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'queued_seconds': 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> 'RequestScheduler':
+        """依環境變數建立排程器"""
+        limits = {}
+        for provider in ['openai', 'groq']:
+            rpm = os.getenv(f'{provider.upper()}_RPM')
+            tpm = os.getenv(f'{provider.upper()}_TPM')
+            if rpm or tpm:
+                limits[provider] = {
+                    'rpm': float(rpm) if rpm else None,
+                    'tpm': float(tpm) if tpm else None
+                }
+        # 個別模型的限制，例如 {"llama3-70b-8192": {"rpm": 30, "tpm": 6000}}
+        limits.update(json.loads(os.getenv('MODEL_RATE_LIMITS') or '{}'))
+        return cls(
+            limits=limits,
+            max_retries=int(os.getenv('RATE_LIMIT_MAX_RETRIES', 5)),
+            base_delay=float(os.getenv('RATE_LIMIT_BASE_DELAY', 1.0)),
+            max_delay=float(os.getenv('RATE_LIMIT_MAX_DELAY', 60.0))
+        )
+
+    @staticmethod
+    def estimate_tokens(prompt: str, max_tokens: int) -> int:
+        """粗估一次請求消耗的 token 數"""
+        return len(prompt) // 2 + max_tokens
+
+    def _lane_key(self, provider: str, model: str) -> Optional[str]:
+        if model in self.limits:
+            return model
+        if provider in self.limits:
+            return provider
+        return None
+
+    def _get_lane(self, key: str) -> _Lane:
+        lane = self._lanes.get(key)
+        if lane is None:
+            limit = self.limits[key]
+            lane = _Lane(limit.get('rpm'), limit.get('tpm'))
+            self._lanes[key] = lane
+        return lane
+
+    def _try_acquire(self, lane: _Lane, ticket: tuple, tokens: int) -> float:
+        """嘗試取得配額（呼叫端需持有鎖），回傳需再等待的秒數，0 代表已取得"""
+        now = time.monotonic()
+        if lane.queue[0] is not ticket:
+            return 0.05
+        wait = max(0.0, lane.blocked_until - now)
+        if lane.requests:
+            wait = max(wait, lane.requests.wait_time(1, now))
+        if lane.tokens:
+            wait = max(wait, lane.tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        if lane.requests:
+            lane.requests.consume(1)
+        if lane.tokens:
+            lane.tokens.consume(tokens)
+        heapq.heappop(lane.queue)
+        return 0.0
+
+    def _enqueue(self, key: str, priority: str) -> tuple:
+        lane = self._get_lane(key)
+        ticket = (PRIORITY_LEVELS.get(priority, PRIORITY_LEVELS[PRIORITY_BULK]), next(self._sequence))
+        heapq.heappush(lane.queue, ticket)
+        return ticket
+
+    def _dequeue(self, lane: _Lane, ticket: tuple):
+        """移除未取得配額就離開的排隊號碼（呼叫端需持有鎖），避免後面的請求永遠等待"""
+        if ticket in lane.queue:
+            lane.queue.remove(ticket)
+            heapq.heapify(lane.queue)
+        self._condition.notify_all()
+
+    def acquire(self, key: str, tokens: int, priority: str = PRIORITY_INTERACTIVE):
+        """排隊等待配額，互動請求優先於批次請求"""
+        started_at = time.monotonic()
+        with self._condition:
+            lane = self._get_lane(key)
+            ticket = self._enqueue(key, priority)
+            try:
+                while True:
+                    wait = self._try_acquire(lane, ticket, tokens)
+                    if wait == 0:
+                        break
+                    self._condition.wait(wait)
+            finally:
+                self._dequeue(lane, ticket)
+            self.stats['queued_seconds'] += time.monotonic() - started_at
+
+    async def aacquire(self, key: str, tokens: int, priority: str = PRIORITY_BULK):
+        """非同步排隊等待配額；等待中被取消時會讓出排隊位置"""
+        started_at = time.monotonic()
+        with self._lock:
+            lane = self._get_lane(key)
+            ticket = self._enqueue(key, priority)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_acquire(lane, ticket, tokens)
+                    if wait == 0:
+                        self.stats['queued_seconds'] += time.monotonic() - started_at
+                        return
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            with self._lock:
+                self._dequeue(lane, ticket)
+
+    @staticmethod
+    def is_rate_limit_error(error: Exception) -> bool:
+        """判斷是否為 429 限流錯誤"""
+        if getattr(error, 'status_code', None) == 429:
+            return True
+        return type(error).__name__ == 'RateLimitError'
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """計算重試等待時間，優先採用 Retry-After 標頭"""
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        retry_after = headers.get('retry-after')
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _block(self, key: Optional[str], delay: float):
+        """限流時暫停整條通道，避免其他請求繼續撞上 429"""
+        with self._condition:
+            self.stats['rate_limited'] += 1
+            self.stats['retries'] += 1
+            if key is not None:
+                lane = self._get_lane(key)
+                lane.blocked_until = max(lane.blocked_until, time.monotonic() + delay)
+
+    def execute(self,
+                provider: str,
+                model: str,
+                fn: Callable[[], Any],
+                tokens: int,
+                priority: str = PRIORITY_INTERACTIVE) -> Any:
+        """在速率限制下執行請求，遇到 429 時退避重試"""
+        key = self._lane_key(provider, model)
+        with self._lock:
+            self.stats['requests'] += 1
+
+        for attempt in range(self.max_retries + 1):
+            if key is not None:
+                self.acquire(key, tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                if not self.is_rate_limit_error(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(f"{model} 重試 {self.max_retries} 次後仍被限流: {str(e)}")
+                delay = self._retry_delay(e, attempt)
+                self._block(key, delay)
+                time.sleep(delay)
+
+    async def aexecute(self,
+                       provider: str,
+                       model: str,
+                       fn: Callable[[], Awaitable[Any]],
+                       tokens: int,
+                       priority: str = PRIORITY_BULK) -> Any:
+        """非同步版本的 execute"""
+        key = self._lane_key(provider, model)
+        with self._lock:
+            self.stats['requests'] += 1
+
+        for attempt in range(self.max_retries + 1):
+            if key is not None:
+                await self.aacquire(key, tokens, priority)
+            try:
+                return await fn()
+            except Exception as e:
+                if not self.is_rate_limit_error(e):
+                    raise
+                if attempt == self.max_retries:
+                    raise RateLimitExceeded(f"{model} 重試 {self.max_retries} 次後仍被限流: {str(e)}")
+                delay = self._retry_delay(e, attempt)
+                self._block(key, delay)
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得排程統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queued'] = {key: len(lane.queue) for key, lane in self._lanes.items()}
+        return stats
@@ -0,0 +1,194 @@
+"""
+AI 回應快取
+記憶體 LRU 層 + SQLite 磁碟層，磁碟層可跨重啟與多個 worker 共用
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Tuple
+
+
+class ResponseCache:
+    """兩層式 AI 回應快取"""
+
+    def __init__(self,
+                 db_path: Optional[str] = './cache/responses.sqlite3',
+                 memory_size: int = 256,
+                 disk_size: int = 10000,
+                 ttl: float = 3600,
+                 evict_interval: int = 100):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.ttl = ttl
+        # 磁碟層每寫入這麼多次才整理一次，容量可能暫時超出至多 evict_interval 筆
+        self.evict_interval = max(1, evict_interval)
+        self._disk_writes = 0
+
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0
+        }
+
+        if self.db_path:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._init_db()
+
+    @classmethod
+    def from_env(cls) -> Optional['ResponseCache']:
+        """依環境變數建立快取，停用時回傳 None"""
+        if os.getenv('RESPONSE_CACHE_ENABLED', 'True').lower() != 'true':
+            return None
+        return cls(
+            db_path=os.getenv('RESPONSE_CACHE_PATH', './cache/responses.sqlite3') or None,
+            memory_size=int(os.getenv('RESPONSE_CACHE_MEMORY_SIZE', 256)),
+            disk_size=int(os.getenv('RESPONSE_CACHE_DISK_SIZE', 10000)),
+            ttl=float(os.getenv('RESPONSE_CACHE_TTL', 3600)),
+            evict_interval=int(os.getenv('RESPONSE_CACHE_EVICT_INTERVAL', 100))
+        )
+
+    @staticmethod
+    def make_key(prompt: str,
+                 model: str,
+                 temperature: float,
+                 max_tokens: int,
+                 json_mode: bool = False) -> str:
+        """由請求參數建立快取鍵"""
+        params = [model, prompt, temperature, max_tokens]
+        if json_mode:
+            params.append('json')
+        raw = json.dumps(params, ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前執行緒的 SQLite 連線"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """建立快取資料表"""
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' value TEXT NOT NULL,'
+            ' expires_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses (expires_at)')
+
+    def get(self, key: str) -> Optional[str]:
+        """讀取快取，先查記憶體層再查磁碟層"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+
+        if self.db_path:
+            conn = self._connection()
+            row = conn.execute(
+                'SELECT value, expires_at FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                value, expires_at = row
+                if expires_at > now:
+                    conn.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, key))
+                    with self._lock:
+                        self._remember(key, expires_at, value)
+                        self.stats['disk_hits'] += 1
+                    return value
+                conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        """寫入快取（兩層同時寫入）"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self.stats['sets'] += 1
+
+        if self.db_path:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, value, expires_at, now)
+            )
+            with self._lock:
+                self._disk_writes += 1
+                due = self._disk_writes >= self.evict_interval
+                if due:
+                    self._disk_writes = 0
+            if due:
+                self._evict_disk(conn, now)
+
+    def _remember(self, key: str, expires_at: float, value: str):
+        """寫入記憶體層並依容量淘汰（呼叫端需持有鎖）"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def _evict_disk(self, conn: sqlite3.Connection, now: float):
+        """清除過期項目，並依最近存取時間淘汰超出容量的項目"""
+        conn.execute('DELETE FROM responses WHERE expires_at <= ?', (now,))
+        count = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        overflow = count - self.disk_size
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM responses WHERE key IN '
+                '(SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?)',
+                (overflow,)
+            )
+            with self._lock:
+                self.stats['evictions'] += overflow
+
+    def clear(self):
+        """清空快取"""
+        with self._lock:
+            self._memory.clear()
+        if self.db_path:
+            self._connection().execute('DELETE FROM responses')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得快取統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._memory)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        total = hits + stats['misses']
+        stats['hit_rate'] = (hits / total) if total > 0 else 0
+        if self.db_path:
+            stats['disk_entries'] = self._connection().execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return stats
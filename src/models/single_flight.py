@@ -0,0 +1,117 @@
+"""
+請求合併（single-flight）
+相同鍵值的並行請求共用同一次實際呼叫，並共享其結果或錯誤
+"""
+
+import asyncio
+import threading
+from typing import Callable, Awaitable, Dict, Any, Tuple
+
+
+class _Call:
+    """進行中的呼叫"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """請求合併器"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[int, str], asyncio.Future] = {}
+        self.stats = {
+            'calls': 0,
+            'shared': 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """執行 fn；若相同鍵值已在執行中，等待並共用其結果"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats['shared'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.stats['calls'] += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            # 包含 KeyboardInterrupt 等，確保等待中的呼叫端不會拿到 None
+            call.error = e
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """非同步版本，於同一事件迴圈內合併相同鍵值的呼叫"""
+        loop = asyncio.get_running_loop()
+        async_key = (id(loop), key)
+
+        while True:
+            with self._lock:
+                future = self._async_calls.get(async_key)
+                if future is not None:
+                    self.stats['shared'] += 1
+                    leader = False
+                else:
+                    future = loop.create_future()
+                    self._async_calls[async_key] = future
+                    self.stats['calls'] += 1
+                    leader = True
+
+            if leader:
+                return await self._alead(async_key, future, fn)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 被取消的是領頭的呼叫而非自己時重新排隊，由第一個重試的跟隨者接手執行
+                if future.cancelled():
+                    continue
+                raise
+
+    async def _alead(self, async_key: Tuple[int, str], future: asyncio.Future, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """以領頭身分執行 fn 並將結果交給跟隨者"""
+        try:
+            result = await fn()
+        except Exception as e:
+            future.set_exception(e)
+            # 標記例外已取得，沒有跟隨者時不會出現未取得例外的警告
+            future.exception()
+            raise
+        except BaseException:
+            # 領頭的呼叫被取消時取消共用的 future，讓跟隨者改為自行重試
+            future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_calls[async_key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得合併統計"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._calls) + len(self._async_calls)
+        return stats
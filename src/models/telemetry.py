@@ -0,0 +1,144 @@
+"""
+LLM 呼叫遙測
+記錄每次呼叫的耗時、首個 token 時間、token 用量與預估成本，
+依模型與模板彙總為直方圖，並輸出 Prometheus 文字格式
+"""
+
+import os
+import json
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 每 1K token 的美元價格：(prompt, completion)
+DEFAULT_PRICING = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'llama3-8b-8192': (0.00005, 0.00008),
+    'llama3-70b-8192': (0.00059, 0.00079),
+    'mixtral-8x7b-32768': (0.00024, 0.00024)
+}
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+TOKEN_BUCKETS = [50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000]
+
+_current_template = contextvars.ContextVar('llm_template', default='none')
+
+
+@contextmanager
+def telemetry_context(template: str):
+    """在區塊內的 LLM 呼叫標記模板名稱"""
+    token = _current_template.set(template)
+    try:
+        yield
+    finally:
+        _current_template.reset(token)
+
+
+class Histogram:
+    """累積式直方圖"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.total += 1
+        self.sum += value
+
+
+class LLMTelemetry:
+    """LLM 呼叫遙測收集器"""
+
+    def __init__(self, pricing: Optional[Dict[str, Tuple[float, float]]] = None):
+        self.pricing = dict(DEFAULT_PRICING)
+        self.pricing.update(pricing or {})
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Tuple[str, str]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+    @classmethod
+    def from_env(cls) -> 'LLMTelemetry':
+        """依環境變數建立遙測收集器，MODEL_PRICING 可覆寫模型價格"""
+        pricing = json.loads(os.getenv('MODEL_PRICING') or '{}')
+        return cls({model: tuple(prices) for model, prices in pricing.items()})
+
+    def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        """依模型價格預估成本（美元）"""
+        prompt_price, completion_price = self.pricing.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def _observe(self, name: str, labels: Tuple[str, str], buckets: List[float], value: float):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = Histogram(buckets)
+            self._histograms[key] = histogram
+        histogram.observe(value)
+
+    def _increment(self, name: str, labels: Tuple, value: float = 1):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def record(self,
+               model: str,
+               latency: float,
+               prompt_tokens: Optional[int] = None,
+               completion_tokens: Optional[int] = None,
+               ttft: Optional[float] = None,
+               success: bool = True,
+               template: Optional[str] = None):
+        """記錄一次 LLM 呼叫"""
+        labels = (model, template or _current_template.get())
+        with self._lock:
+            self._increment('requests_total', labels + ('success' if success else 'error',))
+            self._observe('request_duration_seconds', labels, LATENCY_BUCKETS, latency)
+            if ttft is not None:
+                self._observe('time_to_first_token_seconds', labels, LATENCY_BUCKETS, ttft)
+            if not success:
+                return
+            prompt_tokens = prompt_tokens or 0
+            completion_tokens = completion_tokens or 0
+            self._observe('prompt_tokens', labels, TOKEN_BUCKETS, prompt_tokens)
+            self._observe('completion_tokens', labels, TOKEN_BUCKETS, completion_tokens)
+            self._increment('prompt_tokens_total', labels, prompt_tokens)
+            self._increment('completion_tokens_total', labels, completion_tokens)
+            self._increment('cost_usd_total', labels, self.estimate_cost(model, prompt_tokens, completion_tokens))
+
+    def render_prometheus(self, prefix: str = 'testgpt_llm') -> str:
+        """輸出 Prometheus 文字格式"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, labels), value in counters:
+                metric = f'{prefix}_{name}'
+                if metric not in seen:
+                    lines.append(f'# TYPE {metric} counter')
+                    seen.add(metric)
+                label_text = f'model="{labels[0]}",template="{labels[1]}"'
+                if len(labels) > 2:
+                    label_text += f',status="{labels[2]}"'
+                lines.append(f'{metric}{{{label_text}}} {value}')
+
+            for (name, (model, template)), histogram in histograms:
+                metric = f'{prefix}_{name}'
+                if metric not in seen:
+                    lines.append(f'# TYPE {metric} histogram')
+                    seen.add(metric)
+                label_text = f'model="{model}",template="{template}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{label_text},le="+Inf"}} {histogram.total}')
+                lines.append(f'{metric}_sum{{{label_text}}} {histogram.sum}')
+                lines.append(f'{metric}_count{{{label_text}}} {histogram.total}')
+
+        return '\n'.join(lines) + '\n'
@@ -5,11 +5,17 @@
 import time
 import json
 from typing import List, Dict, Any
+from src.generators.test_case_model import TestCaseInput, as_test_case, decode_test_cases
+from src.converters.step_classifier import (
+    classify_step, ACTION_INPUT, ACTION_CLICK, ACTION_VERIFY, ACTION_WAIT, ACTION_OPEN, ACTION_PRESS_KEY,
+    TARGET_USERNAME, TARGET_PASSWORD, TARGET_LOGIN, TARGET_SUCCESS, TARGET_ERROR
+)
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 
 class TestRunner:
@@ -47,12 +53,13 @@ class TestRunner:
                 pass
             self.driver = None
     
-    def run_test_case(self, test_case: Dict[str, Any]) -> Dict[str, Any]:
+    def run_test_case(self, test_case: TestCaseInput) -> Dict[str, Any]:
         """執行單個測試用例"""
+        test_case = as_test_case(test_case)
         result = {
-            'id': test_case.get('id', 'Unknown'),
-            'title': test_case.get('title', 'Unknown'),
-            'type': test_case.get('type', 'unknown'),
+            'id': test_case.id or 'Unknown',
+            'title': test_case.title or 'Unknown',
+            'type': test_case.type or 'unknown',
             'success': False,
             'error': None,
             'execution_time': 0,
@@ -63,12 +70,12 @@ class TestRunner:
         
         try:
             # 導航到測試頁面
-            print(f"🧪 開始執行測試: {test_case.get('title', 'Unknown')}")
+            print(f"🧪 開始執行測試: {result['title']}")
             self.driver.get(self.test_url)
             time.sleep(1)  # 等待頁面載入
             
             # 執行測試步驟
-            steps = test_case.get('steps', [])
+            steps = test_case.steps
             for i, step in enumerate(steps):
                 print(f"  步驟 {i + 1}: {step}")
                 step_result = self.execute_step(step, i + 1)
@@ -83,7 +90,7 @@ class TestRunner:
                     print(f"  ✅ 步驟成功")
             
             # 檢查預期結果
-            expected_result = test_case.get('expected_result', '')
+            expected_result = test_case.expected_result
             if expected_result:
                 result['success'] = self.verify_expected_result(expected_result)
                 print(f"  預期結果: {expected_result} - {'✅ 通過' if result['success'] else '❌ 失敗'}")
@@ -108,27 +115,34 @@ class TestRunner:
         }
         
         try:
-            # 根據步驟內容執行相應操作
-            if '輸入' in step or 'enter' in step.lower():
-                if '用戶名' in step or 'username' in step.lower():
+            # 根據步驟分類結果執行相應操作（與腳本轉換器共用同一分類器）
+            action = classify_step(step)
+            if action.action == ACTION_INPUT:
+                if action.target == TARGET_USERNAME:
                     self.input_username(step)
-                elif '密碼' in step or 'password' in step.lower():
+                elif action.target == TARGET_PASSWORD:
                     self.input_password(step)
                 else:
                     self.input_text(step)
                     
-            elif '點擊' in step or 'click' in step.lower() or '按下' in step:
-                if '登入' in step or 'login' in step.lower():
+            elif action.action == ACTION_CLICK:
+                if action.target == TARGET_LOGIN:
                     self.click_login()
                 else:
                     self.click_element(step)
                     
-            elif '驗證' in step or 'verify' in step.lower() or '檢查' in step:
+            elif action.action == ACTION_VERIFY:
                 self.verify_element(step)
                 
-            elif '等待' in step or 'wait' in step.lower():
+            elif action.action == ACTION_WAIT:
                 self.wait_for_element(step)
                 
+            elif action.action == ACTION_OPEN:
+                self.open_page()
+                
+            elif action.action == ACTION_PRESS_KEY:
+                self.press_enter()
+                
             else:
                 # 通用步驟處理
                 self.execute_generic_step(step)
@@ -178,6 +192,20 @@ class TestRunner:
         except NoSuchElementException:
             raise Exception("找不到密碼輸入欄位")
     
+    def input_text(self, step: str):
+        """在步驟指定的欄位輸入文字（欄位以 id 或 name 定位）"""
+        action = classify_step(step)
+        if not action.field:
+            raise Exception("步驟未指定輸入欄位")
+        
+        elements = (self.driver.find_elements(By.ID, action.field) or
+                    self.driver.find_elements(By.NAME, action.field))
+        if not elements:
+            raise Exception(f"找不到輸入欄位: {action.field}")
+        
+        elements[0].clear()
+        elements[0].send_keys(self.extract_value_from_step(step))
+    
     def click_login(self):
         """點擊登入按鈕"""
         try:
@@ -195,16 +223,32 @@ class TestRunner:
         except NoSuchElementException:
             raise Exception("找不到登入按鈕")
     
+    def click_element(self, step: str):
+        """點擊步驟指定的元素（依欄位 id 或按鈕文字定位）"""
+        action = classify_step(step)
+        label = action.field or action.value
+        if not label:
+            raise Exception("步驟未指定要點擊的元素")
+        
+        elements = (self.driver.find_elements(By.ID, label) or
+                    self.driver.find_elements(By.XPATH, f"//button[contains(normalize-space(.), {json.dumps(label)})]"))
+        if not elements:
+            raise Exception(f"找不到元素: {label}")
+        
+        elements[0].click()
+        time.sleep(1)
+    
     def verify_element(self, step: str):
         """驗證元素"""
+        target = classify_step(step).target
         try:
-            if '成功' in step or 'success' in step.lower():
+            if target == TARGET_SUCCESS:
                 # 檢查是否出現成功訊息
                 success_elements = self.driver.find_elements(By.CLASS_NAME, "alert-success")
                 if not success_elements:
                     raise Exception("未找到成功訊息")
                     
-            elif '錯誤' in step or 'error' in step.lower():
+            elif target == TARGET_ERROR:
                 # 檢查是否出現錯誤訊息
                 error_elements = self.driver.find_elements(By.CLASS_NAME, "alert-danger")
                 if not error_elements:
@@ -229,18 +273,26 @@ class TestRunner:
         except Exception as e:
             raise Exception(f"等待元素失敗: {e}")
     
+    def open_page(self):
+        """重新開啟測試頁面"""
+        self.driver.get(self.test_url)
+        time.sleep(1)
+    
+    def press_enter(self):
+        """按下 Enter 鍵"""
+        self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ENTER)
+    
     def execute_generic_step(self, step: str):
         """執行通用步驟"""
-        # 根據步驟內容執行相應操作
-        if '按 Enter' in step or 'press enter' in step.lower():
-            from selenium.webdriver.common.keys import Keys
-            self.driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ENTER)
-        else:
-            # 預設等待
-            time.sleep(1)
+        # 預設等待
+        time.sleep(1)
     
     def extract_value_from_step(self, step: str) -> str:
         """從步驟中提取值"""
+        # 優先使用步驟中以冒號或引號標示的值
+        value = classify_step(step).value
+        if value:
+            return value
         # 簡單的文本提取邏輯
         if 'admin' in step.lower():
             return 'admin'
@@ -279,8 +331,9 @@ class TestRunner:
         except Exception:
             return False
     
-    def run_all_tests(self, test_cases: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def run_all_tests(self, test_cases: List[TestCaseInput]) -> Dict[str, Any]:
         """執行所有測試用例"""
+        test_cases = decode_test_cases(test_cases)
         print("🚀 開始執行自動測試...")
         print(f"📝 測試頁面: {self.test_url}")
         print(f"🧪 總測試用例數: {len(test_cases)}")
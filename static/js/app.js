@@ -40,7 +40,7 @@ async function handleTestCaseGeneration(event) {
     showLoadingModal();
     
     try {
-        const response = await fetch('/generate', {
+        const response = await fetch('/generate/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -53,17 +53,39 @@ async function handleTestCaseGeneration(event) {
             })
         });
         
-        const data = await response.json();
+        currentTestCases = [];
+        let error = null;
+        let draft = null;
+        
+        // 先顯示本地規則引擎的草稿，再逐一以串流推送的測試用例取代
+        await readEventStream(response, (event, data) => {
+            if (event === 'draft') {
+                draft = data.test_cases;
+                hideLoadingModal();
+                displayTestCases(draft);
+            } else if (event === 'test_case') {
+                if (currentTestCases.length === 0) {
+                    hideLoadingModal();
+                }
+                currentTestCases.push(data);
+                displayTestCases(currentTestCases);
+            } else if (event === 'error') {
+                error = data.error;
+            }
+        });
         
-        if (data.success) {
-            currentTestCases = data.test_cases;
-            displayTestCases(data.test_cases);
+        if (error && draft && currentTestCases.length === 0) {
+            currentTestCases = draft;
+            displayTestCases(currentTestCases);
+            showAlert('AI 生成失敗，已顯示本地規則產生的草稿: ' + error, 'warning');
+        } else if (error) {
+            showAlert('生成失敗: ' + error, 'danger');
+        } else {
+            displayTestCases(currentTestCases);
             showAlert('測試用例生成成功！', 'success');
             
             // 自動執行轉換腳本和生成報告
             await autoGenerateScriptAndReport();
-        } else {
-            showAlert('生成失敗: ' + data.error, 'danger');
         }
     } catch (error) {
         showAlert('網路錯誤: ' + error.message, 'danger');
@@ -72,6 +94,38 @@ async function handleTestCaseGeneration(event) {
     }
 }
 
+// 讀取 Server-Sent Events 串流
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            message.split('\n').forEach(line => {
+                if (line.startsWith('event:')) {
+                    event = line.slice(6).trim();
+                } else if (line.startsWith('data:')) {
+                    data += line.slice(5).trim();
+                }
+            });
+            onEvent(event, data ? JSON.parse(data) : null);
+        }
+    }
+}
+
 // 顯示測試用例
 function displayTestCases(testCases) {
     const container = document.getElementById('testCasesResult');
@@ -441,7 +495,7 @@ async function loadAvailableModels() {
             data.models.forEach(model => {
                 const option = document.createElement('option');
                 option.value = model.id;
-                option.textContent = model.name;
+                option.textContent = model.status === 'degraded' ? `${model.name}（連線異常）` : model.name;
                 modelSelect.appendChild(option);
             });
         }
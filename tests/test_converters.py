@@ -0,0 +1,144 @@
+"""
+腳本轉換與匯出測試
+"""
+
+import pytest
+import sys
+import os
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.converters.script_converter import ScriptConverter, UNITTEST_HEADER, UNITTEST_FOOTER
+from src.exporters.test_exporter import TestExporter
+from src.converters.step_classifier import StepClassifier, StepAction, KeywordAutomaton
+
+def make_cases(count):
+    return [{'title': f'login {i}', 'steps': ['打開登入頁面', '輸入密碼'], 'expected_result': '成功登入'} for i in range(count)]
+
+class TestConvertIter:
+    """測試逐段產生測試腳本"""
+
+    def test_chunks_join_to_convert(self):
+        """測試每個用例一段，合併後與 convert 結果相同"""
+        converter = ScriptConverter()
+        chunks = list(converter.convert_iter(make_cases(3), 'unittest'))
+        assert len(chunks) == 5
+        assert chunks[0] == UNITTEST_HEADER and chunks[-1] == UNITTEST_FOOTER
+        assert ''.join(chunks) == converter.convert(make_cases(3), 'unittest')
+
+    def test_consumes_input_lazily(self):
+        """測試輸入用例隨輸出逐一讀取，不預先展開整個套件"""
+        consumed = []
+
+        def cases():
+            for test_case in make_cases(1000):
+                consumed.append(test_case)
+                yield test_case
+
+        chunks = ScriptConverter().convert_iter(cases())
+        next(chunks)
+        next(chunks)
+        assert len(consumed) == 1
+
+    def test_unsupported_framework_raises_immediately(self):
+        """測試不支援的框架在開始串流前即拋出例外"""
+        with pytest.raises(ValueError):
+            ScriptConverter().convert_iter(make_cases(1), 'robot')
+
+class TestFragmentCache:
+    """測試用例片段快取"""
+
+    def test_only_changed_cases_rendered(self):
+        """測試修改單一用例後重新轉換只重新產生該用例，結果與未快取時相同"""
+        converter = ScriptConverter()
+        cases = make_cases(50)
+        converter.convert(cases)
+        cases[10] = dict(cases[10], expected_result='顯示錯誤訊息')
+        script = converter.convert(cases)
+        assert converter.get_cache_stats()['misses'] == 51
+        assert converter.get_cache_stats()['hits'] == 49
+        assert script == ScriptConverter(cache_size=0).convert(cases)
+
+    def test_key_includes_framework_and_index_for_untitled(self):
+        """測試不同框架與未命名用例的序號不會共用片段"""
+        converter = ScriptConverter()
+        untitled = [{'steps': ['打開登入頁面'], 'expected_result': '成功'}] * 2
+        script = converter.convert(untitled)
+        assert 'def test_test_case_0' in script and 'def test_test_case_1' in script
+        assert 'self.fail' in converter.convert(untitled, 'unittest')
+
+    def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的片段"""
+        converter = ScriptConverter(cache_size=3)
+        converter.convert(make_cases(5))
+        stats = converter.get_cache_stats()
+        assert stats['size'] == 3 and stats['evictions'] == 2
+
+class TestStepClassifier:
+    """測試共用步驟分類器"""
+
+    def test_automaton_overlapping_keywords(self):
+        """測試重疊關鍵字皆能命中並回傳最早位置"""
+        automaton = KeywordAutomaton([('he', 'he'), ('she', 'she'), ('hers', 'hers'), ('his', 'his')])
+        assert automaton.search('ushers') == {'she': 1, 'he': 2, 'hers': 2}
+
+    @pytest.mark.parametrize('step, expected', [
+        ('打開登入頁面', StepAction('open', 'login')),
+        ('輸入正確的用戶名', StepAction('input', 'username')),
+        ('Enter the password', StepAction('input', 'password')),
+        ('輸入密碼後點擊登入', StepAction('input', 'password')),
+        ('按 Enter 送出表單', StepAction('press_key')),
+        ('驗證系統處理異常輸入的反應', StepAction('verify')),
+        ('Click the Register button', StepAction('click', 'register')),
+        ('在 email 欄位輸入異常值: <b>', StepAction('input', None, 'email', '<b>')),
+        ('輸入用戶名「admin」', StepAction('input', 'username', None, 'admin')),
+        ('保持密碼欄位空白', StepAction('generic', 'password'))
+    ])
+    def test_classify(self, step, expected):
+        """測試中英文步驟轉為動作描述"""
+        assert StepClassifier().classify(step) == expected
+
+    def test_memoized(self):
+        """測試相同步驟只分類一次"""
+        classifier = StepClassifier()
+        for _ in range(3):
+            classifier.classify('點擊登入按鈕')
+        assert classifier.get_stats() == {'hits': 2, 'misses': 1, 'size': 1}
+
+    def test_runner_agrees_with_converter(self):
+        """測試執行器與轉換器對同一步驟採取相同動作"""
+        from src.test_runner import TestRunner
+
+        class RecordingRunner(TestRunner):
+            def __init__(self):
+                super().__init__()
+                self.calls = []
+
+            def __getattribute__(self, name):
+                if name in ('input_username', 'input_password', 'input_text', 'click_login', 'click_element',
+                            'verify_element', 'wait_for_element', 'open_page', 'press_enter', 'execute_generic_step'):
+                    return lambda *args: self.calls.append(name)
+                return super().__getattribute__(name)
+
+        runner = RecordingRunner()
+        converter = ScriptConverter()
+        for step in ['在 email 欄位輸入異常值: x', '點擊登入按鈕', '按 Enter']:
+            runner.execute_step(step, 1)
+        assert runner.calls == ['input_text', 'click_login', 'press_enter']
+        assert 'By.ID, "email"' in converter._convert_step_to_selenium('在 email 欄位輸入異常值: x')
+        assert 'Keys.ENTER' in converter._convert_step_to_selenium('按 Enter')
+
+class TestExportChunks:
+    """測試串流匯出"""
+
+    def test_writes_file_while_streaming(self, tmp_path):
+        """測試轉送的內容與寫入的檔案一致"""
+        exporter = TestExporter(str(tmp_path))
+        chunks = ScriptConverter().convert_iter(make_cases(3), 'selenium')
+        streamed = ''.join(exporter.export_chunks(chunks, 'suite.py'))
+        assert (tmp_path / 'suite.py').read_text(encoding='utf-8') == streamed
+        assert 'def run_tests' in streamed
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,494 @@
+"""
+測試用例生成器測試
+"""
+
+import pytest
+import sys
+import os
+import json
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.ai_model_manager import AIModelManager
+from src.models.response_cache import ResponseCache
+from src.generators.test_case_generator import TestCaseGenerator, StructuredOutputError
+from src.generators.prompt_builder import PromptBuilder
+from src.generators.spec_splitter import split_sections, merge_test_cases
+from src.generators.dedup import MinHashDeduplicator
+from src.generators.incremental import SuiteStore, split_sentences, diff_sentences, next_ids
+from src.generators.example_index import ExampleIndex, tokenize
+from src.generators.rule_engine import RuleBasedGenerator, extract_entities
+from src.generators.test_case_model import TestCase, TestCaseDecodeError, decode_test_cases, encode_test_cases
+from src.converters.script_converter import ScriptConverter
+from src.fuzz.fuzz_tester import FuzzTester
+from src.generators.stream_parser import IncrementalTestCaseParser
+from src.generators.model_cascade import ModelCascade, validate_test_cases
+from src.models.rate_limiter import PRIORITY_BULK
+
+class TestIncrementalTestCaseParser:
+    """測試增量解析器"""
+
+    def test_emits_each_case_when_closed(self):
+        """測試每個用例閉合時立即產出"""
+        response = json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': '含 } 與 \\" 的標題', 'steps': ['a', 'b']},
+            {'id': 'TC002', 'title': '第二個', 'steps': []}
+        ]}, ensure_ascii=False)
+        parser = IncrementalTestCaseParser()
+        emitted = []
+        for char in response:
+            emitted.extend(case['id'] for case in parser.feed(char))
+            if char == '}' and len(emitted) == 1:
+                break
+        assert emitted == ['TC001']
+
+        parser = IncrementalTestCaseParser()
+        cases = []
+        for start in range(0, len(response), 7):
+            cases.extend(parser.feed(response[start:start + 7]))
+        assert [case['id'] for case in cases] == ['TC001', 'TC002']
+        assert cases[0]['title'] == '含 } 與 \\" 的標題'
+
+class TestGenerateStream:
+    """測試串流生成"""
+
+    def test_demo_model_stream(self):
+        """測試示範模型串流生成"""
+        generator = TestCaseGenerator(AIModelManager(cache=ResponseCache(db_path=None)))
+        cases = list(generator.generate_stream('測試登入功能', 'functional', 'demo-model'))
+        assert len(cases) >= 3
+        assert [case['id'] for case in cases] == [f'TC{index:03d}' for index in range(1, len(cases) + 1)]
+
+class FakeAIManager:
+    """依模型回傳預設回應的假管理器"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+        self.priorities = []
+        self.prompts = []
+
+    def has_client(self, model):
+        return model in self.responses
+
+    def supports_json_mode(self, model):
+        return True
+
+    def generate_response(self, prompt, model, **kwargs):
+        self.calls.append(model)
+        self.priorities.append(kwargs.get('priority'))
+        self.prompts.append(prompt)
+        response = self.responses[model]
+        # 以列表提供依序回傳的多個回應
+        if isinstance(response, list):
+            return response.pop(0)
+        return response
+
+    def generate_many(self, prompts, model, **kwargs):
+        return [self.generate_response(prompt, model) for prompt in prompts]
+
+VALID_RESPONSE = json.dumps({'test_cases': [
+    {'id': 'TC001', 'title': '登入', 'steps': ['打開登入頁面'], 'expected_result': '成功登入'}
+]})
+
+class TestModelCascade:
+    """測試模型串接"""
+
+    def test_validate_test_cases(self):
+        """測試用例驗證"""
+        assert validate_test_cases(None)
+        assert validate_test_cases([])
+        assert validate_test_cases([{'title': 'x'}])
+        assert not validate_test_cases(json.loads(VALID_RESPONSE)['test_cases'])
+
+    def test_escalates_on_invalid_output(self):
+        """測試輸出無效時升級到下一個模型"""
+        manager = FakeAIManager({'small': '不是 JSON', 'large': VALID_RESPONSE})
+        generator = TestCaseGenerator(manager)
+        generator.cascade = ModelCascade(manager, ['small', 'medium', 'large'])
+        test_cases = generator.generate('測試登入功能', 'functional', 'cascade')
+        assert test_cases[0]['id'] == 'TC001'
+        assert manager.calls == ['small', 'large']
+        stats = generator.cascade.get_stats()['default:functional']
+        assert stats['escalation_rate'] == 1
+        assert stats['models'] == {'large': 1}
+
+    def test_generate_many_escalates_only_failures(self):
+        """測試批次模式只升級未通過驗證的項目"""
+        manager = FakeAIManager({'small': VALID_RESPONSE, 'large': VALID_RESPONSE})
+        generator = TestCaseGenerator(manager)
+        generator.cascade = ModelCascade(manager, ['small', 'large'])
+        suites = generator.generate_many(['a', 'b'], 'functional', 'cascade')
+        assert len(suites) == 2
+        assert manager.calls == ['small', 'small']
+
+    def test_cascade_steps_bypass_router_failover(self):
+        """測試串接的每一級只呼叫指定模型，不經路由器切換到等效模型"""
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        manager.openai_api_key = 'sk-test'
+        manager.groq_api_key = 'gsk-test'
+        calls = []
+
+        def dispatch(prompt, model, *args):
+            calls.append(model)
+            if model == 'llama3-8b-8192':
+                raise RuntimeError('down')
+            return VALID_RESPONSE
+
+        manager._dispatch_response = dispatch
+        generator = TestCaseGenerator(manager)
+        generator.cascade = ModelCascade(manager, ['llama3-8b-8192', 'llama3-70b-8192'])
+        generator.generate('測試登入功能', 'functional', 'cascade', use_cache=False)
+        assert calls == ['llama3-8b-8192', 'llama3-70b-8192']
+        assert generator.cascade.get_stats()['default:functional']['models'] == {'llama3-70b-8192': 1}
+
+    def test_bulk_priority_reaches_every_call(self):
+        """測試批次優先順序傳遞到串接、嚴格模式與一般模式的每次呼叫"""
+        manager = FakeAIManager({'small': '不是 JSON', 'large': VALID_RESPONSE})
+        generator = TestCaseGenerator(manager)
+        generator.cascade = ModelCascade(manager, ['small', 'large'])
+        generator.generate('測試登入功能', 'functional', 'cascade', priority=PRIORITY_BULK)
+        generator.generate_with_template('測試登入功能', 'web_application', 'functional', 'large', priority=PRIORITY_BULK)
+        generator.generate('測試付款功能', 'functional', 'large', strict=True, priority=PRIORITY_BULK)
+        assert manager.priorities == [PRIORITY_BULK] * 4
+
+class TestStrictMode:
+    """測試嚴格結構化輸出模式"""
+
+    def test_repairs_invalid_output(self):
+        """測試以修正 prompt 修復無效輸出"""
+        invalid = json.dumps({'test_cases': [{'title': '登入', 'steps': '打開頁面'}]})
+        manager = FakeAIManager({'model': [invalid, VALID_RESPONSE]})
+        generator = TestCaseGenerator(manager)
+        test_cases = generator.generate('測試登入功能', 'functional', 'model', strict=True)
+        assert test_cases[0]['id'] == 'TC001'
+        assert len(manager.calls) == 2
+
+    def test_raises_when_budget_exhausted(self):
+        """測試修正次數用盡時拋出錯誤"""
+        manager = FakeAIManager({'model': '不是 JSON'})
+        generator = TestCaseGenerator(manager)
+        generator.repair_retries = 1
+        with pytest.raises(StructuredOutputError):
+            generator.generate('測試登入功能', 'functional', 'model', strict=True)
+        assert len(manager.calls) == 2
+
+class TestPromptBuilder:
+    """測試 prompt 組裝器"""
+
+    def test_stable_prefix_with_description_last(self):
+        """測試前綴固定且功能描述位於最後"""
+        generator = TestCaseGenerator(FakeAIManager([]))
+        first = generator._build_template_prompt('登入 {user}', 'api_service', 'security')
+        second = generator._build_template_prompt('付款流程', 'api_service', 'security')
+
+        prefix = generator.prompt_builder.get_prefix('api_service', 'security')
+        assert first.startswith(prefix) and second.startswith(prefix)
+        assert first.rstrip().endswith('登入 {user}')
+        assert 'API 服務測試' in prefix and 'security' in prefix
+
+    def test_prefix_rendered_once(self):
+        """測試相同模板與測試類型只組裝一次前綴"""
+        builder = PromptBuilder({})
+        calls = []
+        original = builder._render_prefix
+        builder._render_prefix = lambda *args: calls.append(args) or original(*args)
+        builder.build('a', 'functional')
+        builder.build('b', 'functional')
+        builder.build('c', 'performance')
+        assert calls == [('default', 'functional'), ('default', 'performance')]
+
+    def test_unknown_test_type_not_cached_separately(self):
+        """測試未知的測試類型共用預設類型的前綴"""
+        builder = PromptBuilder({})
+        for index in range(50):
+            builder.build('a', f'random-{index}')
+        assert list(builder._prefixes) == [('default', 'functional')]
+        assert '**測試類型：** functional' in builder.build('a', 'bogus')
+
+class TestSectionedGeneration:
+    """測試長規格文件分章節生成"""
+
+    def test_split_sections(self):
+        """測試依標題切分且每節不超過上限"""
+        spec = '\n\n'.join(f"# 第 {i} 章\n" + '功能說明。' * 40 for i in range(5))
+        sections = split_sections(spec, max_chars=300)
+        assert len(sections) == 5
+        assert all(len(section) <= 300 for section in sections)
+        assert sections[2].startswith('# 第 2 章')
+        assert split_sections('短描述', max_chars=500) == ['短描述']
+
+    def test_merge_dedupes_and_renumbers(self):
+        """測試合併時去除重複並重新編號"""
+        case = {'id': 'TC001', 'title': '登入', 'steps': ['打開頁面']}
+        merged = merge_test_cases([[case], [dict(case, title=' 登入 '), {'id': 'TC001', 'title': '登出', 'steps': []}]])
+        assert [(c['id'], c['title']) for c in merged] == [('TC001', '登入'), ('TC002', '登出')]
+        assert case['id'] == 'TC001'
+
+    def test_long_description_generated_per_section(self):
+        """測試長描述自動切分並合併各章節結果"""
+        responses = [json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': f'章節 {i}', 'steps': ['步驟'], 'expected_result': '成功'}
+        ]}) for i in range(3)]
+        manager = FakeAIManager({'gpt-4': responses})
+        generator = TestCaseGenerator(manager)
+        generator.section_chars = 300
+
+        spec = '\n\n'.join(f"## 模組 {i}\n" + '需求描述。' * 50 for i in range(3))
+        test_cases = generator.generate(spec, model='gpt-4')
+        assert len(manager.calls) == 3
+        assert [c['id'] for c in test_cases] == ['TC001', 'TC002', 'TC003']
+        assert sorted(c['title'] for c in test_cases) == ['章節 0', '章節 1', '章節 2']
+
+class TestMinHashDeduplicator:
+    """測試近似重複用例去除"""
+
+    def test_near_duplicates_merged(self):
+        """測試近似重複的用例被合併並列入報告"""
+        wrong_password = {
+            'id': 'TC001', 'title': '使用錯誤密碼登入',
+            'steps': ['打開登入頁面', '輸入錯誤的密碼', '點擊登入按鈕'], 'expected_result': '顯示密碼錯誤訊息'
+        }
+        upload = {'id': 'TC002', 'title': '上傳大型檔案', 'steps': ['打開上傳頁面', '選擇 100MB 檔案'], 'expected_result': '上傳成功'}
+        security = dict(wrong_password, id='TC003', title='使用錯誤密碼登入系統')
+
+        kept, report = MinHashDeduplicator(threshold=0.8).dedupe([wrong_password, upload, security])
+        assert [c['id'] for c in kept] == ['TC001', 'TC002']
+        assert report[0]['kept'] == 'TC001' and report[0]['merged'] == ['TC003']
+        assert 0.8 <= report[0]['similarity'] < 1
+
+    def test_large_suite(self):
+        """測試大量用例中的完全重複與近似重複"""
+        test_cases = [
+            {'id': i, 'title': f'查詢訂單 {i % 200} 的出貨狀態', 'steps': [f'開啟訂單 {i % 200}', '點擊出貨資訊'], 'expected_result': '顯示出貨狀態'}
+            for i in range(2000)
+        ]
+        kept, report = MinHashDeduplicator(threshold=0.95).dedupe(test_cases)
+        # 完全相同者必定合併；「訂單 1」與「訂單 10」這類僅差一字的用例也可能被視為近似重複
+        assert 190 <= len(kept) <= 200
+        assert sum(len(entry['merged']) for entry in report) == 2000 - len(kept)
+
+    def test_single_generation_dedup_is_opt_in(self):
+        """測試單次生成預設保留邊界值用例，啟用 DEDUP_SINGLE 時才去重"""
+        case = {'id': 'TC001', 'title': '密碼長度為 8 個字元', 'steps': ['輸入 8 個字元的密碼', '點擊註冊'], 'expected_result': '註冊成功'}
+        boundary = dict(case, id='TC002', title='密碼長度為 7 個字元', steps=['輸入 7 個字元的密碼', '點擊註冊'])
+        response = json.dumps({'test_cases': [case, boundary, dict(case, id='TC003')]})
+        generator = TestCaseGenerator(FakeAIManager({'gpt-4': response}))
+        assert len(generator.generate('註冊', model='gpt-4')) == 3
+
+        generator.dedup_single = True
+        assert len(generator.generate('註冊', model='gpt-4')) < 3
+
+class TestGenerateMulti:
+    """測試多類型併發生成"""
+
+    def test_merge_with_namespaces_and_partial_failure(self):
+        """測試合併後 ID 依類型分段，失敗的類型以錯誤回報"""
+        class FailingSecurityManager(FakeAIManager):
+            def generate_response(self, prompt, model, **kwargs):
+                if '重點：安全性測試' in prompt:
+                    raise RuntimeError('逾時')
+                if '重點：效能測試' in prompt:
+                    return json.dumps({'test_cases': [
+                        {'title': '大量併發登入', 'steps': ['模擬 1000 個使用者同時登入'], 'expected_result': '回應時間小於 2 秒'}
+                    ]})
+                return super().generate_response(prompt, model, **kwargs)
+
+        generator = TestCaseGenerator(FailingSecurityManager({'gpt-4': VALID_RESPONSE}))
+        result = generator.generate_multi('登入', ['functional', 'security', 'performance'], model='gpt-4')
+
+        assert [(c['id'], c['test_type']) for c in result['test_cases']] == [
+            ('FUNC-TC001', 'functional'), ('PERF-TC001', 'performance')
+        ]
+        assert result['counts'] == {'functional': 1, 'performance': 1}
+        assert '逾時' in result['errors']['security']
+
+    def test_all_types_failed(self):
+        """測試所有類型皆失敗時拋出例外"""
+        generator = TestCaseGenerator(FakeAIManager({}))
+        with pytest.raises(Exception):
+            generator.generate_multi('登入', ['functional'], model='gpt-4')
+
+    def test_unknown_type_rejected(self):
+        """測試不支援的測試類型會被拒絕"""
+        manager = FakeAIManager({'gpt-4': VALID_RESPONSE})
+        generator = TestCaseGenerator(manager)
+        with pytest.raises(ValueError, match='bogus'):
+            generator.generate_multi('登入', ['functional', 'bogus'], model='gpt-4')
+        assert manager.calls == []
+
+class TestIncrementalGeneration:
+    """測試增量重新生成"""
+
+    def test_diff_sentences(self):
+        """測試句子層級差異"""
+        old = split_sentences('使用者輸入帳號密碼。按下登入後導向首頁。錯誤三次鎖定帳號。')
+        new = split_sentences('使用者輸入帳號密碼。按下登入後導向 Dashboard。錯誤三次鎖定帳號。')
+        assert diff_sentences(old, new) == ({1}, [1])
+        assert next_ids([{'id': 'TC001'}, {'id': 'TC007'}], 2) == ['TC008', 'TC009']
+
+    def test_only_changed_sentences_regenerated(self, tmp_path):
+        """測試只有受影響的用例被替換，其餘保留原 ID"""
+        first = json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': '輸入帳號密碼', 'steps': ['輸入帳號與密碼'], 'expected_result': '欄位顯示輸入內容'},
+            {'id': 'TC002', 'title': '登入後導向首頁', 'steps': ['按下登入'], 'expected_result': '導向首頁'}
+        ]}, ensure_ascii=False)
+        second = json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': '登入後導向 Dashboard', 'steps': ['按下登入'], 'expected_result': '導向 Dashboard'}
+        ]}, ensure_ascii=False)
+        manager = FakeAIManager({'gpt-4': [first, second]})
+        generator = TestCaseGenerator(manager)
+        generator.suite_store = SuiteStore(str(tmp_path))
+
+        result = generator.generate_incremental('login', '使用者輸入帳號密碼。按下登入後導向首頁。', model='gpt-4')
+        assert result['mode'] == 'full'
+
+        result = generator.generate_incremental('login', '使用者輸入帳號密碼。按下登入後導向 Dashboard。', model='gpt-4')
+        assert result['mode'] == 'incremental'
+        # 功能描述只含變動的句子，補充說明放在獨立的段落
+        instructions, description = manager.prompts[-1].rsplit('**功能描述：**', 1)
+        assert description.strip() == '按下登入後導向 Dashboard。'
+        assert '**補充說明：**' in instructions
+        assert [(c['id'], c['title']) for c in result['test_cases']] == [('TC001', '輸入帳號密碼'), ('TC003', '登入後導向 Dashboard')]
+        assert (result['added'], result['removed']) == (1, 1)
+
+        result = generator.generate_incremental('login', '使用者輸入帳號密碼。按下登入後導向 Dashboard。', model='gpt-4')
+        assert result['mode'] == 'unchanged'
+        assert len(manager.calls) == 2
+
+    def test_near_duplicate_kept_cases_do_not_drop_new_cases(self, tmp_path):
+        """測試保留的用例彼此近似重複時，新用例不會因位置偏移而遺失"""
+        duplicate = {'title': '輸入帳號密碼後登入', 'steps': ['輸入帳號與密碼', '點擊登入'], 'expected_result': '登入成功'}
+        first = json.dumps({'test_cases': [
+            dict(duplicate, id='TC001'),
+            dict(duplicate, id='TC002')
+        ]}, ensure_ascii=False)
+        second = json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': '匯出報表為 CSV', 'steps': ['點擊匯出', '選擇 CSV'], 'expected_result': '下載 CSV 檔案'},
+            {'id': 'TC002', 'title': '匯出報表為 PDF', 'steps': ['點擊匯出', '選擇 PDF 格式'], 'expected_result': '下載 PDF 報表'}
+        ]}, ensure_ascii=False)
+        generator = TestCaseGenerator(FakeAIManager({'gpt-4': [first, second]}))
+        generator.suite_store = SuiteStore(str(tmp_path))
+
+        generator.generate_incremental('login', '使用者輸入帳號密碼後登入。', model='gpt-4')
+        result = generator.generate_incremental('login', '使用者輸入帳號密碼後登入。可以匯出報表。', model='gpt-4')
+        assert result['added'] == 2
+        assert [c['id'] for c in result['test_cases']] == ['TC001', 'TC002', 'TC003', 'TC004']
+        assert [c['title'] for c in result['test_cases'][2:]] == ['匯出報表為 CSV', '匯出報表為 PDF']
+
+class TestExampleIndex:
+    """測試少樣本範例檢索"""
+
+    def test_tokenize(self):
+        """測試中英文混合切詞"""
+        assert tokenize('登入 Dashboard 頁面') == ['登入', 'dashboard', '頁面']
+
+    def test_search_and_persist(self, tmp_path):
+        """測試依模板檢索最相似的用例並可從紀錄重建"""
+        path = str(tmp_path / 'accepted.jsonl')
+        index = ExampleIndex(path)
+        index.add('web_application', '登入功能', [{'title': '錯誤密碼登入失敗', 'steps': ['輸入錯誤密碼'], 'expected_result': '顯示錯誤'}])
+        index.add('web_application', '購物車結帳', [{'title': '結帳付款成功', 'steps': ['加入購物車', '付款'], 'expected_result': '訂單成立'}])
+        index.add('api_service', '登入 API', [{'title': 'API 登入', 'steps': ['POST /login'], 'expected_result': '200'}])
+
+        assert [c['title'] for c in index.search('web_application', '會員登入與密碼驗證', k=1)] == ['錯誤密碼登入失敗']
+        assert index.search('mobile_app', '登入') == []
+        assert ExampleIndex(path).get_stats()['templates'] == {'web_application': 2, 'api_service': 1}
+
+    def test_examples_within_budget(self):
+        """測試範例依 token 預算截斷並放在描述之前"""
+        generator = TestCaseGenerator(FakeAIManager({}))
+        generator.example_index = ExampleIndex()
+        cases = [{'title': f'登入情境 {i}', 'steps': ['輸入帳號密碼'] * 5, 'expected_result': '成功'} for i in range(10)]
+        generator.accept_test_cases('登入功能', cases)
+
+        prompt = generator._build_prompt('登入功能', 'functional')
+        examples = generator._few_shot_examples('登入功能', 'default')
+        assert 0 < len(examples) // 2 <= generator.few_shot_budget
+        assert prompt.index('登入情境') < prompt.index('**功能描述：**')
+
+        generator.few_shot_k = 0
+        assert '登入情境' not in generator._build_prompt('登入功能', 'functional')
+
+class TestRuleBasedGenerator:
+    """測試本地規則式生成引擎"""
+
+    def test_extract_entities(self):
+        """測試從描述擷取欄位與動作"""
+        entities = extract_entities('使用者輸入帳號和密碼後點擊登入按鈕')
+        assert [field['name'] for field in entities['fields']] == ['帳號', '密碼']
+        assert '登入' in entities['actions']
+
+    def test_generate_login_cases(self):
+        """測試產生的用例依優先級排序並編號"""
+        test_cases = RuleBasedGenerator().generate('使用者輸入帳號和密碼後點擊登入按鈕', 'login', 'security')
+        assert test_cases[0]['id'] == 'TC001'
+        assert test_cases[0]['priority'] == 'high'
+        assert validate_test_cases(test_cases) == []
+        assert len({test_case['title'] for test_case in test_cases}) == len(test_cases)
+
+    def test_generate_from_prompt(self):
+        """測試從生成 prompt 解析描述與測試類型"""
+        generator = TestCaseGenerator(FakeAIManager({}))
+        prompt = generator._build_prompt('使用者輸入帳號和密碼後點擊登入按鈕', 'security')
+        response = json.loads(RuleBasedGenerator().generate_from_prompt(prompt))
+        assert any('SQL' in test_case['title'] for test_case in response['test_cases'])
+
+    def test_fallback_on_provider_error(self):
+        """測試 AI 呼叫失敗時改用本地規則，停用備援時拋出原例外"""
+        class FailingManager(FakeAIManager):
+            def generate_response(self, prompt, model, **kwargs):
+                raise RuntimeError('連線逾時')
+
+        generator = TestCaseGenerator(FailingManager({'gpt-4': ''}))
+        test_cases = generator.generate('使用者輸入帳號和密碼後點擊登入按鈕', model='gpt-4')
+        assert test_cases and test_cases[0]['id'] == 'TC001'
+        assert generator.is_local_fallback(test_cases)
+        assert {test_case['source'] for test_case in test_cases} == {'local'}
+
+        # 呼叫端可要求不使用備援（例如批次作業）
+        with pytest.raises(RuntimeError):
+            generator.generate('使用者輸入帳號和密碼後點擊登入按鈕', model='gpt-4', fallback=False)
+
+        generator.local_fallback = False
+        with pytest.raises(RuntimeError):
+            generator.generate('使用者輸入帳號和密碼後點擊登入按鈕', model='gpt-4')
+
+class TestTestCaseModel:
+    """測試測試用例資料模型"""
+
+    def test_round_trip(self):
+        """測試解碼補齊欄位、保留額外欄位並可轉回 dict"""
+        test_cases = decode_test_cases(json.dumps({'test_cases': [
+            {'id': 'TC001', 'title': '登入', 'steps': '打開登入頁面', 'expected_result': '成功', 'test_type': 'functional'}
+        ]}))
+        assert test_cases[0].steps == ('打開登入頁面',)
+        assert test_cases[0].priority == ''
+        assert encode_test_cases(test_cases) == [
+            {'id': 'TC001', 'title': '登入', 'steps': ['打開登入頁面'], 'expected_result': '成功', 'test_type': 'functional'}
+        ]
+
+    def test_strict_decode_collects_errors(self):
+        """測試嚴格解碼時彙整所有用例的結構錯誤"""
+        with pytest.raises(TestCaseDecodeError) as error:
+            decode_test_cases([{'title': '登入'}, 'not a case'], strict=True)
+        assert error.value.errors[0].startswith('test_cases[0]: ')
+        assert any(message.startswith('test_cases[1]: ') for message in error.value.errors)
+
+    def test_shared_strings(self):
+        """測試大量 Fuzz 用例共用相同的步驟字串"""
+        cases = FuzzTester().generate_fuzz_cases([{'name': 'email'}, {'name': 'password'}])
+        assert isinstance(cases[0], TestCase)
+        assert cases[0].steps[0] is cases[-1].steps[0]
+        assert cases[0].expected_result is cases[-1].expected_result
+
+    def test_converter_accepts_dicts_and_models(self):
+        """測試腳本轉換器對 dict 與 TestCase 輸出相同結果"""
+        data = [{'title': 'login ok', 'steps': ['打開登入頁面'], 'expected_result': '成功登入'}]
+        converter = ScriptConverter()
+        assert converter.convert(data) == converter.convert(decode_test_cases(data))
+        assert 'def test_login_ok' in converter.convert(data)
+
+if __name__ == '__main__':
+    pytest.main([__file__])
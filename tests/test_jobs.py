@@ -0,0 +1,96 @@
+"""
+批次作業測試
+"""
+
+import pytest
+import sys
+import os
+import json
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.jobs.bulk_runner import BulkJob, JobManager, load_items, STATUS_COMPLETED
+from src.models.rate_limiter import PRIORITY_BULK
+
+class FakeGenerator:
+    """記錄呼叫並可指定失敗描述的假生成器"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+        self.priorities = []
+
+    def generate(self, description, test_type='functional', model='gpt-4', use_cache=True, priority='interactive',
+                 fallback=True):
+        assert not fallback
+        self.calls.append(description)
+        self.priorities.append(priority)
+        if description in self.failing:
+            raise RuntimeError('API 錯誤')
+        return [{'id': 'TC001', 'title': description}]
+
+    def generate_with_template(self, description, template_name, test_type='functional', model='gpt-4',
+                               use_cache=True, priority='interactive', fallback=True):
+        return self.generate(description, test_type, model, use_cache, priority, fallback)
+
+class TestBulkJob:
+    """測試批次生成作業"""
+
+    def test_load_csv_and_jsonl(self, tmp_path):
+        """測試載入 CSV 與 JSONL"""
+        csv_path = tmp_path / 'input.csv'
+        csv_path.write_text('description,template\n登入,web_application\n', encoding='utf-8')
+        jsonl_path = tmp_path / 'input.jsonl'
+        jsonl_path.write_text('{"id": "x", "description": "付款"}\n', encoding='utf-8')
+
+        assert load_items(str(csv_path))[0] == {
+            'id': '1', 'description': '登入', 'template': 'web_application', 'test_type': 'functional', 'model': ''
+        }
+        assert load_items(str(jsonl_path))[0]['id'] == 'x'
+
+    def test_resume_skips_completed(self, tmp_path):
+        """測試續跑時只重新處理未成功的項目"""
+        input_path = tmp_path / 'input.jsonl'
+        input_path.write_text(
+            ''.join(json.dumps({'description': d}, ensure_ascii=False) + '\n' for d in ['a', 'b', 'c']),
+            encoding='utf-8'
+        )
+        output_path = str(tmp_path / 'out.jsonl')
+
+        generator = FakeGenerator(failing=['b'])
+        progress = BulkJob(generator, str(input_path), output_path, concurrency=2).run()
+        assert progress['status'] == STATUS_COMPLETED
+        assert (progress['succeeded'], progress['failed']) == (2, 1)
+        assert set(generator.priorities) == {PRIORITY_BULK}
+
+        generator = FakeGenerator()
+        progress = BulkJob(generator, str(input_path), output_path).run()
+        assert generator.calls == ['b']
+        assert (progress['skipped'], progress['succeeded'], progress['percent']) == (2, 1, 100.0)
+
+    def test_job_manager_resume(self, tmp_path):
+        """測試作業管理器可依儲存的設定續跑"""
+        manager = JobManager(FakeGenerator(), jobs_dir=str(tmp_path))
+        job = manager.create([{'description': 'a'}, {'description': 'b'}], concurrency=100)
+        job.wait(5)
+        assert job.get_progress()['succeeded'] == 2
+        assert job.concurrency == 20
+
+        resumed = JobManager(FakeGenerator(), jobs_dir=str(tmp_path)).resume(job.job_id)
+        resumed.wait(5)
+        assert resumed.get_progress()['skipped'] == 2
+
+    def test_resume_does_not_duplicate_pending_job(self, tmp_path):
+        """測試尚未開始執行的作業不會被再次啟動，且拒絕含路徑的作業 ID"""
+        manager = JobManager(FakeGenerator(), jobs_dir=str(tmp_path))
+        pending = BulkJob(FakeGenerator(), 'input.jsonl', 'results.jsonl', job_id='abc')
+        manager._jobs['abc'] = pending
+        assert manager.resume('abc') is pending
+
+        for job_id in ['..', '../abc', 'a\\b']:
+            with pytest.raises(ValueError):
+                manager.resume(job_id)
+
+if __name__ == '__main__':
+    pytest.main([__file__])
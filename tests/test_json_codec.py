@@ -0,0 +1,61 @@
+"""
+JSON 編解碼層測試
+"""
+
+import pytest
+import sys
+import os
+import json
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.json_codec import JSONCodec, BACKEND_ORJSON, BACKEND_STDLIB
+from src.generators.test_case_model import decode_test_cases
+
+def available_backends():
+    backends = [BACKEND_STDLIB]
+    try:
+        JSONCodec(BACKEND_ORJSON)
+        backends.append(BACKEND_ORJSON)
+    except ImportError:
+        pass
+    return backends
+
+class TestJSONCodec:
+    """測試 JSON 編解碼器"""
+
+    @pytest.mark.parametrize('backend', available_backends())
+    def test_round_trip(self, backend):
+        """測試非 ASCII 字元不跳脫且可還原，TestCase 物件可直接編碼"""
+        codec = JSONCodec(backend)
+        test_cases = decode_test_cases([{'title': '登入', 'steps': ['打開登入頁面'], 'expected_result': '成功'}])
+        encoded = codec.dumps({'test_cases': test_cases})
+        assert '登入' in encoded
+        assert codec.loads(encoded.encode('utf-8')) == {
+            'test_cases': [{'title': '登入', 'steps': ['打開登入頁面'], 'expected_result': '成功'}]
+        }
+
+    @pytest.mark.parametrize('backend', available_backends())
+    def test_decode_error_type(self, backend):
+        """測試格式錯誤時拋出 json.JSONDecodeError"""
+        with pytest.raises(json.JSONDecodeError):
+            JSONCodec(backend).loads('{"test_cases": [')
+
+    @pytest.mark.parametrize('backend', available_backends())
+    def test_iter_encode(self, backend):
+        """測試分段串流編碼的結果與一次編碼相同"""
+        codec = JSONCodec(backend)
+        payload = {'success': True, 'test_cases': [{'id': i, 'title': f'用例 {i}'} for i in range(2500)], 'message': '完成'}
+        chunks = list(codec.iter_encode(payload, 'test_cases', chunk_size=1000))
+        assert len(chunks) == 5
+        assert json.loads(b''.join(chunks)) == payload
+        assert json.loads(b''.join(codec.iter_encode({'test_cases': []}, 'test_cases'))) == {'test_cases': []}
+
+    def test_unknown_backend(self):
+        """測試不支援的實作名稱"""
+        with pytest.raises(ValueError):
+            JSONCodec('yaml')
+
+if __name__ == '__main__':
+    pytest.main([__file__])
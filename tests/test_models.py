@@ -0,0 +1,487 @@
+"""
+AI 模型層測試
+"""
+
+import pytest
+import sys
+import os
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+# 添加專案根目錄到 Python 路徑
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.ai_model_manager import AIModelManager
+from src.models.response_cache import ResponseCache
+from src.models.single_flight import SingleFlight
+from src.models.model_router import ModelRouter, NoAvailableModel, CIRCUIT_OPEN
+from src.models.model_catalog import ModelCatalog
+from src.models.cassette import Cassette, CassetteMiss
+from src.models.telemetry import LLMTelemetry, telemetry_context
+from src.models.rate_limiter import RequestScheduler, RateLimitExceeded, PRIORITY_BULK, PRIORITY_INTERACTIVE
+
+class TestResponseCache:
+    """測試回應快取"""
+
+    def test_memory_and_disk_tiers(self, tmp_path):
+        """測試記憶體層與磁碟層"""
+        db_path = str(tmp_path / 'cache.sqlite3')
+        cache = ResponseCache(db_path=db_path, memory_size=2)
+        key = ResponseCache.make_key('prompt', 'gpt-4', 0.7, 2000)
+        cache.set(key, 'response')
+        assert cache.get(key) == 'response'
+        assert cache.stats['memory_hits'] == 1
+
+        # 新實例只能從磁碟層命中
+        other = ResponseCache(db_path=db_path, memory_size=2)
+        assert other.get(key) == 'response'
+        assert other.stats['disk_hits'] == 1
+
+    def test_ttl_and_size_eviction(self, tmp_path):
+        """測試 TTL 與容量淘汰"""
+        cache = ResponseCache(db_path=str(tmp_path / 'cache.sqlite3'), memory_size=1, disk_size=2, evict_interval=1)
+        cache.set('expired', 'value', ttl=-1)
+        assert cache.get('expired') is None
+        for key in ['a', 'b', 'c']:
+            cache.set(key, key)
+        stats = cache.get_stats()
+        assert stats['memory_entries'] == 1
+        assert stats['disk_entries'] == 2
+        assert cache.get('a') is None
+
+    def test_disk_eviction_is_batched(self, tmp_path):
+        """測試磁碟層每 evict_interval 次寫入才整理一次"""
+        cache = ResponseCache(db_path=str(tmp_path / 'cache.sqlite3'), memory_size=1, disk_size=2, evict_interval=3)
+        for key in ['a', 'b', 'c']:
+            cache.set(key, key)
+        assert cache.get_stats()['disk_entries'] == 2
+        cache.set('d', 'd')
+        cache.set('e', 'e')
+        assert cache.get_stats()['disk_entries'] == 4
+        cache.set('f', 'f')
+        assert cache.get_stats()['disk_entries'] == 2
+        assert cache.get('f') == 'f'
+
+    def test_manager_uses_cache(self, tmp_path):
+        """測試模型管理器使用快取與停用快取"""
+        manager = AIModelManager(cache=ResponseCache(db_path=str(tmp_path / 'cache.sqlite3')))
+        calls = []
+        manager._dispatch_response = lambda *args: calls.append(args) or 'ok'
+        assert manager.generate_response('prompt', 'demo-model') == 'ok'
+        assert manager.generate_response('prompt', 'demo-model') == 'ok'
+        assert len(calls) == 1
+        manager.generate_response('prompt', 'demo-model', use_cache=False)
+        assert len(calls) == 2
+        assert manager.get_cache_stats()['memory_hits'] == 1
+
+    def test_demo_responses_not_served_for_real_model(self, tmp_path, monkeypatch):
+        """測試未設定金鑰時的示範回應不會在設定金鑰後被當成真實模型的快取"""
+        monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+        cache = ResponseCache(db_path=str(tmp_path / 'cache.sqlite3'))
+        manager = AIModelManager(cache=cache)
+        manager.openai_api_key = None
+        demo = manager.generate_response('測試登入功能 login', 'gpt-4')
+
+        manager.openai_api_key = 'sk-test'
+        manager._dispatch_response = lambda *args: 'real'
+        assert manager.generate_response('測試登入功能 login', 'gpt-4') == 'real'
+        assert demo != 'real'
+
+class TestGenerateMany:
+    """測試併發批次生成"""
+
+    def test_results_keep_order_and_respect_concurrency(self):
+        """測試結果順序與併發上限"""
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        state = {'running': 0, 'peak': 0}
+
+        async def fake_dispatch(prompt, *args):
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+            await asyncio.sleep(0.01 * (5 - int(prompt)))
+            state['running'] -= 1
+            return f'response-{prompt}'
+
+        manager._adispatch_response = fake_dispatch
+        results = manager.generate_many([str(i) for i in range(5)], 'demo-model', concurrency=2)
+        assert results == [f'response-{i}' for i in range(5)]
+        assert state['peak'] == 2
+
+    def test_demo_model_without_clients(self):
+        """測試無 API 金鑰時回傳示範回應"""
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        results = manager.generate_many(['login', 'other'], 'demo-model')
+        assert len(results) == 2
+        assert 'TC001' in results[0]
+
+    def test_async_path_uses_router_and_json_mode(self):
+        """測試非同步路徑與同步路徑同樣經由路由器並傳遞 JSON 模式"""
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        manager.openai_api_key = 'sk-test'
+        manager.groq_api_key = 'gsk-test'
+        calls = []
+
+        async def fake_call(prompt, model, temperature, max_tokens, priority, json_mode):
+            calls.append((model, priority, json_mode))
+            if model == 'gpt-4':
+                raise RuntimeError('down')
+            return 'ok'
+
+        manager._acall_provider = fake_call
+        results = manager.generate_many(['p'], 'gpt-4', priority=PRIORITY_INTERACTIVE, json_mode=True)
+        assert results == ['ok']
+        assert calls == [('gpt-4', PRIORITY_INTERACTIVE, True), ('llama3-70b-8192', PRIORITY_INTERACTIVE, True)]
+
+class TestSingleFlight:
+    """測試請求合併"""
+
+    def test_concurrent_callers_share_one_call(self):
+        """測試並行呼叫共用一次執行與錯誤傳遞"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            def fn():
+                calls.append(value)
+                time.sleep(0.1)
+                if value == 'error':
+                    raise ValueError('boom')
+                return value
+            return fn
+
+        results, errors = [], []
+
+        def worker(value):
+            try:
+                results.append(flight.do(value, slow(value)))
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=worker, args=(value,)) for value in ['ok'] * 4 + ['error'] * 3]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(calls) == ['error', 'ok']
+        assert results == ['ok'] * 4
+        assert errors == ['boom'] * 3
+        assert flight.get_stats()['shared'] == 5
+
+    def test_async_callers_share_one_call(self):
+        """測試非同步呼叫合併"""
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        calls = []
+
+        async def fake_dispatch(prompt, *args):
+            calls.append(prompt)
+            await asyncio.sleep(0.01)
+            return prompt
+
+        manager._adispatch_response = fake_dispatch
+        results = manager.generate_many(['same'] * 5, 'demo-model', use_cache=False)
+        assert results == ['same'] * 5
+        assert calls == ['same']
+
+    def test_cancelled_leader_hands_over_to_follower(self):
+        """測試領頭呼叫被取消時由跟隨者接手，跟隨者不會被連帶取消"""
+        flight = SingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(len(calls))
+            await asyncio.sleep(0.05)
+            return 'ok'
+
+        async def main():
+            leader = asyncio.ensure_future(flight.ado('key', slow))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(flight.ado('key', slow)) for _ in range(2)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.wait_for(asyncio.gather(*followers), timeout=1)
+            assert results == ['ok', 'ok']
+            assert leader.cancelled()
+            assert flight.get_stats()['in_flight'] == 0
+
+        asyncio.run(main())
+        # 原領頭一次，接手的跟隨者一次，另一個跟隨者共用其結果
+        assert len(calls) == 2
+
+class FakeRateLimitError(Exception):
+    """模擬 429 錯誤"""
+
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__('rate limited')
+        self.response = type('Response', (), {'headers': {'retry-after': retry_after} if retry_after else {}})()
+
+class TestRequestScheduler:
+    """測試速率限制排程器"""
+
+    def test_retries_with_retry_after(self):
+        """測試 429 依 Retry-After 重試"""
+        scheduler = RequestScheduler(max_retries=2, base_delay=0.01)
+        attempts = []
+
+        def fn():
+            attempts.append(time.monotonic())
+            if len(attempts) < 2:
+                raise FakeRateLimitError(retry_after='0.05')
+            return 'ok'
+
+        assert scheduler.execute('groq', 'llama3-8b-8192', fn, 10) == 'ok'
+        assert attempts[1] - attempts[0] >= 0.05
+        assert scheduler.get_stats()['rate_limited'] == 1
+
+        def always_limited():
+            raise FakeRateLimitError()
+
+        with pytest.raises(RateLimitExceeded):
+            scheduler.execute('groq', 'llama3-8b-8192', always_limited, 10)
+
+    def test_interactive_preempts_bulk(self):
+        """測試互動請求優先於排隊中的批次請求"""
+        scheduler = RequestScheduler(limits={'groq': {'rpm': 600}})
+        order = []
+
+        # 先耗盡令牌桶，讓後續請求必須排隊
+        scheduler._get_lane('groq').requests.tokens = 0
+
+        def worker(name, priority, delay):
+            time.sleep(delay)
+            scheduler.execute('groq', 'llama3-8b-8192', lambda: order.append(name), 1, priority)
+
+        threads = [
+            threading.Thread(target=worker, args=('bulk-1', PRIORITY_BULK, 0)),
+            threading.Thread(target=worker, args=('bulk-2', PRIORITY_BULK, 0.01)),
+            threading.Thread(target=worker, args=('interactive', PRIORITY_INTERACTIVE, 0.02))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert order.index('interactive') < order.index('bulk-2')
+
+    def test_cancelled_waiter_leaves_queue(self):
+        """測試排隊中被取消的請求會讓出位置"""
+        scheduler = RequestScheduler(limits={'groq': {'rpm': 600}})
+        scheduler._get_lane('groq').requests.tokens = 0
+
+        async def main():
+            stale = asyncio.ensure_future(scheduler.aacquire('groq', 1, PRIORITY_BULK))
+            await asyncio.sleep(0.01)
+            stale.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await stale
+            assert scheduler.get_stats()['queued']['groq'] == 0
+            await asyncio.wait_for(scheduler.aacquire('groq', 1, PRIORITY_BULK), timeout=1)
+
+        asyncio.run(main())
+
+class TestModelRouter:
+    """測試模型路由器"""
+
+    def test_failover_and_circuit_breaker(self):
+        """測試失敗切換與斷路器開路"""
+        router = ModelRouter(equivalent_models=[['a', 'b']], failure_threshold=2, cooldown=60)
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            if model == 'a':
+                raise Exception('down')
+            return f'from-{model}'
+
+        assert router.execute('a', call) == 'from-b'
+        assert router.execute('a', call) == 'from-b'
+        assert router.get_stats()['models']['a']['circuit'] == CIRCUIT_OPEN
+
+        # 斷路後不再呼叫故障模型
+        calls.clear()
+        assert router.execute('a', call) == 'from-b'
+        assert calls == ['b']
+
+        router.record('b', 0.1, False)
+        router.record('b', 0.1, False)
+        with pytest.raises(NoAvailableModel):
+            router.execute('a', call)
+
+    def test_half_open_probe_claimed_only_when_called(self):
+        """測試排序候選模型不會佔用半開試探資格"""
+        router = ModelRouter(equivalent_models=[['a', 'b']], failure_threshold=1, cooldown=0.01)
+        router.record('b', 0.1, False)
+        time.sleep(0.02)
+        assert router.candidates('a') == ['a', 'b']
+        assert router.candidates('b') == ['b', 'a']
+
+        calls = []
+        assert router.execute('b', lambda model: calls.append(model) or model) == 'b'
+        assert calls == ['b']
+        assert router.get_stats()['models']['b']['circuit'] != CIRCUIT_OPEN
+
+    def test_hedged_request_returns_first_valid(self):
+        """測試對沖請求回傳最先完成的結果"""
+        router = ModelRouter(equivalent_models=[['slow', 'fast']], hedge_enabled=True, hedge_delay=0.02)
+
+        def call(model):
+            time.sleep(0.5 if model == 'slow' else 0.01)
+            return model
+
+        started_at = time.monotonic()
+        assert router.execute('slow', call) == 'fast'
+        assert time.monotonic() - started_at < 0.4
+        assert router.get_stats()['hedge_wins'] == 1
+
+    def test_hedge_falls_back_when_primary_fails_early(self):
+        """測試主要請求在對沖前失敗時改呼叫備援"""
+        router = ModelRouter(equivalent_models=[['p', 'b']], hedge_enabled=True, hedge_delay=0.5)
+        calls = []
+
+        def call(model):
+            calls.append(model)
+            if model == 'p':
+                raise Exception('down')
+            return model
+
+        assert router.execute('p', call) == 'b'
+        assert calls == ['p', 'b']
+
+    def test_async_failover_and_hedge(self):
+        """測試非同步路由的失敗切換與對沖"""
+        router = ModelRouter(equivalent_models=[['a', 'b']])
+
+        async def failing(model):
+            if model == 'a':
+                raise Exception('down')
+            return model
+
+        assert asyncio.run(router.aexecute('a', failing)) == 'b'
+
+        router = ModelRouter(equivalent_models=[['slow', 'fast']], hedge_enabled=True, hedge_delay=0.02)
+
+        async def slow(model):
+            await asyncio.sleep(0.5 if model == 'slow' else 0.01)
+            return model
+
+        started_at = time.monotonic()
+        assert asyncio.run(router.aexecute('slow', slow)) == 'fast'
+        assert time.monotonic() - started_at < 0.4
+        assert router.get_stats()['hedge_wins'] == 1
+
+class TestCassette:
+    """測試錄製／重播"""
+
+    def test_record_then_replay(self, tmp_path):
+        """測試錄製後離線重播"""
+        path = str(tmp_path / 'llm.jsonl')
+        recorder = AIModelManager(cache=ResponseCache(db_path=None), cassette=Cassette(path, 'record'))
+        recorded = recorder.generate_response('測試登入功能 login', 'demo-model')
+        assert recorder.get_cassette_stats()['recorded'] == 1
+
+        player = AIModelManager(
+            cache=ResponseCache(db_path=None),
+            cassette=Cassette(path, 'replay', latency_mode='synthetic', seed=1)
+        )
+        player._call_provider = None
+        assert player.generate_response('測試登入功能 login', 'demo-model') == recorded
+        assert player.generate_many(['測試登入功能 login'], 'demo-model') == [recorded]
+
+        with pytest.raises(CassetteMiss):
+            player.generate_response('未錄製的 prompt', 'demo-model')
+
+class TestLazyClients:
+    """測試延遲建立客戶端與共用連線池"""
+
+    def test_clients_built_on_first_use(self, monkeypatch):
+        """測試客戶端於首次使用時建立並共用連線池"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'sk-test')
+        monkeypatch.setenv('GROQ_API_KEY', 'gsk-test')
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        assert manager.has_client('gpt-4')
+        assert any(model['id'] == 'gpt-4' for model in manager.get_available_models())
+        assert manager.get_pool_stats()['openai_client_ready'] is False
+
+        assert manager.openai_client is manager.openai_client
+        assert manager.openai_client._client is manager.groq_client._client
+        # 429 重試只由排程器處理
+        assert manager.openai_client.max_retries == 0 and manager.groq_client.max_retries == 0
+        stats = manager.get_pool_stats()
+        assert stats['openai_client_ready'] and stats['groq_client_ready']
+        assert stats['connections'] == 0
+
+class TestModelCatalog:
+    """測試模型目錄"""
+
+    def test_snapshot_cached_and_health_applied(self, monkeypatch):
+        """測試快照快取與健康狀態標記"""
+        monkeypatch.setenv('GROQ_API_KEY', 'gsk-test')
+        manager = AIModelManager(cache=ResponseCache(db_path=None))
+        manager.check_provider = lambda provider: (False, 0.2, 'timeout')
+        builds = []
+        original = manager.get_available_models
+        manager.get_available_models = lambda: builds.append(1) or original()
+
+        catalog = ModelCatalog(manager, ttl=60, probe_interval=0)
+        models = catalog.get_models()
+        assert catalog.get_models() is models
+        assert len(builds) == 1
+        assert {model['status'] for model in models if model['provider'] == 'groq'} == {'unknown'}
+
+        catalog.probe()
+        models = catalog.get_models()
+        assert len(builds) == 2
+        llama = next(model for model in models if model['id'] == 'llama3-8b-8192')
+        assert llama['status'] == 'degraded'
+        assert llama['latency']['probe'] == 0.2
+        assert catalog.get_health()['groq']['error'] == 'timeout'
+
+class TestTelemetry:
+    """測試 LLM 呼叫遙測"""
+
+    def test_empty_json_settings(self, monkeypatch):
+        """測試直接複製 env.example 時留空的 JSON 設定不會造成啟動失敗"""
+        monkeypatch.setenv('MODEL_PRICING', '')
+        monkeypatch.setenv('MODEL_RATE_LIMITS', '')
+        for name in ['OPENAI_RPM', 'OPENAI_TPM', 'GROQ_RPM', 'GROQ_TPM']:
+            monkeypatch.delenv(name, raising=False)
+        assert LLMTelemetry.from_env().estimate_cost('gpt-4', 1000, 0) > 0
+        assert RequestScheduler.from_env().limits == {}
+
+    def test_record_and_render(self):
+        """測試依模型與模板彙總並輸出 Prometheus 格式"""
+        telemetry = LLMTelemetry({'test-model': (1.0, 2.0)})
+        with telemetry_context('login'):
+            telemetry.record('test-model', 0.3, prompt_tokens=500, completion_tokens=1000, ttft=0.05)
+        telemetry.record('test-model', 2.0, success=False)
+
+        text = telemetry.render_prometheus()
+        labels = 'model="test-model",template="login"'
+        assert f'testgpt_llm_cost_usd_total{{{labels}}} 2.5' in text
+        assert f'testgpt_llm_request_duration_seconds_bucket{{{labels},le="0.5"}} 1' in text
+        assert f'testgpt_llm_time_to_first_token_seconds_count{{{labels}}} 1' in text
+        assert 'testgpt_llm_requests_total{model="test-model",template="none",status="error"} 1' in text
+
+    def test_manager_records_usage(self):
+        """測試供應商回傳的 token 用量會被記錄"""
+        usage = SimpleNamespace(prompt_tokens=120, completion_tokens=80)
+        message = SimpleNamespace(content='ok')
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response)))
+
+        manager = AIModelManager(cache=ResponseCache(db_path=None), telemetry=LLMTelemetry())
+        manager.openai_api_key = 'sk-test'
+        manager._openai_client = client
+        with telemetry_context('api'):
+            assert manager.generate_response('prompt', 'gpt-4', use_cache=False) == 'ok'
+
+        text = manager.get_metrics()
+        assert 'testgpt_llm_prompt_tokens_total{model="gpt-4",template="api"} 120' in text
+        assert 'testgpt_llm_completion_tokens_total{model="gpt-4",template="api"} 80' in text
+
+if __name__ == '__main__':
+    pytest.main([__file__])